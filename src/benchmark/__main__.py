@@ -0,0 +1,107 @@
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime
+
+import matplotlib
+import netCDF4 as nc
+import numpy as np
+import wrf
+from benchmark.stages import STAGES, PipelineBenchmark, time_runs
+from benchmark.synthetic import (
+    GRID_PRESETS,
+    domain_center_section,
+    generate_wrfout,
+)
+from util.path import generate_path
+from wrfout.handler.type import CrossSection
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmark",
+        description="Time the drawing pipeline on synthetic wrfout files.",
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        choices=list(GRID_PRESETS),
+        default=["small", "medium"],
+        help="grid sizes to benchmark",
+    )
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=STAGES,
+        default=list(STAGES),
+        help="pipeline stages to time",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="runs of each stage"
+    )
+    parser.add_argument(
+        "--output",
+        default=generate_path("/data/benchmark/results.json"),
+        help="path of the JSON report",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    matplotlib.use("Agg")
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "netCDF4": nc.__version__,
+            "wrf-python": wrf.__version__,
+            "matplotlib": matplotlib.__version__,
+        },
+        "repeat": args.repeat,
+        "results": [],
+    }
+    for size in args.sizes:
+        grid = GRID_PRESETS[size]
+        with tempfile.TemporaryDirectory() as work_dir:
+            wrfout_path = os.path.join(work_dir, "wrfout_synthetic")
+            print(f"Generating {size} wrfout {grid} …")
+            start = time.perf_counter()
+            generate_wrfout(wrfout_path, grid)
+            generation_seconds = time.perf_counter() - start
+
+            section = CrossSection("benchmark", *domain_center_section(grid))
+            pipeline = PipelineBenchmark(wrfout_path, section, work_dir)
+            timings = {}
+            try:
+                for stage in args.stages:
+                    pipeline.prepare(stage)
+                    timings[stage] = time_runs(
+                        lambda: pipeline.run(stage), args.repeat
+                    )
+                    print(f"  {stage}: {timings[stage]['median']:.3f} s")
+            finally:
+                pipeline.close()
+            report["results"].append(
+                {
+                    "size": size,
+                    "grid": grid._asdict(),
+                    "file_bytes": os.path.getsize(wrfout_path),
+                    "generation_seconds": generation_seconds,
+                    "stages": timings,
+                }
+            )
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, mode="w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved the benchmark results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
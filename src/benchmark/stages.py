@@ -0,0 +1,178 @@
+import os
+import statistics
+import time
+from typing import Callable
+
+from constants.configuration import (
+    FIELD_CACHE_MAX_MB,
+    GIF_INTERVAL_TIME,
+    MP4_FPS,
+    SUBSET_HALO,
+    VERTICAL_COORDINATE,
+    VERTICAL_INTERPOLATION,
+    chunked_loading,
+    log_p_interpolation,
+    subset_extraction,
+    validate_interpolation,
+)
+from figure.maker.template import FrameTemplate
+from figure.property.fig_property import FigureProperties
+from figure.property.plot_spec import build_default_plot_spec
+from gif.gif import imgs_to_gif
+from mp4.video import imgs_to_mp4
+from render.frame import (
+    build_chunked_reader,
+    build_vertical_levels,
+    render_frame,
+)
+from wrfout.handler.extraction import VariableExtractor
+from wrfout.handler.type import CrossSection
+from wrfout.loader.nc_dataset import WrfoutNetcdfDataset
+
+STAGES = ("load", "extract", "draw", "gif", "mp4", "end_to_end")
+
+
+def time_runs(func: Callable[[], object], repeat: int) -> dict:
+    """Call func repeat times and summarize the wall-clock seconds."""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    return {
+        "runs": seconds,
+        "min": min(seconds),
+        "median": statistics.median(seconds),
+        "max": max(seconds),
+    }
+
+
+class PipelineBenchmark:
+    """Stages of the drawing pipeline run on one wrfout file.
+
+    Each stage starts from fresh objects, so no field extracted or figure
+    drawn by a previous run is reused, except by the draw stage, which
+    reads the fields extracted by prepare() to time the drawing alone. The
+    section disk cache is never used.
+    """
+
+    def __init__(
+        self, wrfout_path: str, section: CrossSection, work_dir: str
+    ) -> None:
+        self._wrfout_path = wrfout_path
+        self._section = section
+        self._imgs_dir = os.path.join(work_dir, "img")
+        self._spec = build_default_plot_spec()
+        self._props = FigureProperties(self._spec)
+        self._vertical_levels = build_vertical_levels()
+        self._drawing_extractor: VariableExtractor | None = None
+        os.makedirs(self._imgs_dir, exist_ok=True)
+
+    def prepare(self, stage: str) -> None:
+        """Set up what a stage reads without being timed: the extracted
+        fields for drawing and the saved images for encoding."""
+        self._validate(stage)
+        if stage in ("draw", "gif", "mp4") and self._drawing_extractor is None:
+            self._drawing_extractor = self._create_extractor()
+            self._extract(self._drawing_extractor)
+        if stage in ("gif", "mp4") and not any(
+            name.endswith(".jpg") for name in os.listdir(self._imgs_dir)
+        ):
+            self._run_draw()
+
+    def run(self, stage: str) -> None:
+        self._validate(stage)
+        getattr(self, f"_run_{stage}")()
+
+    def close(self) -> None:
+        if self._drawing_extractor is not None:
+            self._drawing_extractor.loader.dataset.close()
+            self._drawing_extractor = None
+
+    def _validate(self, stage: str) -> None:
+        if stage not in STAGES:
+            raise ValueError(f"Invalid stage: {stage}. Choose from {STAGES}.")
+
+    def _create_extractor(self) -> VariableExtractor:
+        loader = WrfoutNetcdfDataset(self._wrfout_path)
+        extractor = VariableExtractor(
+            loader=loader,
+            cache_max_bytes=FIELD_CACHE_MAX_MB * 2**20,
+            subset_halo=(
+                SUBSET_HALO if subset_extraction or chunked_loading else None
+            ),
+            interpolation=VERTICAL_INTERPOLATION,
+            log_p_interpolation=log_p_interpolation,
+            validate_interpolation=validate_interpolation,
+            chunked_reader=build_chunked_reader(),
+        )
+        extractor.share_window(
+            [(self._section.start_point, self._section.end_point)]
+        )
+        return extractor
+
+    def _extract(self, extractor: VariableExtractor) -> None:
+        for datetime in extractor.loader.datetime_index_map:
+            for varname in self._spec.varnames:
+                extractor.get_var_array(
+                    varname=varname,
+                    datetime=datetime,
+                    start_point=self._section.start_point,
+                    end_point=self._section.end_point,
+                    vertical_coord=VERTICAL_COORDINATE,
+                    levels=self._vertical_levels,
+                    waypoints=self._section.via_points,
+                )
+
+    def _draw(self, extractor: VariableExtractor) -> None:
+        template = FrameTemplate(self._props)
+        try:
+            for datetime in extractor.loader.datetime_index_map:
+                render_frame(
+                    extractor,
+                    self._props,
+                    datetime,
+                    self._section,
+                    self._vertical_levels,
+                    self._imgs_dir,
+                    template,
+                )
+        finally:
+            template.close()
+
+    def _run_load(self) -> None:
+        loader = WrfoutNetcdfDataset(self._wrfout_path)
+        loader.load()
+        loader.dataset.close()
+
+    def _run_extract(self) -> None:
+        extractor = self._create_extractor()
+        self._extract(extractor)
+        extractor.loader.dataset.close()
+
+    def _run_draw(self) -> None:
+        if self._drawing_extractor is None:
+            raise ValueError("Fields not extracted. Call prepare() first.")
+        self._draw(self._drawing_extractor)
+
+    def _run_gif(self) -> None:
+        imgs_to_gif(
+            imgs_dir_path=self._imgs_dir,
+            saved_gif_path=os.path.join(self._imgs_dir, "benchmark.gif"),
+            gif_interval_time=GIF_INTERVAL_TIME,
+        )
+
+    def _run_mp4(self) -> None:
+        imgs_to_mp4(
+            imgs_dir_path=self._imgs_dir,
+            saved_mp4_path=os.path.join(self._imgs_dir, "benchmark.mp4"),
+            fps=MP4_FPS,
+            extension="jpg",
+        )
+
+    def _run_end_to_end(self) -> None:
+        extractor = self._create_extractor()
+        self._draw(extractor)
+        extractor.loader.dataset.close()
+        self._run_gif()
+        self._run_mp4()
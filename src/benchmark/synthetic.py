@@ -0,0 +1,311 @@
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+import netCDF4 as nc
+import numpy as np
+from wrf import xy_to_ll_proj
+
+WRF_DATETIME_FORMAT = "%Y-%m-%d_%H:%M:%S"
+
+# Lambert conformal projection of the synthetic domain
+TRUELAT1 = 30.0
+TRUELAT2 = 60.0
+STAND_LON = 130.0
+CEN_LAT = 33.7
+CEN_LON = 130.8
+MODEL_TOP = 20000.0  # [m]
+
+
+class SyntheticGrid(NamedTuple):
+    """Size of a synthetic wrfout file."""
+
+    nx: int
+    ny: int
+    nz: int
+    nt: int
+    dx: float = 3000.0  # [m]
+    interval_min: int = 10
+
+
+# grid sizes benchmarked by default, up to a typical regional domain
+GRID_PRESETS = {
+    "small": SyntheticGrid(nx=60, ny=50, nz=30, nt=4),
+    "medium": SyntheticGrid(nx=200, ny=200, nz=40, nt=6),
+    "large": SyntheticGrid(nx=400, ny=400, nz=50, nt=8),
+}
+
+
+def generate_wrfout(
+    path: str,
+    grid: SyntheticGrid,
+    start: datetime = datetime(2022, 7, 28, 0),
+) -> None:
+    """Write a synthetic wrfout file readable by wrf-python.
+
+    The file has the global attributes, the staggered grids and the
+    variables diagnosed by the drawn products (th, rh, td, uvmet, ua, va,
+    wa, z, p, ter and wv_flux), filled with smooth fields over a bell
+    shaped mountain at the center of the domain.
+
+    Args:
+        path (str): Path of the written file.
+        grid (SyntheticGrid): Size of the file.
+        start (datetime, optional): Datetime of the first timestep.
+    """
+    nx, ny, nz, nt = grid.nx, grid.ny, grid.nz, grid.nt
+    times = [
+        start + timedelta(minutes=grid.interval_min * t) for t in range(nt)
+    ]
+    dataset = nc.Dataset(path, mode="w")
+    dataset.setncatts(
+        {
+            "TITLE": " OUTPUT FROM WRF V4.4 MODEL",
+            "START_DATE": start.strftime(WRF_DATETIME_FORMAT),
+            "SIMULATION_START_DATE": start.strftime(WRF_DATETIME_FORMAT),
+            "WEST-EAST_GRID_DIMENSION": np.int32(nx + 1),
+            "SOUTH-NORTH_GRID_DIMENSION": np.int32(ny + 1),
+            "BOTTOM-TOP_GRID_DIMENSION": np.int32(nz + 1),
+            "DX": np.float32(grid.dx),
+            "DY": np.float32(grid.dx),
+            "DT": np.float32(10.0),
+            "GRID_ID": np.int32(1),
+            "PARENT_ID": np.int32(0),
+            "I_PARENT_START": np.int32(1),
+            "J_PARENT_START": np.int32(1),
+            "PARENT_GRID_RATIO": np.int32(1),
+            "MAP_PROJ": np.int32(1),
+            "MAP_PROJ_CHAR": "Lambert Conformal",
+            "TRUELAT1": np.float32(TRUELAT1),
+            "TRUELAT2": np.float32(TRUELAT2),
+            "STAND_LON": np.float32(STAND_LON),
+            "CEN_LAT": np.float32(CEN_LAT),
+            "CEN_LON": np.float32(CEN_LON),
+            "MOAD_CEN_LAT": np.float32(CEN_LAT),
+            "POLE_LAT": np.float32(90.0),
+            "POLE_LON": np.float32(0.0),
+        }
+    )
+    for name, size in (
+        ("Time", None),
+        ("DateStrLen", 19),
+        ("west_east", nx),
+        ("south_north", ny),
+        ("bottom_top", nz),
+        ("west_east_stag", nx + 1),
+        ("south_north_stag", ny + 1),
+        ("bottom_top_stag", nz + 1),
+    ):
+        dataset.createDimension(name, size)
+
+    # time
+    times_var = dataset.createVariable("Times", "S1", ("Time", "DateStrLen"))
+    times_var[:] = np.array(
+        [list(time.strftime(WRF_DATETIME_FORMAT)) for time in times],
+        dtype="S1",
+    )
+    since = f"minutes since {start:%Y-%m-%d %H:%M:%S}"
+    _write_variable(
+        dataset,
+        "XTIME",
+        ("Time",),
+        np.arange(nt) * grid.interval_min,
+        since,
+        since,
+    )
+
+    # horizontal coordinates
+    lat, lon = _latlon(grid, np.arange(nx), np.arange(ny))
+    lat_u, lon_u = _latlon(grid, np.arange(nx + 1) - 0.5, np.arange(ny))
+    lat_v, lon_v = _latlon(grid, np.arange(nx), np.arange(ny + 1) - 0.5)
+    mass_dims = ("Time", "south_north", "west_east")
+    u_dims = ("Time", "south_north", "west_east_stag")
+    v_dims = ("Time", "south_north_stag", "west_east")
+    for varname, dims, values, description, units, stagger in (
+        ("XLAT", mass_dims, lat, "LATITUDE", "degree_north", ""),
+        ("XLONG", mass_dims, lon, "LONGITUDE", "degree_east", ""),
+        ("XLAT_U", u_dims, lat_u, "LATITUDE", "degree_north", "X"),
+        ("XLONG_U", u_dims, lon_u, "LONGITUDE", "degree_east", "X"),
+        ("XLAT_V", v_dims, lat_v, "LATITUDE", "degree_north", "Y"),
+        ("XLONG_V", v_dims, lon_v, "LONGITUDE", "degree_east", "Y"),
+        ("SINALPHA", mass_dims, np.zeros((ny, nx)), "SINE", "", ""),
+        ("COSALPHA", mass_dims, np.ones((ny, nx)), "COSINE", "", ""),
+    ):
+        _write_variable(
+            dataset,
+            varname,
+            dims,
+            np.broadcast_to(values, (nt, *values.shape)),
+            description,
+            units,
+            stagger,
+        )
+
+    # terrain and vertical structure
+    y, x = np.mgrid[0:ny, 0:nx]
+    terrain = 800.0 * np.exp(
+        -(((x - nx / 2) / (nx / 6)) ** 2 + ((y - ny / 2) / (ny / 6)) ** 2)
+    )
+    eta = np.linspace(1.0, 0.0, nz + 1)[:, None, None]
+    z_stag = terrain + (MODEL_TOP - terrain) * (1 - eta) ** 1.3
+    z_mass = 0.5 * (z_stag[1:] + z_stag[:-1])
+    pressure = 100000.0 * np.exp(-z_mass / 8000.0)
+    base_pressure = 0.9 * pressure
+    phase = np.arange(nt)[:, None, None, None]
+    _write_variable(
+        dataset,
+        "HGT",
+        mass_dims,
+        np.broadcast_to(terrain, (nt, ny, nx)),
+        "Terrain Height",
+        "m",
+    )
+
+    # atmospheric fields changing with time
+    mass_3d = ("Time", "bottom_top", "south_north", "west_east")
+    w_dims = ("Time", "bottom_top_stag", "south_north", "west_east")
+    u = 5.0 + 0.002 * z_mass
+    u = np.concatenate([u[:, :, :1], u], axis=2)
+    v = 2.0 * np.sin(np.arange(nx) / 7.0) * np.ones((nz, ny + 1, nx))
+    for varname, dims, values, description, units, stagger in (
+        (
+            "T",
+            mass_3d,
+            -5.0 + 0.004 * z_mass + 0.5 * np.sin(x / 5.0 + phase / 3.0),
+            "perturbation potential temperature (theta-t0)",
+            "K",
+            "",
+        ),
+        (
+            "P",
+            mass_3d,
+            pressure - base_pressure + 10.0 * phase,
+            "perturbation pressure",
+            "Pa",
+            "",
+        ),
+        (
+            "PB",
+            mass_3d,
+            np.broadcast_to(base_pressure, (nt, nz, ny, nx)),
+            "BASE STATE PRESSURE",
+            "Pa",
+            "",
+        ),
+        (
+            "PH",
+            w_dims,
+            np.zeros((nt, nz + 1, ny, nx)) + phase,
+            "perturbation geopotential",
+            "m2 s-2",
+            "Z",
+        ),
+        (
+            "PHB",
+            w_dims,
+            np.broadcast_to(9.81 * z_stag, (nt, nz + 1, ny, nx)),
+            "base-state geopotential",
+            "m2 s-2",
+            "Z",
+        ),
+        (
+            "QVAPOR",
+            mass_3d,
+            0.016
+            * np.exp(-z_mass / 2500.0)
+            * (1 + 0.1 * np.cos(y / 4.0 + phase)),
+            "Water vapor mixing ratio",
+            "kg kg-1",
+            "",
+        ),
+        (
+            "U",
+            ("Time", "bottom_top", "south_north", "west_east_stag"),
+            u + phase,
+            "x-wind component",
+            "m s-1",
+            "X",
+        ),
+        (
+            "V",
+            ("Time", "bottom_top", "south_north_stag", "west_east"),
+            np.broadcast_to(v, (nt, nz, ny + 1, nx)),
+            "y-wind component",
+            "m s-1",
+            "Y",
+        ),
+        (
+            "W",
+            w_dims,
+            0.3 * np.sin(x / 6.0 + phase) * np.ones((nt, nz + 1, ny, nx)),
+            "z-wind component",
+            "m s-1",
+            "Z",
+        ),
+    ):
+        _write_variable(
+            dataset, varname, dims, values, description, units, stagger
+        )
+    dataset.close()
+
+
+def domain_center_section(
+    grid: SyntheticGrid,
+) -> tuple[float, float, float, float]:
+    """Return (LAT_START, LAT_END, LON_START, LON_END) of a west-east
+    section over the mountain, spanning the middle half of the domain.
+    """
+    lat, lon = _latlon(
+        grid, np.array([grid.nx / 4, 3 * grid.nx / 4]), np.array([grid.ny / 2])
+    )
+    lat_center = round(float(lat.mean()), 2)
+    return (
+        lat_center,
+        lat_center,
+        round(float(lon[0, 0]), 2),
+        round(float(lon[0, 1]), 2),
+    )
+
+
+def _latlon(
+    grid: SyntheticGrid, xs: np.ndarray, ys: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    x, y = np.meshgrid(xs, ys)
+    lat, lon = xy_to_ll_proj(
+        x.ravel(),
+        y.ravel(),
+        meta=False,
+        map_proj=1,
+        truelat1=TRUELAT1,
+        truelat2=TRUELAT2,
+        stand_lon=STAND_LON,
+        ref_lat=CEN_LAT,
+        ref_lon=CEN_LON,
+        known_x=(grid.nx - 1) / 2,
+        known_y=(grid.ny - 1) / 2,
+        dx=grid.dx,
+        dy=grid.dx,
+    )
+    return lat.reshape(x.shape), lon.reshape(x.shape)
+
+
+def _write_variable(
+    dataset: nc.Dataset,
+    varname: str,
+    dims: tuple[str, ...],
+    values: np.ndarray,
+    description: str,
+    units: str,
+    stagger: str = "",
+) -> None:
+    variable = dataset.createVariable(varname, "f4", dims)
+    variable.FieldType = np.int32(104)
+    variable.MemoryOrder = {1: "0  ", 3: "XY ", 4: "XYZ"}[len(dims)]
+    variable.description = description
+    variable.units = units
+    variable.stagger = stagger
+    if len(dims) > 1:
+        variable.coordinates = {
+            "X": "XLONG_U XLAT_U XTIME",
+            "Y": "XLONG_V XLAT_V XTIME",
+        }.get(stagger, "XLONG XLAT XTIME")
+    variable[:] = values
@@ -0,0 +1,21 @@
+import shutil
+import sys
+
+from constants.configuration import SECTION_CACHE_DIR, SECTION_CACHE_MAX_MB
+from util.path import generate_path
+from wrfout.handler.disk_cache import cleanup_section_cache
+
+
+def main():
+    cache_dir = generate_path(SECTION_CACHE_DIR)
+    # "--all" deletes the whole cache, otherwise trim it to the size limit
+    if "--all" in sys.argv[1:]:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        print(f"Deleted {cache_dir}")
+        return
+    removed = cleanup_section_cache(cache_dir, SECTION_CACHE_MAX_MB * 2**20)
+    print(f"Removed {removed} entries from {cache_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,67 @@ from wrfout.handler.type import VertivalCoordinate
 
 # Configuration file for plotting WRF data
 
+### wrfout files
+# path from the project root directory.
+# a glob pattern or a list of paths combines the files written
+# per hour or per day into one time series.
+WRFOUT_PATHS = "/data/wrfout/high_20220728_d02"
+# maximum number of wrfout files kept open at the same time
+MAX_OPEN_WRFOUT_FILES = 4
+# time window of the figures in JST, "YYYY-MM-DD hh:mm" (None: from the
+# first or to the last output)
+TIME_START: str | None = None
+TIME_END: str | None = None
+# draw every Nth output in the window
+TIME_STRIDE = 1
+
+### watch mode
+# keep polling the wrfout files (and the files matching the glob pattern)
+# for the timesteps appended by a running simulation, and draw them as
+# they are written. the frames are drawn in the main process. the gif is
+# updated after every poll, and the mp4 completed when watching ends
+# (after no timestep is added for WATCH_IDLE_MIN, or with Ctrl+C).
+watch_wrfout = False
+# seconds between polls
+WATCH_INTERVAL_SEC = 60
+# minutes without a new timestep before watching ends
+WATCH_IDLE_MIN = 30
+# polls at which a failed frame is tried again before it is given up
+WATCH_RETRIES = 3
+
+### wrfout information
+# write the dimensions, attributes and variables of the wrfout file to
+# data/information, read from its header only. skipped while the file is
+# newer than the wrfout file.
+output_wrfout_info = True
+# write it in another process while drawing
+wrfout_info_in_background = True
+
 ### start and end points of vertical cross section ###
-# set start point at left and end point at right.
+# the start point is drawn at left and the end point at right.
 LAT_START = 33.7
 LAT_END = 33.7
 LON_START = 130.5
 LON_END = 131.1
+# [(lat, lon), ...] of the points passed through between the start and
+# end points, e.g. along a valley or a flight track. empty for a straight
+# section.
+WAYPOINTS: list[tuple[float, float]] = []
+# several sections drawn in one run, replacing the section above.
+# {name: (LAT_START, LAT_END, LON_START, LON_END)} or
+# {name: (LAT_START, LAT_END, LON_START, LON_END, WAYPOINTS)}
+# the fields of each timestep are read once for all the sections.
+CROSS_SECTIONS: dict[str, tuple] = {}
+
+### time-height sections
+# {name: (lat, lon)} of the points, e.g. stations, whose grid columns are
+# drawn against time over the whole time window, for each product. the
+# columns of all the points are read together for all the times, without
+# reading the rest of the domain. empty for none.
+COLUMN_POINTS: dict[str, tuple[float, float]] = {}
+# also save the columns interpolated onto the levels to a netCDF file per
+# point
+save_column_arrays = True
 
 ### vertical axis ###
 VERTICAL_COORDINATE = VertivalCoordinate.HEIGHT  # PRESSURE or HEIGHT
@@ -67,10 +122,108 @@ VECTOR_COLOR = "lightslategray"
 vector_legend_plot = True
 VECTOR_LEDEND_VALUE = 5
 VECTOR_LEDEND_SIZE = 8
-VECTOR_LEGEND_NAME = f"{VECTOR_LEDEND_VALUE} " + r"[$\mathrm{m\,s^{-1}}$]"
+# the label reads "<VECTOR_LEDEND_VALUE> <VECTOR_LEGEND_UNIT>"
+VECTOR_LEGEND_UNIT = r"[$\mathrm{m\,s^{-1}}$]"
+
+### products
+# several products drawn in one run, replacing the product above.
+# each one overrides the settings above by their lowercase names
+# (U_VEXTOR_VARNAME -> u_vector_varname, VECTOR_LEDEND_VALUE ->
+# vector_legend_value) and needs a name, which names its directory.
+# e.g. {"name": "wv_flux_qv", "shade_varname": "wv_flux",
+#       "shade_max": 300, "shade_min": 0, "shade_interval": 10,
+#       "cbar_unit": "[g kg$^{-1}$ m s$^{-1}$]", "contour_varname": "QVAPOR",
+#       "contour_multiplier": 1000, "contour_max": 20, "vector_plot": False}
+# the variables shared by the products are extracted once per timestep.
+PLOT_SPECS: list[dict] = []
+
+### temporal aggregates
+# draw statistics of the sections over time windows instead of every
+# timestep, computed in one pass that holds only running statistics:
+# "mean", "var", "std", "min", "max", "sum" (accumulation) or percentiles
+# such as "p90" (estimated with the P² algorithm). the products keep their
+# settings, so e.g. "std" may need a product with its own shade range.
+# each window is a frame labelled by its start. empty for none.
+AGGREGATE_STATISTICS: list[str] = []
+# length [min] of the windows, starting from the first time drawn
+AGGREGATE_WINDOW_MIN = 360
+# minutes between the starts of consecutive windows: the length for
+# tumbling windows, shorter for sliding ones (e.g. 60 for 6-hour means
+# every hour)
+AGGREGATE_STEP_MIN = 360
+
+### extraction
+# number of timesteps extracted and interpolated together
+# (1: every timestep separately, 0: all times at once)
+EXTRACTION_BLOCK_SIZE = 1
+# memory budget [MB] for extracted fields reused within a frame
+FIELD_CACHE_MAX_MB = 1024
+# read and diagnose only the grid columns around the section
+# (used when EXTRACTION_BLOCK_SIZE is 1)
+subset_extraction = True
+# number of grid points read around the section
+SUBSET_HALO = 2
+# vertical interpolation: "wrf" (wrf.interplevel) or "numpy" (all columns
+# at once, sharing the search of the levels between the variables)
+VERTICAL_INTERPOLATION = "numpy"
+# interpolate linearly in log-p on the pressure coordinate
+log_p_interpolation = False
+# check every "numpy" interpolation against wrf-python (slow)
+validate_interpolation = False
+
+### chunked loading
+# read the wrfout files lazily with xarray and dask, chunked by time and
+# by horizontal tiles, so only the chunks around the sections are read
+# (also for EXTRACTION_BLOCK_SIZE other than 1), e.g. for domains whose
+# fields do not fit in memory. the windows of SUBSET_HALO are always used.
+chunked_loading = False
+# grid points of a horizontal chunk along each axis
+CHUNK_SIZE = 200
+# memory ceiling [MB] of the values read at once. blocks of timesteps are
+# shortened to fit in it.
+CHUNKED_MEMORY_MAX_MB = 1024
+
+### on-disk cache of cross sections
+# reuse extracted cross sections across runs (e.g. after styling changes)
+use_section_cache = True
+# relative path from the root directory
+SECTION_CACHE_DIR = "/cache/sections"
+# storage precision ("float64", "float32", "float16" or "int16")
+# (below float64 the figures may slightly differ from uncached ones)
+SECTION_CACHE_STORAGE = "float64"
+# size limit [MB]; the least recently used entries are deleted beyond it
+SECTION_CACHE_MAX_MB = 2048
+
+### parallel rendering
+# number of processes drawing figures (1: draw in the main process)
+RENDER_WORKERS = 1
+# extract the fields in the main process and pass them to the drawing
+# processes through shared memory, instead of each process reading the
+# wrfout files itself
+shared_memory_transport = False
+# number of timesteps held in shared memory at once
+SHARED_MEMORY_BUFFERS = 4
+
+### run report
+# record the time and memory of each stage and frame, and write them to
+# run_report.json and run_report.txt in the image directory of the run
+save_run_report = True
+
+### incremental rendering
+# skip the frames whose wrfout file, section and settings are unchanged
+# since the last run (recorded in manifest.json of each directory), and
+# remake the gif and mp4 only when a frame changed. the images are then
+# always saved.
+incremental_render = True
 
 ### gif and mp4
+# save every frame as a jpg image (always saved with parallel rendering)
+save_jpg = True
 GIF_INTERVAL_TIME = 300
+# encode the gif while drawing (False: from the saved images at the end)
+stream_gif = True
 GIF_NAME = "vertical_cross_section"
 MP4_FPS = 4.0
+# encode the mp4 while drawing (False: from the saved images at the end)
+stream_mp4 = True
 MP4_NAME = "vertical_cross_section"
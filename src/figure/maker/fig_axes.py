@@ -1,21 +1,11 @@
 import os
 
+import matplotlib.image as mimage
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mticker
 import numpy as np
 import xarray as xr
-from constants.configuration import (
-    CBAR_UNIT,
-    CONTOUR_COLOR,
-    TITLE_SIZE,
-    VECTOR_COLOR,
-    VECTOR_LEDEND_VALUE,
-    VECTOR_LEGEND_NAME,
-    VECTOR_REDUCTION_SCALE,
-    Y_LEVELS_BOTTOM,
-    Y_LEVELS_TOP,
-    plot_contour_label,
-)
+from constants.configuration import TITLE_SIZE, Y_LEVELS_BOTTOM, Y_LEVELS_TOP
 from constants.constant import (
     CBAR_EXTENTION,
     CBAR_LABEL_LOCATION,
@@ -34,14 +24,21 @@ from constants.constant import (
 )
 from figure.property.fig_property import FigureProperties
 from matplotlib.axes import Axes
+from matplotlib.contour import QuadContourSet
 from matplotlib.figure import Figure
+from matplotlib.quiver import Quiver, QuiverKey
 from mpl_toolkits.axes_grid1 import make_axes_locatable
+from util.instrumentation import instrumented
 
 
 class FigureAxesController:
     def __init__(self, ax: Axes, props: FigureProperties) -> None:
         self.ax = ax
         self._props = props
+        self.shade: QuadContourSet | None = None
+        self.contour: QuadContourSet | None = None
+        self.vector: Quiver | None = None
+        self.vector_key: QuiverKey | None = None
 
     def plot_shading(
         self,
@@ -61,22 +58,24 @@ class FigureAxesController:
     def plot_colorbar(self, is_auto_ticks=True) -> None:
         divider = make_axes_locatable(self.ax)
         cax = divider.append_axes("right", size="5%", pad=0.2, axes_class=Axes)
-        plt.gcf().add_axes(cax)
+        # the figure of the axes, since several figures may be open
+        fig = self.ax.get_figure()
+        fig.add_axes(cax)
         if is_auto_ticks:
-            self.cbar = plt.colorbar(
+            self.cbar = fig.colorbar(
                 self.shade, cax=cax, orientation="vertical"
             )
         else:
             ticks = mticker.IndexLocator(
                 base=CBAR_TICKS_BASE, offset=CBAR_TICKS_INTERVAL
             )
-            self.cbar = plt.colorbar(
+            self.cbar = fig.colorbar(
                 self.shade, cax=cax, ticks=ticks, orientation="vertical"
             )
 
     def set_cbar_label(self) -> None:
         self.cbar.set_label(
-            CBAR_UNIT,
+            self._props.spec.cbar_unit,
             labelpad=CBAR_LABEL_LOCATION,
             y=1.08,
             rotation=0,
@@ -92,9 +91,9 @@ class FigureAxesController:
             array,
             levels=self._props.contour_levels,
             linewidths=CONTOUR_WIDTH,
-            colors=CONTOUR_COLOR,
+            colors=self._props.spec.contour_color,
         )
-        if plot_contour_label:
+        if self._props.spec.plot_contour_label:
             self.ax.clabel(
                 self.contour,
                 levels=self._props.clabel_levels,
@@ -114,8 +113,8 @@ class FigureAxesController:
             y_coord,
             u_component,
             v_component,
-            scale=VECTOR_REDUCTION_SCALE,
-            color=VECTOR_COLOR,
+            scale=self._props.spec.vector_reduction_scale,
+            color=self._props.spec.vector_color,
             width=VECTOR_WIDTH,
             headwidth=VECTOR_HEADWIDTH,
             headlength=VECTOR_HEADLENGTH,
@@ -123,16 +122,24 @@ class FigureAxesController:
         )
 
     def plot_legend_vector(self) -> None:
-        self.ax.quiverkey(
+        self.vector_key = self.ax.quiverkey(
             self.vector,
             0.92,
             -0.08,
-            VECTOR_LEDEND_VALUE,
-            VECTOR_LEGEND_NAME,
+            self._props.spec.vector_legend_value,
+            self._props.spec.vector_legend_label,
             labelpos="E",
             coordinates="axes",
         )
 
+    def remove_data_artists(self) -> None:
+        """Remove the shade, contour and vector drawn for a frame, keeping
+        the colorbar, ticks, labels and terrain."""
+        for artist in (self.shade, self.contour, self.vector, self.vector_key):
+            if artist is not None:
+                artist.remove()
+        self.shade = self.contour = self.vector = self.vector_key = None
+
     def fill_terrain_area(
         self, x_coord: np.ndarray, area_array: np.ndarray
     ) -> None:
@@ -181,3 +188,13 @@ class FigureAxesController:
         os.makedirs(save_dir, exist_ok=True)
         out_path = os.path.join(save_dir, filename)
         fig.savefig(out_path, dpi=dpi)
+
+    @instrumented("save")
+    def save_canvas(
+        self, rgba: np.ndarray, save_dir: str, filename: str, dpi: int
+    ) -> None:
+        """Save the already drawn RGBA canvas, which gives the same image
+        as save_figure without drawing the figure again."""
+        os.makedirs(save_dir, exist_ok=True)
+        out_path = os.path.join(save_dir, filename)
+        mimage.imsave(out_path, rgba, dpi=dpi)
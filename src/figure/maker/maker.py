@@ -1,16 +1,9 @@
+from typing import Sequence
+
 import matplotlib.pyplot as plt
 import numpy as np
 import xarray as xr
-from constants.configuration import (
-    CONTOUR_ADDITION,
-    CONTOUR_MULTIPLIER,
-    SHADE_ADDITION,
-    SHADE_MULTIPLIER,
-    VECTOR_X_SPARSITY,
-    VECTOR_Y_SPARSITY,
-    X_TICKS_INTERVAL,
-    vector_legend_plot,
-)
+from constants.configuration import X_TICKS_INTERVAL
 from constants.constant import (
     DECIMAL_PLACES,
     VAR_INFO_XLOCATION,
@@ -38,12 +31,16 @@ class Drawer:
         y: np.ndarray,
         array: xr.DataArray,
         var_description: str,
+        draw_static: bool = True,
     ) -> None:
         ax.plot_shading(
             x,
             y,
-            array * SHADE_MULTIPLIER + SHADE_ADDITION,
+            array * self._props.spec.shade_multiplier
+            + self._props.spec.shade_addition,
         )
+        if not draw_static:
+            return
         ax.plot_colorbar(is_auto_ticks=cbar_auto_ticks)
         ax.set_cbar_label()
         ax.plot_text(
@@ -59,12 +56,16 @@ class Drawer:
         y: np.ndarray,
         array: xr.DataArray,
         var_description: str,
+        draw_static: bool = True,
     ) -> None:
         ax.plot_contour(
             x,
             y,
-            array * CONTOUR_MULTIPLIER + CONTOUR_ADDITION,
+            array * self._props.spec.contour_multiplier
+            + self._props.spec.contour_addition,
         )
+        if not draw_static:
+            return
         ax.plot_text(
             VAR_INFO_XLOCATION,
             VAR_INFO_YLOCATION - 0.03,
@@ -79,17 +80,20 @@ class Drawer:
         u_component: np.ndarray,
         v_component: np.ndarray,
         var_description: str,
+        draw_static: bool = True,
     ) -> None:
+        x_sparsity = self._props.spec.vector_x_sparsity
+        y_sparsity = self._props.spec.vector_y_sparsity
         ax.plot_vector(
-            x[::VECTOR_X_SPARSITY],
-            y[::VECTOR_Y_SPARSITY],
-            u_component[::VECTOR_Y_SPARSITY, ::VECTOR_X_SPARSITY]
-            * VECTOR_X_MULTIPLIER,
-            v_component[::VECTOR_Y_SPARSITY, ::VECTOR_X_SPARSITY]
-            * VECTOR_Y_MULTIPLIER,
+            x[::x_sparsity],
+            y[::y_sparsity],
+            u_component[::y_sparsity, ::x_sparsity] * VECTOR_X_MULTIPLIER,
+            v_component[::y_sparsity, ::x_sparsity] * VECTOR_Y_MULTIPLIER,
         )
-        if vector_legend_plot:
+        if self._props.spec.vector_legend_plot:
             ax.plot_legend_vector()
+        if not draw_static:
+            return
         ax.plot_text(
             VAR_INFO_XLOCATION,
             VAR_INFO_YLOCATION - 0.06,
@@ -102,14 +106,15 @@ class Drawer:
         x_ticks_labels: xr.DataArray,
         start_point: CoordPair,
         end_point: CoordPair,
+        waypoints: Sequence[CoordPair] = (),
     ) -> None:
-        if start_point.lat == end_point.lat:
+        if _has_constant(start_point, end_point, waypoints, "lat"):
             label = [
                 round(pair.lon, DECIMAL_PLACES)
                 for pair in to_np(x_ticks_labels)
             ]
             rotation = 0
-        elif start_point.lon == end_point.lon:
+        elif _has_constant(start_point, end_point, waypoints, "lon"):
             label = [
                 round(pair.lat, DECIMAL_PLACES)
                 for pair in to_np(x_ticks_labels)
@@ -133,10 +138,11 @@ class Drawer:
         start_point: CoordPair,
         end_point: CoordPair,
         vert_coord: VertivalCoordinate,
+        waypoints: Sequence[CoordPair] = (),
     ) -> None:
-        if start_point.lat == end_point.lat:
+        if _has_constant(start_point, end_point, waypoints, "lat"):
             ax.set_x_label("Longitude")
-        elif start_point.lon == end_point.lon:
+        elif _has_constant(start_point, end_point, waypoints, "lon"):
             ax.set_x_label("Latitude")
         else:
             ax.set_x_label("Latitude, Longitude")
@@ -144,3 +150,16 @@ class Drawer:
             ax.set_y_label("Pressure [hPa]")
         else:
             ax.set_y_label("Height [m]")
+
+
+def _has_constant(
+    start_point: CoordPair,
+    end_point: CoordPair,
+    waypoints: Sequence[CoordPair],
+    coord: str,
+) -> bool:
+    # whether the section runs along a parallel ("lat") or meridian ("lon")
+    return all(
+        getattr(point, coord) == getattr(start_point, coord)
+        for point in (*waypoints, end_point)
+    )
@@ -0,0 +1,31 @@
+import matplotlib.pyplot as plt
+from figure.maker.fig_axes import FigureAxesController
+from figure.maker.maker import Drawer
+from figure.property.fig_property import FigureProperties
+
+
+class FrameTemplate:
+    """Figure reused for every frame of an animation.
+
+    The colorbar, ticks, axis labels, variable descriptions and terrain
+    are drawn with the first frame only. The following frames replace the
+    shade, contour and vector artists and the title.
+    """
+
+    def __init__(self, props: FigureProperties) -> None:
+        self.drawer = Drawer(props)
+        self.target_ax = FigureAxesController(ax=self.drawer.ax, props=props)
+        self._is_built = False
+
+    @property
+    def is_built(self) -> bool:
+        return self._is_built
+
+    def begin_frame(self) -> None:
+        self.target_ax.remove_data_artists()
+
+    def end_frame(self) -> None:
+        self._is_built = True
+
+    def close(self) -> None:
+        plt.close(self.drawer.fig)
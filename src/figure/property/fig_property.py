@@ -1,22 +1,14 @@
 import matplotlib.pyplot as plt
 import numpy as np
-from constants.configuration import (
-    COLOR_MAP_NAME,
-    CONTOUR_INTERVAL,
-    CONTOUR_LABEL_INTERVAL,
-    CONTOUR_MAX,
-    CONTOUR_MIN,
-    FIG_SIZE,
-    SHADE_INTERVAL,
-    SHADE_MAX,
-    SHADE_MIN,
-)
+from constants.configuration import FIG_SIZE
 from constants.constant import WHITE_PART_NUM_FROM_MIDDLE, paint_all
+from figure.property.plot_spec import PlotSpec, build_default_plot_spec
 from matplotlib.colors import Colormap, ListedColormap
 
 
 class FigureProperties:
-    def __init__(self) -> None:
+    def __init__(self, spec: PlotSpec | None = None) -> None:
+        self.spec = spec if spec is not None else build_default_plot_spec()
         self.figsize = self._get_figsize()
         self.cbar_levels = self._get_cbar_levels()
         self.contour_levels = self._get_contour_levels()
@@ -28,31 +20,34 @@ class FigureProperties:
 
     def _get_cbar_levels(self) -> np.ndarray:
         return np.arange(
-            float(SHADE_MIN),
-            float(SHADE_MAX) + 0.000000000000001,
-            float(SHADE_INTERVAL),
+            float(self.spec.shade_min),
+            float(self.spec.shade_max) + 0.000000000000001,
+            float(self.spec.shade_interval),
         )
 
     def _get_contour_levels(self) -> np.ndarray:
         return np.arange(
-            float(CONTOUR_MIN),
-            float(CONTOUR_MAX) + 0.000000000000001,
-            float(CONTOUR_INTERVAL),
+            float(self.spec.contour_min),
+            float(self.spec.contour_max) + 0.000000000000001,
+            float(self.spec.contour_interval),
         )
 
     def _get_clabel_levels(self) -> np.ndarray:
         return np.arange(
-            float(CONTOUR_MIN),
-            float(CONTOUR_MAX) + 0.000000000000001,
-            float(CONTOUR_LABEL_INTERVAL),
+            float(self.spec.contour_min),
+            float(self.spec.contour_max) + 0.000000000000001,
+            float(self.spec.contour_label_interval),
         )
 
     def _get_color_map(self) -> Colormap | ListedColormap:
-        cmap = plt.get_cmap(COLOR_MAP_NAME).copy()
+        cmap = plt.get_cmap(self.spec.color_map_name).copy()
         cmap_array = cmap(np.arange(cmap.N))
         if paint_all:
             return cmap
-        number_of_color = int((SHADE_MAX - SHADE_MIN) / SHADE_INTERVAL)
+        number_of_color = int(
+            (self.spec.shade_max - self.spec.shade_min)
+            / self.spec.shade_interval
+        )
         interval = int(256 / number_of_color)
         c_under, c_over = (
             128 - interval * WHITE_PART_NUM_FROM_MIDDLE,
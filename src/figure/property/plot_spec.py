@@ -0,0 +1,153 @@
+from typing import NamedTuple
+
+from constants.configuration import (
+    CBAR_UNIT,
+    COLOR_MAP_NAME,
+    CONTOUR_ADDITION,
+    CONTOUR_COLOR,
+    CONTOUR_INTERVAL,
+    CONTOUR_LABEL_INTERVAL,
+    CONTOUR_MAX,
+    CONTOUR_MIN,
+    CONTOUR_MULTIPLIER,
+    CONTOUR_VARNAME,
+    PLOT_SPECS,
+    SHADE_ADDITION,
+    SHADE_INTERVAL,
+    SHADE_MAX,
+    SHADE_MIN,
+    SHADE_MULTIPLIER,
+    SHADE_VARNAME,
+    TITLE,
+    U_VEXTOR_VARNAME,
+    V_VEXTOR_VARNAME,
+    VECTOR_COLOR,
+    VECTOR_LEDEND_VALUE,
+    VECTOR_LEGEND_UNIT,
+    VECTOR_REDUCTION_SCALE,
+    VECTOR_X_SPARSITY,
+    VECTOR_Y_SPARSITY,
+    contour_plot,
+    plot_contour_label,
+    shade_plot,
+    vector_legend_plot,
+    vector_plot,
+)
+
+
+class PlotSpec(NamedTuple):
+    """Variables and styling of one product drawn on the sections."""
+
+    name: str
+    title: str
+    shade_plot: bool
+    shade_varname: str
+    shade_max: float
+    shade_min: float
+    shade_interval: float
+    shade_multiplier: float
+    shade_addition: float
+    color_map_name: str
+    cbar_unit: str
+    contour_plot: bool
+    contour_varname: str
+    contour_max: float
+    contour_min: float
+    contour_interval: float
+    contour_multiplier: float
+    contour_addition: float
+    contour_color: str
+    plot_contour_label: bool
+    contour_label_interval: float
+    vector_plot: bool
+    u_vector_varname: str
+    v_vector_varname: str
+    vector_x_sparsity: int
+    vector_y_sparsity: int
+    vector_reduction_scale: float
+    vector_color: str
+    vector_legend_plot: bool
+    vector_legend_value: float
+    vector_legend_unit: str
+
+    @property
+    def varnames(self) -> list[str]:
+        """Names of the variables extracted to draw the product."""
+        varnames = []
+        if self.shade_plot:
+            varnames.append(self.shade_varname)
+        if self.contour_plot:
+            varnames.append(self.contour_varname)
+        if self.vector_plot:
+            varnames += [self.u_vector_varname, self.v_vector_varname]
+        return list(dict.fromkeys(varnames))
+
+    @property
+    def vector_legend_label(self) -> str:
+        """Label of the vector legend, e.g. "5 [m s^-1]"."""
+        return f"{self.vector_legend_value} {self.vector_legend_unit}"
+
+
+def build_default_plot_spec() -> PlotSpec:
+    """Return the product set by the shade, contour and vector settings."""
+    # the name keeps the directory naming of a single product
+    name = ""
+    if shade_plot:
+        name += f"_{SHADE_VARNAME}"
+    if contour_plot:
+        name += f"_{CONTOUR_VARNAME}"
+    if vector_plot:
+        name += f"_{U_VEXTOR_VARNAME}"
+    return PlotSpec(
+        name=name,
+        title=TITLE,
+        shade_plot=shade_plot,
+        shade_varname=SHADE_VARNAME,
+        shade_max=SHADE_MAX,
+        shade_min=SHADE_MIN,
+        shade_interval=SHADE_INTERVAL,
+        shade_multiplier=SHADE_MULTIPLIER,
+        shade_addition=SHADE_ADDITION,
+        color_map_name=COLOR_MAP_NAME,
+        cbar_unit=CBAR_UNIT,
+        contour_plot=contour_plot,
+        contour_varname=CONTOUR_VARNAME,
+        contour_max=CONTOUR_MAX,
+        contour_min=CONTOUR_MIN,
+        contour_interval=CONTOUR_INTERVAL,
+        contour_multiplier=CONTOUR_MULTIPLIER,
+        contour_addition=CONTOUR_ADDITION,
+        contour_color=CONTOUR_COLOR,
+        plot_contour_label=plot_contour_label,
+        contour_label_interval=CONTOUR_LABEL_INTERVAL,
+        vector_plot=vector_plot,
+        u_vector_varname=U_VEXTOR_VARNAME,
+        v_vector_varname=V_VEXTOR_VARNAME,
+        vector_x_sparsity=VECTOR_X_SPARSITY,
+        vector_y_sparsity=VECTOR_Y_SPARSITY,
+        vector_reduction_scale=VECTOR_REDUCTION_SCALE,
+        vector_color=VECTOR_COLOR,
+        vector_legend_plot=vector_legend_plot,
+        vector_legend_value=VECTOR_LEDEND_VALUE,
+        vector_legend_unit=VECTOR_LEGEND_UNIT,
+    )
+
+
+def build_plot_specs() -> list[PlotSpec]:
+    default = build_default_plot_spec()
+    if not PLOT_SPECS:
+        return [default]
+    specs: list[PlotSpec] = []
+    for overrides in PLOT_SPECS:
+        if "name" not in overrides:
+            raise ValueError("Each plot spec must have a name.")
+        unknown = set(overrides) - set(PlotSpec._fields)
+        if unknown:
+            raise ValueError(
+                f"Invalid plot spec keys: {sorted(unknown)}. Choose from {PlotSpec._fields}."
+            )
+        specs.append(default._replace(**overrides))
+    names = [spec.name for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError("Plot spec names must be unique.")
+    return specs
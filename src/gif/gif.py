@@ -1,8 +1,17 @@
+import os
+import shutil
 from glob import glob
+from types import TracebackType
+from typing import BinaryIO
 
-from PIL import Image
+import numpy as np
+from PIL import GifImagePlugin, Image
+from util.instrumentation import instrumented
 
+SIZE = (1200, 800)
 
+
+@instrumented("gif")
 def imgs_to_gif(
     imgs_dir_path: str,
     saved_gif_path: str,
@@ -10,7 +19,6 @@ def imgs_to_gif(
     gif_interval_time: int = 150,
 ) -> None:
 
-    SIZE = (1200, 800)
     img_paths = sorted(glob(f"{imgs_dir_path}/*.{extension}"))
 
     if not img_paths:
@@ -30,3 +38,108 @@ def imgs_to_gif(
         duration=gif_interval_time,
         loop=0,
     )
+
+
+class StreamingGifWriter:
+    """GIF writer encoding each frame as soon as it is appended.
+
+    Only the frame being encoded is held in memory. The file is written
+    next to the destination and moved there by close(), so an interrupted
+    run never leaves a truncated GIF behind.
+    """
+
+    def __init__(
+        self, saved_gif_path: str, gif_interval_time: int = 150
+    ) -> None:
+        self._saved_gif_path = saved_gif_path
+        self._tmp_path = f"{saved_gif_path}.{os.getpid()}.tmp"
+        self._gif_interval_time = gif_interval_time
+        self._file: BinaryIO | None = None
+        self._size: tuple[int, int] | None = None
+        self._n_frames = 0
+
+    @property
+    def n_frames(self) -> int:
+        return self._n_frames
+
+    @instrumented("gif")
+    def append(self, image: Image.Image) -> None:
+        frame = image.copy()
+        frame.thumbnail(SIZE)
+        self._write(frame)
+
+    @instrumented("gif")
+    def append_rgba(self, rgba: np.ndarray) -> None:
+        """Append a frame given as an RGBA array, e.g. the buffer of an Agg
+        canvas. The array is read without being copied.
+        """
+        height, width = rgba.shape[:2]
+        frame = Image.frombuffer(
+            "RGBA", (width, height), rgba, "raw", "RGBA", 0, 1
+        )
+        frame.thumbnail(SIZE)
+        self._write(frame)
+
+    def append_file(self, img_path: str) -> None:
+        with Image.open(img_path) as img:
+            self.append(img)
+
+    def _write(self, frame: Image.Image) -> None:
+        # the canvas size is fixed by the first frame
+        if self._size is not None and frame.size != self._size:
+            frame = frame.resize(self._size)
+        frame = frame.convert("RGB").convert(
+            "P", palette=Image.Palette.ADAPTIVE
+        )
+        if self._file is None:
+            os.makedirs(
+                os.path.dirname(os.path.abspath(self._saved_gif_path)),
+                exist_ok=True,
+            )
+            self._file = open(self._tmp_path, mode="wb")
+            self._size = frame.size
+            header, _ = GifImagePlugin.getheader(
+                frame, info={"loop": 0, "duration": self._gif_interval_time}
+            )
+            self._file.write(b"".join(header))
+        # every frame has its own palette, as with imgs_to_gif
+        for data in GifImagePlugin.getdata(
+            frame,
+            duration=self._gif_interval_time,
+            include_color_table=True,
+        ):
+            self._file.write(data)
+        self._n_frames += 1
+
+    @instrumented("gif")
+    def publish(self) -> None:
+        """Write the frames appended so far to the destination as a
+        complete GIF, while more frames can still be appended."""
+        if self._file is None:
+            return
+        self._file.flush()
+        snapshot_path = f"{self._saved_gif_path}.{os.getpid()}.snapshot"
+        shutil.copyfile(self._tmp_path, snapshot_path)
+        with open(snapshot_path, mode="ab") as f:
+            f.write(b";")
+        os.replace(snapshot_path, self._saved_gif_path)
+
+    @instrumented("gif")
+    def close(self) -> None:
+        if self._file is None:
+            return
+        self._file.write(b";")
+        self._file.close()
+        self._file = None
+        os.replace(self._tmp_path, self._saved_gif_path)
+
+    def __enter__(self) -> "StreamingGifWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
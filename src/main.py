@@ -1,310 +1,294 @@
-from pathlib import Path
-from typing import cast
-
-import matplotlib.pyplot as plt
-import numpy as np
-import xarray as xr
-from calculation.component_conversion import (
-    xy_components_to_cross_section_component,
-)
 from constants.configuration import (
-    CONTOUR_VARNAME,
-    GIF_INTERVAL_TIME,
-    GIF_NAME,
-    INTERPOLATION_INTERVAL,
-    LAT_END,
-    LAT_START,
-    LON_END,
-    LON_START,
-    MP4_FPS,
-    MP4_NAME,
-    SHADE_VARNAME,
-    TITLE,
-    U_VEXTOR_VARNAME,
-    V_VEXTOR_VARNAME,
-    VERTICAL_COORDINATE,
-    Y_LEVELS_BOTTOM,
-    Y_LEVELS_TOP,
-    contour_plot,
-    shade_plot,
-    vector_plot,
+    AGGREGATE_STATISTICS,
+    EXTRACTION_BLOCK_SIZE,
+    FIELD_CACHE_MAX_MB,
+    MAX_OPEN_WRFOUT_FILES,
+    RENDER_WORKERS,
+    SECTION_CACHE_DIR,
+    SECTION_CACHE_MAX_MB,
+    SHARED_MEMORY_BUFFERS,
+    SUBSET_HALO,
+    VERTICAL_INTERPOLATION,
+    WRFOUT_PATHS,
+    chunked_loading,
+    incremental_render,
+    log_p_interpolation,
+    output_wrfout_info,
+    save_column_arrays,
+    save_jpg,
+    save_run_report,
+    shared_memory_transport,
+    subset_extraction,
+    use_section_cache,
+    validate_interpolation,
+    watch_wrfout,
+    wrfout_info_in_background,
+)
+from figure.property.plot_spec import build_plot_specs
+from render.aggregate import (
+    aggregate_and_render,
+    build_aggregate_outputs,
+    build_aggregate_windows,
+)
+from render.frame import (
+    build_chunked_reader,
+    build_column_points,
+    build_cross_sections,
+    build_saving_dir,
+    build_saving_rootdir,
+    build_section_disk_cache,
+    build_time_window,
+    build_vertical_levels,
 )
-from constants.constant import IMAGE_DPI, TERRAIN_COLOR
-from figure.maker.fig_axes import FigureAxesController
-from figure.maker.maker import Drawer
-from figure.property.fig_property import FigureProperties
-from gif.gif import imgs_to_gif
-from mp4.video import imgs_to_mp4
-from time_relation.padding import PaddedDatetime
+from render.manifest import build_frame_keys
+from render.output import SectionOutput, render_timestep
+from render.parallel import render_frames_in_parallel
+from render.time_height import render_time_height_sections
+from render.watch import WrfoutWatcher, watch_and_render
+from util.instrumentation import RECORDER, ProgressLine
 from util.path import generate_path
-from wrf import CoordPair, to_np
+from wrfout.handler.columns import (
+    ColumnExtractor,
+    validate_column_variables,
+)
+from wrfout.handler.disk_cache import cleanup_section_cache
 from wrfout.handler.extraction import VariableExtractor
-from wrfout.handler.type import VectorComponent, VertivalCoordinate
 from wrfout.information.outputter import WrfoutInformationOutputter
-from wrfout.loader.nc_dataset import WrfoutNetcdfDataset
+from wrfout.loader.nc_series import create_loader, resolve_wrfout_paths
 
 
 def main():
-    # Specify the path to the Wrfout file
-    wrfout_path = generate_path("/data/wrfout/high_20220728_d02")
-
-    ### output the information of the Wrfout file
-    writer = WrfoutInformationOutputter(wrfout_path)
-    writer.output_to_file()
-
-    ### Vizualize
-    # create an instance for visualization
-    props = FigureProperties()
-
-    # create instances for variable extraction
-    loader = WrfoutNetcdfDataset(wrfout_path)
-    extractor = VariableExtractor(loader=loader)
-
-    # set latitude and longitude range
-    start_point = CoordPair(lat=LAT_START, lon=LON_START)
-    end_point = CoordPair(lat=LAT_END, lon=LON_END)
-
-    # set vertical levels
-    if VERTICAL_COORDINATE == VertivalCoordinate.PRESSURE:
-        vertical_levels = np.arange(
-            Y_LEVELS_BOTTOM, Y_LEVELS_TOP - 0.001, -INTERPOLATION_INTERVAL
-        )
-    elif VERTICAL_COORDINATE == VertivalCoordinate.HEIGHT:
-        vertical_levels = np.arange(
-            Y_LEVELS_BOTTOM, Y_LEVELS_TOP + 0.001, INTERPOLATION_INTERVAL
+    if watch_wrfout and RENDER_WORKERS > 1:
+        raise ValueError(
+            "Watch mode draws the frames in the main process. Set RENDER_WORKERS = 1."
         )
-    else:
+    if AGGREGATE_STATISTICS and (RENDER_WORKERS > 1 or watch_wrfout):
         raise ValueError(
-            "Invalid vertical coordinate type. Choose either 'PRESSURE' or 'HEIGHT'."
+            "Temporal aggregates are computed in the main process. Set RENDER_WORKERS = 1 and watch_wrfout = False."
         )
+    if save_run_report:
+        RECORDER.enable()
 
-    # plot at each datetime
-    for datetime in loader.datetime_index_map.keys():
-        print(f"Now making {datetime} figure …")
-        drawer = Drawer(props)
-        target_ax = FigureAxesController(ax=drawer.ax, props=props)
-
-        # shade plot
-        if shade_plot:
-            shade_array = extractor.get_var_array(
-                varname=SHADE_VARNAME,
-                datetime=datetime,
-                start_point=start_point,
-                end_point=end_point,
-                vertical_coord=VERTICAL_COORDINATE,
-                levels=vertical_levels,
-            )
-            # case of water vapor flux
-            if isinstance(shade_array, VectorComponent):
-                shade_array = cast(
-                    xr.DataArray, np.sqrt(shade_array.u**2 + shade_array.v**2)
-                )
-                description = "water vapor flux"
-            else:
-                description = shade_array.description
-
-            # get x, y coordinates
-            x_coord = np.arange(0, shade_array.shape[1], 1)
-            y_coord = to_np(shade_array.vertical)
-            x_ticks_labels = to_np(shade_array.xy_loc)
-
-            # panint terrain area for p-coord
-            if VERTICAL_COORDINATE == VertivalCoordinate.PRESSURE:
-                target_ax.ax.fill_between(
-                    x_coord, y_coord.min(), y_coord.max(), color=TERRAIN_COLOR
-                )
-
-            # plot shade
-            drawer.plot_shade(
-                target_ax,
-                x=x_coord,
-                y=y_coord,
-                array=shade_array,
-                var_description=description,
-            )
+    # Specify the paths to the Wrfout files
+    patterns = (
+        [WRFOUT_PATHS] if isinstance(WRFOUT_PATHS, str) else WRFOUT_PATHS
+    )
+    wrfout_patterns = [generate_path(pattern) for pattern in patterns]
+    wrfout_paths = resolve_wrfout_paths(wrfout_patterns)
+    wrfout_path = wrfout_paths[0]
 
-        # contour plot
-        if contour_plot:
-            contour_array = extractor.get_var_array(
-                varname=CONTOUR_VARNAME,
-                datetime=datetime,
-                start_point=start_point,
-                end_point=end_point,
-                vertical_coord=VERTICAL_COORDINATE,
-                levels=vertical_levels,
-            )
-            # case of water vapor flux
-            if isinstance(contour_array, VectorComponent):
-                contour_array = cast(
-                    xr.DataArray,
-                    np.sqrt(contour_array.u**2 + contour_array.v**2),
-                )
-                description = "water vapor flux"
-            else:
-                description = contour_array.description
+    ### output the information of the Wrfout file
+    info_process = None
+    if output_wrfout_info:
+        writer = WrfoutInformationOutputter(wrfout_path)
+        if wrfout_info_in_background:
+            info_process = writer.output_in_background()
+        else:
+            writer.output_to_file()
 
-            # get x, y coordinates
-            x_coord = np.arange(0, contour_array.shape[1], 1)
-            y_coord = to_np(contour_array.vertical)
-            x_ticks_labels = to_np(contour_array.xy_loc)
+    ### Vizualize
+    # set the cross sections and vertical levels
+    sections = build_cross_sections()
+    vertical_levels = build_vertical_levels()
 
-            # plot contour
-            drawer.plot_contour(
-                target_ax,
-                x=x_coord,
-                y=y_coord,
-                array=contour_array,
-                var_description=description,
-            )
+    # set the products drawn on every section
+    specs = build_plot_specs()
 
-        if vector_plot:
-            content = extractor.get_var_array(
-                varname=U_VEXTOR_VARNAME,
-                datetime=datetime,
-                start_point=start_point,
-                end_point=end_point,
-                vertical_coord=VERTICAL_COORDINATE,
-                levels=vertical_levels,
-            )
-            # case of water vapor flux
-            if isinstance(content, VectorComponent):
-                u_array = content.u
-                v_array = content.v
-                description = "horizontal water vapor flux"
-            # case of array containing u and v components
-            elif "u_v" in content.dims:
-                u_array = content[0, :, :]
-                v_array = content[1, :, :]
-                description = "horizontal and vertical wind"
-            # case of array containing only single component
-            else:
-                u_array = content
-                v_array = cast(
-                    xr.DataArray,
-                    extractor.get_var_array(
-                        varname=V_VEXTOR_VARNAME,
-                        datetime=datetime,
-                        start_point=start_point,
-                        end_point=end_point,
-                        vertical_coord=VERTICAL_COORDINATE,
-                        levels=vertical_levels,
-                    ),
-                )
-                description = "horizontal and vertical wind"
+    # the points of the time-height sections, drawn last, so their products
+    # are checked before drawing the sections
+    points = build_column_points()
+    if points:
+        validate_column_variables(
+            [varname for spec in specs for varname in spec.varnames]
+        )
 
-            # get x, y coordinates
-            x_coord = np.arange(0, u_array.shape[1], 1)
-            y_coord = to_np(u_array.vertical)
-            x_ticks_labels = to_np(u_array.xy_loc)
+    # create instances for variable extraction (with parallel rendering,
+    # the frames are drawn in the worker processes, which also extract
+    # their fields unless they are shared from this process)
+    loader = create_loader(
+        wrfout_paths,
+        MAX_OPEN_WRFOUT_FILES,
+        time_window=build_time_window(),
+        follow=watch_wrfout,
+    )
+    extractor = None
+    if RENDER_WORKERS > 1 and not shared_memory_transport:
+        loader.load()
+    else:
+        extractor = VariableExtractor(
+            loader=loader,
+            block_size=EXTRACTION_BLOCK_SIZE,
+            cache_max_bytes=FIELD_CACHE_MAX_MB * 2**20,
+            disk_cache=build_section_disk_cache(),
+            subset_halo=(
+                SUBSET_HALO if subset_extraction or chunked_loading else None
+            ),
+            interpolation=VERTICAL_INTERPOLATION,
+            log_p_interpolation=log_p_interpolation,
+            validate_interpolation=validate_interpolation,
+            chunked_reader=build_chunked_reader(),
+        )
+        extractor.share_window(
+            [
+                (section.start_point, section.end_point, *section.via_points)
+                for section in sections
+            ]
+        )
+    # the last record of a running simulation is drawn once it is written
+    watcher = None
+    if watch_wrfout and extractor is not None:
+        watcher = WrfoutWatcher(extractor, wrfout_patterns)
+        watcher.poll()
+    datetimes = loader.time_index.datetimes
 
-            # convert to cross-section component
-            x_component = xy_components_to_cross_section_component(
-                u_array,
-                v_array,
-                start_point,
-                end_point,
-            )
-            y_component = cast(
-                np.ndarray,
-                extractor.get_var_array(
-                    varname=V_VEXTOR_VARNAME,
-                    datetime=datetime,
-                    start_point=start_point,
-                    end_point=end_point,
-                    vertical_coord=VERTICAL_COORDINATE,
-                    levels=vertical_levels,
+    # the static parts of each figure are drawn once for all frames, and
+    # the frames unchanged since the last run are skipped
+    aggregate_outputs = {}
+    if AGGREGATE_STATISTICS:
+        # a frame per window of each statistic instead of each timestep
+        aggregate_outputs = build_aggregate_outputs(
+            wrfout_path, sections, specs
+        )
+        outputs = [
+            output
+            for statistic_outputs in aggregate_outputs.values()
+            for output in statistic_outputs
+        ]
+    else:
+        outputs = [
+            SectionOutput(
+                section,
+                spec,
+                build_saving_dir(wrfout_path, section, spec),
+                draw=RENDER_WORKERS == 1,
+                frame_keys=(
+                    build_frame_keys(loader, section, spec, vertical_levels)
+                    if incremental_render
+                    else None
                 ),
+                follow=watch_wrfout,
             )
+            for section in sections
+            for spec in specs
+        ]
+    n_skipped = sum(
+        not output.is_pending(datetime)
+        for output in outputs
+        for datetime in datetimes
+    )
+    if n_skipped:
+        print(f"Skipping {n_skipped} unchanged figures")
 
-            # plot vector
-            drawer.plot_vector(
-                target_ax,
-                x=x_coord,
-                y=y_coord,
-                u_component=x_component,
-                v_component=y_component,
-                var_description=description,
-            )
-
-        # reverse y-axis when p-coord
-        if VERTICAL_COORDINATE == VertivalCoordinate.PRESSURE:
-            target_ax.invert_yaxis()
-
-        # paint terrain area for h-coord
-        if VERTICAL_COORDINATE == VertivalCoordinate.HEIGHT:
-            terrain_array = extractor.get_terrain_array(
-                start_point=start_point,
-                end_point=end_point,
+    # plot at each datetime
+    if aggregate_outputs and extractor is not None:
+        print(
+            f"Now aggregating {len(datetimes)} timesteps over {len(aggregate_outputs)} statistics …"
+        )
+        failed = aggregate_and_render(
+            extractor,
+            aggregate_outputs,
+            datetimes,
+            build_aggregate_windows(datetimes[0]),
+            vertical_levels,
+            save_image=save_jpg,
+        )
+    elif RENDER_WORKERS > 1 or extractor is None:
+        print(f"Now making figures with {RENDER_WORKERS} workers …")
+        failed = render_frames_in_parallel(
+            wrfout_paths,
+            datetimes,
+            outputs,
+            vertical_levels,
+            workers=RENDER_WORKERS,
+            block_size=EXTRACTION_BLOCK_SIZE,
+            extractor=extractor,
+            n_buffers=SHARED_MEMORY_BUFFERS,
+        )
+    else:
+        failed = []
+        progress = ProgressLine(len(datetimes) * len(outputs) - n_skipped)
+        for datetime in datetimes:
+            drawn = [
+                output for output in outputs if output.is_pending(datetime)
+            ]
+            for output in outputs:
+                if not output.is_pending(datetime):
+                    output.add_skipped_frame(datetime)
+            if not drawn:
+                continue
+            # all sections and products of a timestep share the fields
+            errors = render_timestep(
+                extractor,
+                outputs,
+                datetime,
+                vertical_levels,
+                save_image=save_jpg or incremental_render,
             )
-            target_ax.fill_terrain_area(
-                x_coord=x_coord, area_array=terrain_array
+            for output, error in zip(outputs, errors):
+                if not output.is_pending(datetime):
+                    continue
+                if error is not None:
+                    progress.write(error)
+                    failed.append(
+                        (datetime, output.section.name, output.spec.name)
+                    )
+                    continue
+                output.add_drawn_frame(datetime)
+            progress.update(len(drawn), message=str(datetime))
+        progress.close()
+        # then the timesteps appended by the running simulation
+        if watcher is not None:
+            failed += watch_and_render(
+                watcher,
+                extractor,
+                outputs,
+                vertical_levels,
+                save_image=save_jpg or incremental_render,
+                incremental=incremental_render,
             )
+    if extractor is not None:
+        print(extractor.field_cache.summary())
+    if failed:
+        print(f"Failed to make {len(failed)} figures: {failed}")
 
-        # set ticks and labels
-        drawer.set_clean_lonlat_ticks(
-            target_ax,
-            x_ticks_labels=x_ticks_labels,
-            start_point=start_point,
-            end_point=end_point,
+    # make gif and mp4
+    for output in outputs:
+        output.close()
+
+    # time-height sections of the points over all the times, read from
+    # the columns of the points only
+    if points:
+        print(f"Now making time-height figures at {len(points)} points …")
+        column_extractor = ColumnExtractor(
+            loader,
+            points,
+            interpolation=VERTICAL_INTERPOLATION,
+            log_p_interpolation=log_p_interpolation,
+            validate_interpolation=validate_interpolation,
         )
-        drawer.set_xy_label(
-            target_ax,
-            start_point=start_point,
-            end_point=end_point,
-            vert_coord=VERTICAL_COORDINATE,
+        render_time_height_sections(
+            column_extractor,
+            specs,
+            vertical_levels,
+            wrfout_path,
+            save_arrays=save_column_arrays,
         )
 
-        # title
-        padded_dt = PaddedDatetime(datetime)
-        filename = f"{padded_dt.year}{padded_dt.month}{padded_dt.day}_{padded_dt.hour}{padded_dt.minute}JST.jpg"
-        saving_rootdir = generate_path(f"/img/{Path(wrfout_path).stem}")
-        if LAT_START == LAT_END:
-            section_location = f"{LON_START}-{LON_END}°E at {LAT_START}°N"
-        elif LON_START == LON_END:
-            section_location = f"{LAT_START}-{LAT_END}°N at {LON_START}°E"
-        else:
-            section_location = (
-                f"{LAT_START}°N,{LON_START}°E - {LAT_END}°N,{LON_END}°E"
-            )
-        title = f"{padded_dt.year}/{padded_dt.month}/{padded_dt.day} {padded_dt.hour}{padded_dt.minute}JST  {section_location}   {TITLE}"
-        if VERTICAL_COORDINATE == VertivalCoordinate.HEIGHT:
-            saving_dir = f"{saving_rootdir}/vertical/{LON_START}_{LON_END}_{LAT_START}_{LAT_END}/h_coord/"
-        else:
-            saving_dir = f"{saving_rootdir}/vertical/{LON_START}_{LON_END}_{LAT_START}_{LAT_END}/p_coord/"
-        target_ax.set_title(title)
-
-        # directory arrangement
-        if shade_plot:
-            saving_dir += f"_{SHADE_VARNAME}"
-        if contour_plot:
-            saving_dir += f"_{CONTOUR_VARNAME}"
-        if vector_plot:
-            saving_dir += f"_{U_VEXTOR_VARNAME}"
-        # save
-        target_ax.save_figure(
-            fig=drawer.fig,
-            save_dir=saving_dir,
-            filename=filename,
-            dpi=IMAGE_DPI,
+    # keep the on-disk cache within its size limit
+    if use_section_cache:
+        removed = cleanup_section_cache(
+            generate_path(SECTION_CACHE_DIR), SECTION_CACHE_MAX_MB * 2**20
         )
-        plt.cla()
-        plt.close()
+        if removed:
+            print(f"Removed {removed} old entries from the section cache")
+
+    # time and memory of each stage and frame
+    if save_run_report:
+        print(RECORDER.write_report(build_saving_rootdir(wrfout_path)))
+
+    if info_process is not None:
+        info_process.join()
 
-    # make gif
-    print("Now making gif …")
-    imgs_to_gif(
-        imgs_dir_path=saving_dir,
-        saved_gif_path=f"{saving_dir}/{GIF_NAME}.gif",
-        gif_interval_time=GIF_INTERVAL_TIME,
-    )
-    # make mp4
-    print("Now making mp4 …")
-    imgs_to_mp4(
-        imgs_dir_path=saving_dir,
-        saved_mp4_path=f"{saving_dir}/{MP4_NAME}.mp4",
-        fps=MP4_FPS,
-        extension="jpg",
-    )
     print("Successfully Completed!")
 
 
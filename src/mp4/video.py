@@ -1,8 +1,41 @@
+import os
 from glob import glob
+from types import TracebackType
 
 import cv2
+import numpy as np
+from util.instrumentation import instrumented
 
+# H.264 first, then MPEG-4 Part 2 where OpenCV is built without an H.264
+# encoder
+FOURCCS = ("avc1", "mp4v")
 
+
+def open_video_writer(
+    saved_mp4_path: str, fps: float, frame_size: tuple[int, int]
+) -> cv2.VideoWriter:
+    """Open a writer with the first codec of FOURCCS available.
+
+    Raises:
+        ValueError: If no codec can be opened.
+    """
+    for fourcc in FOURCCS:
+        writer = cv2.VideoWriter(
+            filename=saved_mp4_path,
+            apiPreference=cv2.CAP_FFMPEG,
+            fourcc=cv2.VideoWriter_fourcc(*fourcc),
+            fps=fps,
+            frameSize=frame_size,
+        )
+        if writer.isOpened():
+            return writer
+        writer.release()
+    raise ValueError(
+        f"Failed to open {saved_mp4_path} with any of the codecs {FOURCCS}."
+    )
+
+
+@instrumented("mp4")
 def imgs_to_mp4(
     imgs_dir_path: str,
     saved_mp4_path: str,
@@ -18,15 +51,79 @@ def imgs_to_mp4(
     height, width, _ = first_frame.shape
     SIZE = (width, height)
 
-    writer = cv2.VideoWriter(
-        filename=saved_mp4_path,
-        apiPreference=cv2.CAP_FFMPEG,
-        fourcc=cv2.VideoWriter_fourcc(*"avc1"),
-        fps=fps,
-        frameSize=SIZE,
-    )
+    writer = open_video_writer(saved_mp4_path, fps, SIZE)
 
     for img_path in img_paths:
         img = cv2.imread(img_path)
         writer.write(img)
     writer.release()
+
+
+class VideoFrameSink:
+    """MP4 writer fed with each frame as soon as it is drawn.
+
+    The RGBA canvas of the figure is converted into a reused BGR buffer
+    and handed to cv2.VideoWriter, so the frames are neither saved as
+    images nor decoded again.
+    """
+
+    def __init__(self, saved_mp4_path: str, fps: float) -> None:
+        self._saved_mp4_path = saved_mp4_path
+        self._fps = fps
+        self._writer: cv2.VideoWriter | None = None
+        self._bgr: np.ndarray | None = None
+        self._n_frames = 0
+
+    @property
+    def n_frames(self) -> int:
+        return self._n_frames
+
+    def _open(self, height: int, width: int) -> np.ndarray:
+        if self._bgr is None:
+            os.makedirs(
+                os.path.dirname(os.path.abspath(self._saved_mp4_path)),
+                exist_ok=True,
+            )
+            self._writer = open_video_writer(
+                self._saved_mp4_path, self._fps, (width, height)
+            )
+            self._bgr = np.empty((height, width, 3), dtype=np.uint8)
+        elif self._bgr.shape[:2] != (height, width):
+            raise ValueError(
+                f"Frame size {(height, width)} differs from the first frame {self._bgr.shape[:2]}."
+            )
+        return self._bgr
+
+    @instrumented("mp4")
+    def write_rgba(self, rgba: np.ndarray) -> None:
+        """Write a frame given as an RGBA array, e.g. the buffer of an Agg
+        canvas.
+        """
+        bgr = self._open(rgba.shape[0], rgba.shape[1])
+        cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR, dst=bgr)
+        self._writer.write(bgr)
+        self._n_frames += 1
+
+    @instrumented("mp4")
+    def write_file(self, img_path: str) -> None:
+        img = cv2.imread(img_path)
+        self._open(img.shape[0], img.shape[1])
+        self._writer.write(img)
+        self._n_frames += 1
+
+    @instrumented("mp4")
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+    def __enter__(self) -> "VideoFrameSink":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
@@ -0,0 +1,397 @@
+import traceback
+from datetime import datetime, timedelta
+from typing import Sequence
+
+import numpy as np
+import xarray as xr
+from constants.configuration import (
+    AGGREGATE_STATISTICS,
+    AGGREGATE_STEP_MIN,
+    AGGREGATE_WINDOW_MIN,
+    VERTICAL_COORDINATE,
+)
+from figure.property.plot_spec import PlotSpec
+from render.frame import build_saving_rootdir
+from render.output import SectionOutput, render_timestep
+from util.instrumentation import ProgressLine, instrumented
+from wrf import CoordPair
+from wrfout.handler.aggregation import (
+    AggregationWindow,
+    RunningStatistics,
+    SlidingWindows,
+    validate_statistics,
+)
+from wrfout.handler.extraction import VariableExtractor
+from wrfout.handler.geometry import CrossSectionGeometry
+from wrfout.handler.type import (
+    CrossSection,
+    VectorComponent,
+    VertivalCoordinate,
+)
+
+# suffix of the variables whose magnitude is drawn if they are vectors
+_MAGNITUDE = ":magnitude"
+
+
+def _base_varname(varname: str) -> str:
+    return varname.removesuffix(_MAGNITUDE)
+
+
+def build_aggregate_windows(origin: datetime) -> SlidingWindows:
+    return SlidingWindows(
+        origin,
+        length=timedelta(minutes=AGGREGATE_WINDOW_MIN),
+        step=timedelta(minutes=AGGREGATE_STEP_MIN),
+    )
+
+
+def build_aggregate_dir(
+    wrfout_path: str, section: CrossSection, spec: PlotSpec, statistic: str
+) -> str:
+    saving_rootdir = build_saving_rootdir(wrfout_path)
+    coord = (
+        "h_coord"
+        if VERTICAL_COORDINATE == VertivalCoordinate.HEIGHT
+        else "p_coord"
+    )
+    return f"{saving_rootdir}/aggregate/{section.name}/{coord}/{statistic}_{AGGREGATE_WINDOW_MIN}min/{spec.name}"
+
+
+def _aggregate_spec(spec: PlotSpec, statistic: str) -> PlotSpec:
+    # the shade and contour draw the statistic of the magnitude of a
+    # vector, and the vectors the mean of its components
+    return spec._replace(
+        title=f"{spec.title}, {statistic} over {AGGREGATE_WINDOW_MIN} min",
+        shade_varname=spec.shade_varname + _MAGNITUDE,
+        contour_varname=spec.contour_varname + _MAGNITUDE,
+    )
+
+
+def build_aggregate_outputs(
+    wrfout_path: str, sections: list[CrossSection], specs: list[PlotSpec]
+) -> dict[str, list[SectionOutput]]:
+    """Return the outputs of every product on every section for each
+    statistic of AGGREGATE_STATISTICS. Every window is drawn again in each
+    run."""
+    validate_statistics(AGGREGATE_STATISTICS)
+    return {
+        statistic: [
+            SectionOutput(
+                section,
+                _aggregate_spec(spec, statistic),
+                build_aggregate_dir(wrfout_path, section, spec, statistic),
+            )
+            for section in sections
+            for spec in specs
+        ]
+        for statistic in AGGREGATE_STATISTICS
+    }
+
+
+def _field_key(
+    varname: str,
+    start_point: CoordPair,
+    end_point: CoordPair,
+    waypoints: Sequence[CoordPair],
+) -> tuple:
+    return (
+        varname,
+        tuple(
+            (point.lat, point.lon)
+            for point in (start_point, *waypoints, end_point)
+        ),
+    )
+
+
+class SectionAggregates:
+    """Running statistics of the fields of the sections over one window.
+
+    Only the accumulators of the statistics are held, so the memory does
+    not grow with the number of timesteps of the window. The statistics of
+    a vector (VectorComponent or u_v) are those of its magnitude, as the
+    statistics of its components are not those of any field that existed
+    (e.g. the maxima of u and v overstate the maximum wind). Its components
+    are only averaged, for the vectors drawn.
+    """
+
+    def __init__(
+        self, window: AggregationWindow, statistics: Sequence[str]
+    ) -> None:
+        self.window = window
+        self.datetimes: list[datetime] = []
+        self._statistics = statistics
+        # "value" of a scalar, "u", "v" and "magnitude" of a vector
+        self._accumulators: dict[tuple, dict[str, RunningStatistics]] = {}
+        self._templates: dict[tuple, xr.DataArray | VectorComponent] = {}
+
+    def add(self, key: tuple, field: xr.DataArray | VectorComponent) -> None:
+        if isinstance(field, VectorComponent):
+            components = (field.u.values, field.v.values)
+        elif "u_v" in field.dims:
+            components = (field.values[0], field.values[1])
+        else:
+            components = None
+        values = (
+            {"value": field.values}
+            if components is None
+            else {
+                "u": components[0],
+                "v": components[1],
+                "magnitude": np.hypot(*components),
+            }
+        )
+        if key not in self._accumulators:
+            self._templates[key] = field
+            self._accumulators[key] = {
+                name: RunningStatistics(
+                    ["mean"] if name in ("u", "v") else self._statistics,
+                    component.shape,
+                )
+                for name, component in values.items()
+            }
+        for name, component in values.items():
+            self._accumulators[key][name].add(component)
+
+    def result(
+        self, key: tuple, statistic: str, magnitude: bool = False
+    ) -> xr.DataArray | VectorComponent:
+        """Return the statistic of a field, with the coordinates and
+        attributes of the field.
+
+        Args:
+            magnitude (bool, optional): Whether to return the statistic of
+                the magnitude of a vector, as a vector of the magnitude
+                along u (VectorComponent) or an array without u_v.
+                Otherwise a vector is the mean of its components.
+        """
+        if key not in self._accumulators:
+            raise KeyError(f"{key[0]} is not aggregated.")
+        template = self._templates[key]
+        accumulators = self._accumulators[key]
+        if "value" in accumulators:
+            return template.copy(data=accumulators["value"].result(statistic))
+        if magnitude:
+            values = accumulators["magnitude"].result(statistic)
+            if isinstance(template, VectorComponent):
+                return VectorComponent(
+                    template.u.copy(data=values),
+                    template.v.copy(data=np.zeros_like(values)),
+                )
+            return template[0].copy(data=values)
+        u = accumulators["u"].result("mean")
+        v = accumulators["v"].result("mean")
+        if isinstance(template, VectorComponent):
+            return VectorComponent(
+                template.u.copy(data=u), template.v.copy(data=v)
+            )
+        return template.copy(data=np.stack([u, v]))
+
+
+class AggregateReader:
+    """Statistic of the fields of the sections over one window.
+
+    It answers the calls render_frame makes to VariableExtractor with the
+    statistic instead of the field of a timestep, so the aggregates are
+    drawn as frames labelled by the start of their window. The variables
+    of the shade and contour (suffixed by _MAGNITUDE) give the statistic
+    of the magnitude of a vector, and those of the vectors its mean.
+    """
+
+    def __init__(
+        self,
+        extractor: VariableExtractor,
+        aggregates: SectionAggregates,
+        statistic: str,
+    ) -> None:
+        self._extractor = extractor
+        self._aggregates = aggregates
+        self._statistic = statistic
+
+    def get_var_array(
+        self,
+        varname: str,
+        datetime: datetime,
+        start_point: CoordPair,
+        end_point: CoordPair,
+        vertical_coord: VertivalCoordinate,
+        levels: np.ndarray,
+        waypoints: Sequence[CoordPair] = (),
+    ) -> xr.DataArray | VectorComponent:
+        return self._aggregates.result(
+            _field_key(
+                _base_varname(varname), start_point, end_point, waypoints
+            ),
+            self._statistic,
+            magnitude=varname.endswith(_MAGNITUDE),
+        )
+
+    def get_terrain_array(
+        self,
+        datetime: datetime,
+        start_point: CoordPair,
+        end_point: CoordPair,
+        waypoints: Sequence[CoordPair] = (),
+    ) -> np.ndarray:
+        # the terrain is that of the first timestep of the window
+        return self._extractor.get_terrain_array(
+            self._aggregates.datetimes[0], start_point, end_point, waypoints
+        )
+
+    def get_geometry(
+        self,
+        start_point: CoordPair,
+        end_point: CoordPair,
+        waypoints: Sequence[CoordPair] = (),
+    ) -> CrossSectionGeometry:
+        return self._extractor.get_geometry(start_point, end_point, waypoints)
+
+
+def _render_window(
+    extractor: VariableExtractor,
+    aggregates: SectionAggregates,
+    outputs: dict[str, list[SectionOutput]],
+    vertical_levels: np.ndarray,
+    save_image: bool,
+) -> list[tuple[datetime, str, str]]:
+    failed: list[tuple[datetime, str, str]] = []
+    start = aggregates.window.start
+    if not aggregates.datetimes:
+        print(
+            f"No timestep is extracted from {start} to {aggregates.window.end}"
+        )
+        return failed
+    for statistic, statistic_outputs in outputs.items():
+        errors = render_timestep(
+            AggregateReader(extractor, aggregates, statistic),
+            statistic_outputs,
+            start,
+            vertical_levels,
+            save_image=save_image,
+        )
+        for output, error in zip(statistic_outputs, errors):
+            if error is None:
+                output.add_drawn_frame(start)
+                continue
+            print(error)
+            failed.append((start, output.section.name, output.spec.name))
+    return failed
+
+
+@instrumented("aggregate")
+def _add_timestep(
+    extractor: VariableExtractor,
+    aggregates: list[SectionAggregates],
+    datetime: datetime,
+    sections: list[CrossSection],
+    varnames: dict[CrossSection, list[str]],
+    vertical_levels: np.ndarray,
+) -> None:
+    # all fields are extracted first, so a failed timestep is left out of
+    # every statistic
+    fields = {
+        _field_key(
+            varname, section.start_point, section.end_point, section.via_points
+        ): extractor.get_var_array(
+            varname=varname,
+            datetime=datetime,
+            start_point=section.start_point,
+            end_point=section.end_point,
+            vertical_coord=VERTICAL_COORDINATE,
+            levels=vertical_levels,
+            waypoints=section.via_points,
+        )
+        for section in sections
+        for varname in varnames[section]
+    }
+    for window_aggregates in aggregates:
+        for key, field in fields.items():
+            window_aggregates.add(key, field)
+        window_aggregates.datetimes.append(datetime)
+
+
+def aggregate_and_render(
+    extractor: VariableExtractor,
+    outputs: dict[str, list[SectionOutput]],
+    datetimes: list[datetime],
+    windows: SlidingWindows,
+    vertical_levels: np.ndarray,
+    save_image: bool = True,
+) -> list[tuple[datetime, str, str]]:
+    """Draw statistics of the sections over time windows in one pass.
+
+    The timesteps are extracted in order and added to the running
+    statistics of the windows containing them, and each window is drawn
+    and released as soon as a timestep past its end is reached. The
+    windows not covered by the timesteps at the end are left out.
+
+    Args:
+        outputs (dict[str, list[SectionOutput]]): Outputs of each
+            statistic.
+
+    Returns:
+        list[tuple[datetime, str, str]]: Starts of the windows, section
+            names and product names of the frames that failed.
+    """
+    statistics = list(outputs)
+    all_outputs = [
+        output
+        for statistic_outputs in outputs.values()
+        for output in statistic_outputs
+    ]
+    sections = list(dict.fromkeys(output.section for output in all_outputs))
+    varnames = {
+        section: list(
+            dict.fromkeys(
+                _base_varname(varname)
+                for output in all_outputs
+                if output.section == section
+                for varname in output.spec.varnames
+            )
+        )
+        for section in sections
+    }
+    intervals = extractor.loader.time_index.intervals_min
+    interval = timedelta(minutes=int(intervals[-1]) if len(intervals) else 0)
+
+    failed: list[tuple[datetime, str, str]] = []
+    opened: dict[AggregationWindow, SectionAggregates] = {}
+    progress = ProgressLine(len(datetimes))
+    for datetime in datetimes:
+        for window in [window for window in opened if window.end <= datetime]:
+            failed += _render_window(
+                extractor,
+                opened.pop(window),
+                outputs,
+                vertical_levels,
+                save_image,
+            )
+        containing = windows.containing(datetime)
+        for window in containing:
+            if window not in opened:
+                opened[window] = SectionAggregates(window, statistics)
+        try:
+            _add_timestep(
+                extractor,
+                [opened[window] for window in containing],
+                datetime,
+                sections,
+                varnames,
+                vertical_levels,
+            )
+        except Exception:
+            # the timestep is left out of the statistics
+            progress.write(traceback.format_exc())
+        progress.update(message=str(datetime))
+    progress.close()
+
+    # the windows up to the last timestep
+    for window, aggregates in opened.items():
+        if window.end > datetimes[-1] + interval:
+            print(
+                f"Left out the window from {window.start} to {window.end}, not covered by the wrfout files"
+            )
+            continue
+        failed += _render_window(
+            extractor, aggregates, outputs, vertical_levels, save_image
+        )
+    return failed
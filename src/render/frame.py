@@ -0,0 +1,493 @@
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Sequence, cast
+
+import numpy as np
+import xarray as xr
+from calculation.component_conversion import (
+    xy_components_to_cross_section_component,
+)
+from constants.configuration import (
+    CHUNK_SIZE,
+    CHUNKED_MEMORY_MAX_MB,
+    COLUMN_POINTS,
+    CROSS_SECTIONS,
+    INTERPOLATION_INTERVAL,
+    LAT_END,
+    LAT_START,
+    LON_END,
+    LON_START,
+    MAX_OPEN_WRFOUT_FILES,
+    SECTION_CACHE_DIR,
+    SECTION_CACHE_STORAGE,
+    TIME_END,
+    TIME_START,
+    TIME_STRIDE,
+    VERTICAL_COORDINATE,
+    WAYPOINTS,
+    Y_LEVELS_BOTTOM,
+    Y_LEVELS_TOP,
+    chunked_loading,
+    use_section_cache,
+)
+from constants.constant import IMAGE_DPI, TERRAIN_COLOR
+from figure.maker.fig_axes import FigureAxesController
+from figure.maker.maker import Drawer
+from figure.maker.template import FrameTemplate
+from figure.property.fig_property import FigureProperties
+from figure.property.plot_spec import PlotSpec
+from time_relation.padding import PaddedDatetime
+from util.instrumentation import RECORDER, instrumented
+from util.path import generate_path
+from wrf import to_np
+from wrfout.handler.disk_cache import SectionDiskCache
+from wrfout.handler.extraction import VariableExtractor
+from wrfout.handler.type import (
+    ColumnPoint,
+    CrossSection,
+    VectorComponent,
+    VertivalCoordinate,
+)
+from wrfout.loader.nc_chunked import ChunkedWrfoutReader
+from wrfout.loader.time_index import TimeWindow
+
+
+def build_vertical_levels() -> np.ndarray:
+    if VERTICAL_COORDINATE == VertivalCoordinate.PRESSURE:
+        return np.arange(
+            Y_LEVELS_BOTTOM, Y_LEVELS_TOP - 0.001, -INTERPOLATION_INTERVAL
+        )
+    elif VERTICAL_COORDINATE == VertivalCoordinate.HEIGHT:
+        return np.arange(
+            Y_LEVELS_BOTTOM, Y_LEVELS_TOP + 0.001, INTERPOLATION_INTERVAL
+        )
+    else:
+        raise ValueError(
+            "Invalid vertical coordinate type. Choose either 'PRESSURE' or 'HEIGHT'."
+        )
+
+
+def build_section_disk_cache() -> SectionDiskCache | None:
+    if not use_section_cache:
+        return None
+    return SectionDiskCache(
+        generate_path(SECTION_CACHE_DIR), storage=SECTION_CACHE_STORAGE
+    )
+
+
+def build_chunked_reader() -> ChunkedWrfoutReader | None:
+    if not chunked_loading:
+        return None
+    return ChunkedWrfoutReader(
+        chunk_size=CHUNK_SIZE,
+        max_bytes=CHUNKED_MEMORY_MAX_MB * 2**20,
+        max_open_files=MAX_OPEN_WRFOUT_FILES,
+    )
+
+
+def build_time_window() -> TimeWindow | None:
+    if TIME_START is None and TIME_END is None and TIME_STRIDE == 1:
+        return None
+    return TimeWindow(
+        start=(
+            datetime.fromisoformat(TIME_START)
+            if TIME_START is not None
+            else None
+        ),
+        end=datetime.fromisoformat(TIME_END) if TIME_END is not None else None,
+        stride=TIME_STRIDE,
+    )
+
+
+def build_cross_sections() -> list[CrossSection]:
+    if not CROSS_SECTIONS:
+        return [
+            CrossSection(
+                f"{LON_START}_{LON_END}_{LAT_START}_{LAT_END}",
+                LAT_START,
+                LAT_END,
+                LON_START,
+                LON_END,
+                tuple((lat, lon) for lat, lon in WAYPOINTS),
+            )
+        ]
+    sections = []
+    for name, points in CROSS_SECTIONS.items():
+        lat_start, lat_end, lon_start, lon_end, *waypoints = points
+        sections.append(
+            CrossSection(
+                name,
+                lat_start,
+                lat_end,
+                lon_start,
+                lon_end,
+                tuple(
+                    (lat, lon)
+                    for lat, lon in (waypoints[0] if waypoints else [])
+                ),
+            )
+        )
+    return sections
+
+
+def build_column_points() -> list[ColumnPoint]:
+    return [
+        ColumnPoint(name, lat, lon)
+        for name, (lat, lon) in COLUMN_POINTS.items()
+    ]
+
+
+def build_saving_rootdir(wrfout_path: str) -> str:
+    return generate_path(f"/img/{Path(wrfout_path).stem}")
+
+
+def build_saving_dir(
+    wrfout_path: str, section: CrossSection, spec: PlotSpec
+) -> str:
+    saving_rootdir = build_saving_rootdir(wrfout_path)
+    if VERTICAL_COORDINATE == VertivalCoordinate.HEIGHT:
+        saving_dir = f"{saving_rootdir}/vertical/{section.name}/h_coord/"
+    else:
+        saving_dir = f"{saving_rootdir}/vertical/{section.name}/p_coord/"
+
+    # directory arrangement
+    return saving_dir + spec.name
+
+
+def prefetch_fields(
+    extractor: VariableExtractor,
+    datetime: datetime,
+    section: CrossSection,
+    vertical_levels: np.ndarray,
+    varnames: list[str],
+) -> None:
+    """Extract the variables of all products once, so that drawing each
+    product reads them from the field cache.
+    """
+    for varname in varnames:
+        extractor.get_var_array(
+            varname=varname,
+            datetime=datetime,
+            start_point=section.start_point,
+            end_point=section.end_point,
+            vertical_coord=VERTICAL_COORDINATE,
+            levels=vertical_levels,
+            waypoints=section.via_points,
+        )
+
+
+def build_filename(datetime: datetime) -> str:
+    padded_dt = PaddedDatetime(datetime)
+    return f"{padded_dt.year}{padded_dt.month}{padded_dt.day}_{padded_dt.hour}{padded_dt.minute}JST.jpg"
+
+
+@instrumented("draw")
+def render_frame(
+    extractor: VariableExtractor,
+    props: FigureProperties,
+    datetime: datetime,
+    section: CrossSection,
+    vertical_levels: np.ndarray,
+    saving_dir: str,
+    template: FrameTemplate | None = None,
+    save_image: bool = True,
+    frame_consumers: Sequence[Callable[[np.ndarray], None]] = (),
+) -> str | None:
+    """Draw the figure of one timestep, save it and hand it to encoders.
+
+    Args:
+        template (FrameTemplate | None, optional): Figure shared by the
+            frames. Its static parts are drawn only with the first frame.
+            None draws the frame on a figure of its own.
+        save_image (bool, optional): Whether to save the frame as an image.
+        frame_consumers (Sequence[Callable[[np.ndarray], None]], optional):
+            Functions called with the RGBA canvas of the drawn frame, such
+            as the gif and mp4 encoders. The array is only valid during the
+            call.
+
+    Returns:
+        str | None: Path of the saved image, or None if it is not saved.
+    """
+    start_point, end_point = section.start_point, section.end_point
+    waypoints = section.via_points
+    own_template = template is None
+    if template is None:
+        template = FrameTemplate(props)
+    template.begin_frame()
+    draw_static = not template.is_built
+    drawer, target_ax = template.drawer, template.target_ax
+
+    x_coord, x_ticks_labels = _plot_fields(
+        extractor,
+        props.spec,
+        drawer,
+        target_ax,
+        datetime,
+        section,
+        vertical_levels,
+        draw_static,
+    )
+
+    if draw_static:
+        # reverse y-axis when p-coord
+        if VERTICAL_COORDINATE == VertivalCoordinate.PRESSURE:
+            target_ax.invert_yaxis()
+
+        # paint terrain area for h-coord
+        if VERTICAL_COORDINATE == VertivalCoordinate.HEIGHT:
+            terrain_array = extractor.get_terrain_array(
+                datetime=datetime,
+                start_point=start_point,
+                end_point=end_point,
+                waypoints=waypoints,
+            )
+            target_ax.fill_terrain_area(
+                x_coord=x_coord, area_array=terrain_array
+            )
+
+        # set ticks and labels
+        drawer.set_clean_lonlat_ticks(
+            target_ax,
+            x_ticks_labels=x_ticks_labels,
+            start_point=start_point,
+            end_point=end_point,
+            waypoints=waypoints,
+        )
+        drawer.set_xy_label(
+            target_ax,
+            start_point=start_point,
+            end_point=end_point,
+            vert_coord=VERTICAL_COORDINATE,
+            waypoints=waypoints,
+        )
+
+        # draw the fields again on the laid out axes (the colorbar shrinks
+        # them at draw time), so that the contour labels are placed as in
+        # the following frames
+        drawer.fig.draw_without_rendering()
+        template.begin_frame()
+        _plot_fields(
+            extractor,
+            props.spec,
+            drawer,
+            target_ax,
+            datetime,
+            section,
+            vertical_levels,
+            draw_static=False,
+        )
+
+    # title
+    padded_dt = PaddedDatetime(datetime)
+    if section.waypoints:
+        section_location = f"{section.lat_start}°N,{section.lon_start}°E - {section.lat_end}°N,{section.lon_end}°E via {len(section.waypoints)} waypoint(s)"
+    elif section.lat_start == section.lat_end:
+        section_location = (
+            f"{section.lon_start}-{section.lon_end}°E at {section.lat_start}°N"
+        )
+    elif section.lon_start == section.lon_end:
+        section_location = (
+            f"{section.lat_start}-{section.lat_end}°N at {section.lon_start}°E"
+        )
+    else:
+        section_location = f"{section.lat_start}°N,{section.lon_start}°E - {section.lat_end}°N,{section.lon_end}°E"
+    title = f"{padded_dt.year}/{padded_dt.month}/{padded_dt.day} {padded_dt.hour}{padded_dt.minute}JST  {section_location}   {props.spec.title}"
+    target_ax.set_title(title)
+
+    # draw once and share the canvas between the image and the encoders
+    # (the dpi is restored afterwards, as savefig does, since contour
+    # labels are placed in pixels when drawn)
+    figure_dpi = drawer.fig.dpi
+    drawer.fig.set_dpi(IMAGE_DPI)
+    with RECORDER.stage("canvas"):
+        drawer.fig.canvas.draw()
+    rgba = np.asarray(drawer.fig.canvas.buffer_rgba())
+    for consume in frame_consumers:
+        consume(rgba)
+
+    # save
+    img_path = None
+    if save_image:
+        filename = build_filename(datetime)
+        target_ax.save_canvas(
+            rgba, save_dir=saving_dir, filename=filename, dpi=IMAGE_DPI
+        )
+        img_path = os.path.join(saving_dir, filename)
+    drawer.fig.set_dpi(figure_dpi)
+    template.end_frame()
+    if own_template:
+        template.close()
+    return img_path
+
+
+def _plot_fields(
+    extractor: VariableExtractor,
+    spec: PlotSpec,
+    drawer: Drawer,
+    target_ax: FigureAxesController,
+    datetime: datetime,
+    section: CrossSection,
+    vertical_levels: np.ndarray,
+    draw_static: bool,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Plot the shade, contour and vector of one timestep.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: x coordinates and their labels.
+    """
+    start_point, end_point = section.start_point, section.end_point
+    waypoints = section.via_points
+
+    # shade plot
+    if spec.shade_plot:
+        shade_array = extractor.get_var_array(
+            varname=spec.shade_varname,
+            datetime=datetime,
+            start_point=start_point,
+            end_point=end_point,
+            vertical_coord=VERTICAL_COORDINATE,
+            levels=vertical_levels,
+            waypoints=waypoints,
+        )
+        # case of water vapor flux
+        if isinstance(shade_array, VectorComponent):
+            shade_array = cast(
+                xr.DataArray, np.sqrt(shade_array.u**2 + shade_array.v**2)
+            )
+            description = "water vapor flux"
+        else:
+            description = shade_array.description
+
+        # get x, y coordinates
+        x_coord = np.arange(0, shade_array.shape[1], 1)
+        y_coord = to_np(shade_array.vertical)
+        x_ticks_labels = to_np(shade_array.xy_loc)
+
+        # panint terrain area for p-coord
+        if draw_static and VERTICAL_COORDINATE == VertivalCoordinate.PRESSURE:
+            target_ax.ax.fill_between(
+                x_coord, y_coord.min(), y_coord.max(), color=TERRAIN_COLOR
+            )
+
+        # plot shade
+        drawer.plot_shade(
+            target_ax,
+            x=x_coord,
+            y=y_coord,
+            array=shade_array,
+            var_description=description,
+            draw_static=draw_static,
+        )
+
+    # contour plot
+    if spec.contour_plot:
+        contour_array = extractor.get_var_array(
+            varname=spec.contour_varname,
+            datetime=datetime,
+            start_point=start_point,
+            end_point=end_point,
+            vertical_coord=VERTICAL_COORDINATE,
+            levels=vertical_levels,
+            waypoints=waypoints,
+        )
+        # case of water vapor flux
+        if isinstance(contour_array, VectorComponent):
+            contour_array = cast(
+                xr.DataArray,
+                np.sqrt(contour_array.u**2 + contour_array.v**2),
+            )
+            description = "water vapor flux"
+        else:
+            description = contour_array.description
+
+        # get x, y coordinates
+        x_coord = np.arange(0, contour_array.shape[1], 1)
+        y_coord = to_np(contour_array.vertical)
+        x_ticks_labels = to_np(contour_array.xy_loc)
+
+        # plot contour
+        drawer.plot_contour(
+            target_ax,
+            x=x_coord,
+            y=y_coord,
+            array=contour_array,
+            var_description=description,
+            draw_static=draw_static,
+        )
+
+    if spec.vector_plot:
+        content = extractor.get_var_array(
+            varname=spec.u_vector_varname,
+            datetime=datetime,
+            start_point=start_point,
+            end_point=end_point,
+            vertical_coord=VERTICAL_COORDINATE,
+            levels=vertical_levels,
+            waypoints=waypoints,
+        )
+        # case of water vapor flux
+        if isinstance(content, VectorComponent):
+            u_array = content.u
+            v_array = content.v
+            description = "horizontal water vapor flux"
+        # case of array containing u and v components
+        elif "u_v" in content.dims:
+            u_array = content[0, :, :]
+            v_array = content[1, :, :]
+            description = "horizontal and vertical wind"
+        # case of array containing only single component
+        else:
+            u_array = content
+            v_array = cast(
+                xr.DataArray,
+                extractor.get_var_array(
+                    varname=spec.v_vector_varname,
+                    datetime=datetime,
+                    start_point=start_point,
+                    end_point=end_point,
+                    vertical_coord=VERTICAL_COORDINATE,
+                    levels=vertical_levels,
+                    waypoints=waypoints,
+                ),
+            )
+            description = "horizontal and vertical wind"
+
+        # get x, y coordinates
+        x_coord = np.arange(0, u_array.shape[1], 1)
+        y_coord = to_np(u_array.vertical)
+        x_ticks_labels = to_np(u_array.xy_loc)
+
+        # convert to the component along the section at each point
+        x_component = xy_components_to_cross_section_component(
+            u_array,
+            v_array,
+            extractor.get_geometry(
+                start_point, end_point, waypoints
+            ).along_track,
+        )
+        y_component = cast(
+            np.ndarray,
+            extractor.get_var_array(
+                varname=spec.v_vector_varname,
+                datetime=datetime,
+                start_point=start_point,
+                end_point=end_point,
+                vertical_coord=VERTICAL_COORDINATE,
+                levels=vertical_levels,
+                waypoints=waypoints,
+            ),
+        )
+
+        # plot vector
+        drawer.plot_vector(
+            target_ax,
+            x=x_coord,
+            y=y_coord,
+            u_component=x_component,
+            v_component=y_component,
+            var_description=description,
+            draw_static=draw_static,
+        )
+
+    return x_coord, x_ticks_labels
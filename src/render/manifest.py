@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import netCDF4 as nc
+import numpy as np
+from constants import constant
+from constants.configuration import (
+    CHUNK_SIZE,
+    EXTRACTION_BLOCK_SIZE,
+    FIG_SIZE,
+    SECTION_CACHE_STORAGE,
+    SUBSET_HALO,
+    TITLE_SIZE,
+    VERTICAL_COORDINATE,
+    VERTICAL_INTERPOLATION,
+    X_TICKS_INTERVAL,
+    Y_LEVELS_BOTTOM,
+    Y_LEVELS_TOP,
+    chunked_loading,
+    log_p_interpolation,
+    subset_extraction,
+    use_section_cache,
+)
+from figure.property.plot_spec import PlotSpec
+from util.file import atomic_write
+from wrfout.handler.type import CrossSection
+from wrfout.loader.nc_dataset import WrfoutNetcdfDataset
+from wrfout.loader.nc_series import WrfoutNetcdfSeries
+
+MANIFEST_NAME = "manifest.json"
+# bump when a code change alters the drawn frames
+MANIFEST_VERSION = 1
+
+
+def _hash(value: object) -> str:
+    serialized = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+def build_frame_keys(
+    loader: WrfoutNetcdfDataset | WrfoutNetcdfSeries,
+    section: CrossSection,
+    spec: PlotSpec,
+    vertical_levels: np.ndarray,
+    datetimes: list[datetime] | None = None,
+) -> dict[datetime, str]:
+    """Hash the inputs and settings of each frame of one output.
+
+    A frame keeps its key as long as its record (the path of its file,
+    the time and index of the record and the global attributes of the
+    file), section, product and the settings of the extraction and the
+    figure are unchanged. Records appended to a file by a running
+    simulation thus leave the keys of the earlier ones.
+
+    Args:
+        datetimes (list[datetime] | None, optional): Datetimes of the
+            frames hashed. None hashes all of them.
+
+    Returns:
+        dict[datetime, str]: Key of the frame of each datetime.
+    """
+    settings = _hash(
+        {
+            "version": MANIFEST_VERSION,
+            "section": section._asdict(),
+            "spec": spec._asdict(),
+            "vertical_coordinate": VERTICAL_COORDINATE,
+            "vertical_levels": vertical_levels.tolist(),
+            "figure": {
+                "FIG_SIZE": FIG_SIZE,
+                "TITLE_SIZE": TITLE_SIZE,
+                "X_TICKS_INTERVAL": X_TICKS_INTERVAL,
+                "Y_LEVELS_BOTTOM": Y_LEVELS_BOTTOM,
+                "Y_LEVELS_TOP": Y_LEVELS_TOP,
+            },
+            "constants": {
+                name: value
+                for name, value in vars(constant).items()
+                if not name.startswith("_")
+            },
+            # every setting of the extraction, as each may change the
+            # drawn fields (e.g. by rounding)
+            "extraction": {
+                "EXTRACTION_BLOCK_SIZE": EXTRACTION_BLOCK_SIZE,
+                "subset_extraction": subset_extraction,
+                "SUBSET_HALO": SUBSET_HALO,
+                "VERTICAL_INTERPOLATION": VERTICAL_INTERPOLATION,
+                "log_p_interpolation": log_p_interpolation,
+                "chunked_loading": chunked_loading,
+                "CHUNK_SIZE": CHUNK_SIZE,
+            },
+            # a lossy section cache may change the drawn fields
+            "storage": SECTION_CACHE_STORAGE if use_section_cache else None,
+        }
+    )
+    if datetimes is None:
+        datetimes = list(loader.datetime_index_map)
+    attributes: dict[str, dict[str, str]] = {}
+    keys = {}
+    for datetime in datetimes:
+        dataset, index = loader.locate(datetime)
+        path = os.path.abspath(loader.path_of(datetime))
+        if path not in attributes:
+            attributes[path] = {
+                name: str(dataset.getncattr(name))
+                for name in dataset.ncattrs()
+            }
+        keys[datetime] = _hash(
+            [
+                settings,
+                path,
+                _record_time(dataset, index),
+                index,
+                attributes[path],
+            ]
+        )
+    return keys
+
+
+def _record_time(dataset: nc.Dataset, index: int) -> str:
+    """Return the time of a record as written in its file."""
+    if "Times" in dataset.variables:
+        return b"".join(
+            np.asarray(dataset.variables["Times"][index], dtype="S1")
+        ).decode()
+    xtime = dataset.variables["XTIME"]
+    return f"{xtime[index]} {xtime.units}"
+
+
+class FrameManifest:
+    """Keys of the frames saved in a directory and of the gif and mp4 made
+    from them, kept in its manifest.json.
+
+    The file is rewritten after every frame, so an interrupted run resumes
+    from the frames it saved.
+    """
+
+    def __init__(self, saving_dir: str) -> None:
+        self._path = os.path.join(saving_dir, MANIFEST_NAME)
+        self._saving_dir = saving_dir
+        self._frames: dict[str, str] = {}
+        self._media: str | None = None
+        try:
+            with open(self._path) as f:
+                contents = json.load(f)
+            self._frames = dict(contents["frames"])
+            self._media = contents["media"]
+        except (OSError, KeyError, TypeError, ValueError):
+            # a missing or broken manifest makes every frame pending
+            pass
+
+    def is_current(self, filename: str, key: str) -> bool:
+        return self._frames.get(filename) == key and os.path.exists(
+            os.path.join(self._saving_dir, filename)
+        )
+
+    def record(self, filename: str, key: str) -> None:
+        self._frames[filename] = key
+        self.save()
+
+    def forget_others(self, filenames: list[str]) -> None:
+        """Drop the frames not in filenames, e.g. of removed timesteps."""
+        self._frames = {
+            filename: key
+            for filename, key in self._frames.items()
+            if filename in filenames
+        }
+
+    def media_key(self) -> str:
+        return _hash(sorted(self._frames.items()))
+
+    def is_media_current(self, media_paths: list[str]) -> bool:
+        return self._media == self.media_key() and all(
+            os.path.exists(path) for path in media_paths
+        )
+
+    def record_media(self) -> None:
+        self._media = self.media_key()
+        self.save()
+
+    def save(self) -> None:
+        os.makedirs(self._saving_dir, exist_ok=True)
+        with atomic_write(self._path) as f:
+            json.dump(
+                {"frames": self._frames, "media": self._media}, f, indent=2
+            )
@@ -0,0 +1,294 @@
+import os
+import traceback
+from datetime import datetime
+
+import numpy as np
+from constants.configuration import (
+    GIF_INTERVAL_TIME,
+    GIF_NAME,
+    MP4_FPS,
+    MP4_NAME,
+    stream_gif,
+    stream_mp4,
+)
+from figure.maker.template import FrameTemplate
+from figure.property.fig_property import FigureProperties
+from figure.property.plot_spec import PlotSpec
+from gif.gif import StreamingGifWriter
+from mp4.video import VideoFrameSink
+from render.frame import build_filename, prefetch_fields, render_frame
+from render.manifest import FrameManifest
+from util.instrumentation import RECORDER
+from wrfout.handler.extraction import VariableExtractor
+from wrfout.handler.type import CrossSection
+
+
+class SectionOutput:
+    """Output of one product on one section: its directory, figure
+    template, gif and mp4."""
+
+    def __init__(
+        self,
+        section: CrossSection,
+        spec: PlotSpec,
+        saving_dir: str,
+        draw: bool = True,
+        encode: bool = True,
+        frame_keys: dict[datetime, str] | None = None,
+        follow: bool = False,
+    ) -> None:
+        """
+        Args:
+            section (CrossSection): Section drawn.
+            spec (PlotSpec): Product drawn.
+            saving_dir (str): Directory of the images, gif and mp4.
+            draw (bool, optional): Whether the frames are drawn here. False
+                when they are drawn by worker processes.
+            encode (bool, optional): Whether the gif and mp4 are made here.
+                False in worker processes.
+            frame_keys (dict[datetime, str] | None, optional): Keys of the
+                frames (see build_frame_keys). Only the frames whose key
+                differs from that in the manifest of the directory are
+                drawn. None draws every frame without a manifest.
+            follow (bool, optional): Whether frames are added while
+                drawing (watch mode). The gif and mp4 are then always
+                encoded while drawing, taking the frames up to date from
+                their saved images (see add_skipped_frame).
+        """
+        self.section = section
+        self.spec = spec
+        self.saving_dir = saving_dir
+        self.props = FigureProperties(spec) if draw else None
+        self.template = FrameTemplate(self.props) if self.props else None
+        # datetimes of the frames to draw (None: all of them)
+        self.pending: set[datetime] | None = None
+        self._frame_keys = frame_keys
+        self._manifest: FrameManifest | None = None
+        self._drawn: list[datetime] = []
+        if frame_keys is not None and encode:
+            self._manifest = FrameManifest(saving_dir)
+            # the frames of records still held back are kept when following
+            if not follow:
+                self._manifest.forget_others(
+                    [build_filename(datetime) for datetime in frame_keys]
+                )
+            self.pending = {
+                datetime
+                for datetime, key in frame_keys.items()
+                if not self._manifest.is_current(build_filename(datetime), key)
+            }
+        # the gif and mp4 are encoded while drawing only if every frame is
+        # drawn, otherwise they are made from the saved images
+        stream = encode and (
+            follow
+            or self.pending is None
+            or len(self.pending) == len(frame_keys or {})
+        )
+        self._follow = follow
+        self.gif_writer = (
+            StreamingGifWriter(
+                f"{saving_dir}/{GIF_NAME}.gif",
+                gif_interval_time=GIF_INTERVAL_TIME,
+            )
+            if stream and stream_gif
+            else None
+        )
+        self.video_sink = (
+            VideoFrameSink(f"{saving_dir}/{MP4_NAME}.mp4", fps=MP4_FPS)
+            if stream and stream_mp4
+            else None
+        )
+        self._encode = encode
+        self.frame_consumers = []
+        if self.gif_writer is not None:
+            self.frame_consumers.append(self.gif_writer.append_rgba)
+        if self.video_sink is not None:
+            self.frame_consumers.append(self.video_sink.write_rgba)
+
+    def is_pending(self, datetime: datetime) -> bool:
+        return self.pending is None or datetime in self.pending
+
+    def add_drawn_frame(self, datetime: datetime) -> None:
+        """Record a frame drawn and saved in this run."""
+        self._drawn.append(datetime)
+        if self._manifest is not None and self._frame_keys is not None:
+            self._manifest.record(
+                build_filename(datetime), self._frame_keys[datetime]
+            )
+
+    def add_skipped_frame(self, datetime: datetime) -> None:
+        """Hand the saved image of a frame up to date to the gif and mp4
+        encoded while drawing, so that they hold every frame in order.
+        Only in follow mode, as they are otherwise made from the saved
+        images when some frames are up to date."""
+        if self._follow:
+            self.add_saved_frame(
+                os.path.join(self.saving_dir, build_filename(datetime))
+            )
+
+    def add_frames(
+        self,
+        datetimes: list[datetime],
+        frame_keys: dict[datetime, str] | None = None,
+    ) -> None:
+        """Add the frames of the timesteps appended to the wrfout files.
+
+        Args:
+            datetimes (list[datetime]): Datetimes of the frames.
+            frame_keys (dict[datetime, str] | None, optional): Keys of the
+                frames, as in the constructor.
+        """
+        if self._frame_keys is not None and frame_keys is not None:
+            self._frame_keys.update(frame_keys)
+        if self.pending is None:
+            return
+        self.pending.update(
+            datetime
+            for datetime in datetimes
+            if self._manifest is None
+            or frame_keys is None
+            or not self._manifest.is_current(
+                build_filename(datetime), frame_keys[datetime]
+            )
+        )
+
+    def publish(self) -> None:
+        """Write the gif drawn so far, while more frames can be added. The
+        mp4 is completed by close()."""
+        if self.gif_writer is not None:
+            self.gif_writer.publish()
+
+    def add_saved_frame(self, img_path: str) -> None:
+        if self.gif_writer is not None:
+            self.gif_writer.append_file(img_path)
+        if self.video_sink is not None:
+            self.video_sink.write_file(img_path)
+
+    def _frame_paths(self) -> list[str]:
+        """Return the saved images of the frames of this run in order: those
+        up to date in the manifest, or those drawn without a manifest.
+        Images left from runs over other times are not included."""
+        if self._manifest is not None and self._frame_keys is not None:
+            datetimes = [
+                datetime
+                for datetime, key in self._frame_keys.items()
+                if self._manifest.is_current(build_filename(datetime), key)
+            ]
+        else:
+            datetimes = self._drawn
+        return [
+            os.path.join(self.saving_dir, build_filename(datetime))
+            for datetime in sorted(datetimes)
+        ]
+
+    def close(self) -> None:
+        """Close the template and finish the gif and mp4. Those not encoded
+        while drawing are made from the saved images, unless no frame
+        changed since they were made.
+        """
+        if self.template is not None:
+            self.template.close()
+        if not self._encode:
+            return
+        media_paths = [
+            f"{self.saving_dir}/{GIF_NAME}.gif",
+            f"{self.saving_dir}/{MP4_NAME}.mp4",
+        ]
+        # in follow mode they are already being encoded
+        if (
+            self._manifest is not None
+            and not self._follow
+            and not self._drawn
+            and self._manifest.is_media_current(media_paths)
+        ):
+            print(f"No change in {self.section.name} {self.spec.name}")
+            return
+        # make gif
+        if self.gif_writer is not None:
+            self.gif_writer.close()
+        else:
+            print(f"Now making gif of {self.section.name} {self.spec.name} …")
+            with StreamingGifWriter(
+                f"{self.saving_dir}/{GIF_NAME}.gif",
+                gif_interval_time=GIF_INTERVAL_TIME,
+            ) as gif_writer:
+                for img_path in self._frame_paths():
+                    gif_writer.append_file(img_path)
+        # make mp4
+        if self.video_sink is not None:
+            self.video_sink.close()
+        else:
+            print(f"Now making mp4 of {self.section.name} {self.spec.name} …")
+            with VideoFrameSink(
+                f"{self.saving_dir}/{MP4_NAME}.mp4", fps=MP4_FPS
+            ) as video_sink:
+                for img_path in self._frame_paths():
+                    video_sink.write_file(img_path)
+        if self._manifest is not None:
+            self._manifest.record_media()
+
+
+def render_timestep(
+    extractor: VariableExtractor,
+    outputs: list[SectionOutput],
+    datetime: datetime,
+    vertical_levels: np.ndarray,
+    save_image: bool = True,
+) -> list[str | None]:
+    """Draw every product on every section at one timestep.
+
+    The variables needed by the products of a section are extracted once
+    before drawing them, so each product reads them from the field cache.
+    The outputs whose frame is not pending are skipped.
+
+    Returns:
+        list[str | None]: Traceback of each output that failed, None for
+            those drawn or skipped.
+    """
+    errors: list[str | None] = [None] * len(outputs)
+    for section in dict.fromkeys(output.section for output in outputs):
+        indices = [
+            index
+            for index, output in enumerate(outputs)
+            if output.section == section and output.is_pending(datetime)
+        ]
+        if not indices:
+            continue
+        varnames = list(
+            dict.fromkeys(
+                varname
+                for index in indices
+                for varname in outputs[index].spec.varnames
+            )
+        )
+        try:
+            prefetch_fields(
+                extractor, datetime, section, vertical_levels, varnames
+            )
+        except Exception:
+            # the products using the failed variable report it when drawn
+            pass
+        for index in indices:
+            output = outputs[index]
+            if output.props is None:
+                raise ValueError("The output is not drawn in this process.")
+            try:
+                with RECORDER.frame(
+                    datetime=str(datetime),
+                    section=output.section.name,
+                    product=output.spec.name,
+                ):
+                    render_frame(
+                        extractor,
+                        output.props,
+                        datetime,
+                        output.section,
+                        vertical_levels,
+                        output.saving_dir,
+                        output.template,
+                        save_image=save_image,
+                        frame_consumers=output.frame_consumers,
+                    )
+            except Exception:
+                errors[index] = traceback.format_exc()
+    return errors
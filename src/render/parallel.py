@@ -0,0 +1,349 @@
+import math
+import multiprocessing
+import os
+import traceback
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from multiprocessing.util import Finalize
+
+import matplotlib
+import numpy as np
+from constants.configuration import (
+    FIELD_CACHE_MAX_MB,
+    MAX_OPEN_WRFOUT_FILES,
+    SUBSET_HALO,
+    VERTICAL_INTERPOLATION,
+    chunked_loading,
+    log_p_interpolation,
+    subset_extraction,
+    validate_interpolation,
+)
+from figure.property.plot_spec import PlotSpec
+from render.frame import (
+    build_chunked_reader,
+    build_filename,
+    build_section_disk_cache,
+    build_time_window,
+)
+from render.output import SectionOutput, render_timestep
+from render.shared_fields import (
+    SharedFieldBuffers,
+    SharedFieldReader,
+    SharedTimestep,
+    detach_all,
+    extract_timestep_fields,
+)
+from util.instrumentation import RECORDER, ProgressLine
+from wrfout.handler.extraction import VariableExtractor
+from wrfout.handler.type import CrossSection
+from wrfout.loader.nc_series import create_loader
+
+# state of each worker process, set up once by _init_worker
+_extractor: VariableExtractor | None = None
+_outputs: list[SectionOutput] = []
+
+
+def _init_worker(
+    wrfout_paths: list[str],
+    block_size: int,
+    sections: list[CrossSection],
+    specs: list[PlotSpec],
+    saving_dirs: list[str],
+    pendings: list[set[datetime] | None],
+    record_run: bool,
+    shared: bool = False,
+) -> None:
+    global _extractor, _outputs
+    matplotlib.use("Agg")
+    if record_run:
+        RECORDER.enable()
+    _outputs = [
+        SectionOutput(section, spec, saving_dir, encode=False)
+        for section, spec, saving_dir in zip(sections, specs, saving_dirs)
+    ]
+    for output, pending in zip(_outputs, pendings):
+        output.pending = pending
+    # the fields are read from shared memory, so no wrfout file is opened
+    if shared:
+        # the buffers are closed when the worker exits, which skips atexit
+        Finalize(None, detach_all, exitpriority=10)
+        return
+    _extractor = VariableExtractor(
+        loader=create_loader(
+            wrfout_paths,
+            MAX_OPEN_WRFOUT_FILES,
+            time_window=build_time_window(),
+        ),
+        block_size=block_size,
+        cache_max_bytes=FIELD_CACHE_MAX_MB * 2**20,
+        disk_cache=build_section_disk_cache(),
+        subset_halo=(
+            SUBSET_HALO if subset_extraction or chunked_loading else None
+        ),
+        interpolation=VERTICAL_INTERPOLATION,
+        log_p_interpolation=log_p_interpolation,
+        validate_interpolation=validate_interpolation,
+        chunked_reader=build_chunked_reader(),
+    )
+    _extractor.share_window(
+        [
+            (section.start_point, section.end_point, *section.via_points)
+            for section in sections
+        ]
+    )
+
+
+def _render_in_worker(
+    datetimes: list[datetime], vertical_levels: np.ndarray
+) -> tuple[list[list[str | None]], dict]:
+    if _extractor is None:
+        raise RuntimeError("Worker is not initialized.")
+    errors = [
+        render_timestep(_extractor, _outputs, datetime, vertical_levels)
+        for datetime in datetimes
+    ]
+    # the records of the worker are merged into those of the main process
+    return errors, RECORDER.take()
+
+
+def _render_shared_in_worker(
+    datetime: datetime, timestep: SharedTimestep, vertical_levels: np.ndarray
+) -> tuple[list[list[str | None]], dict]:
+    errors = render_timestep(
+        SharedFieldReader(timestep), _outputs, datetime, vertical_levels
+    )
+    return [errors], RECORDER.take()
+
+
+def _fail_chunk(
+    datetimes: list[datetime],
+    outputs: list[SectionOutput],
+    progress: ProgressLine,
+    failed: list[tuple[datetime, str, str]],
+) -> None:
+    # every pending frame of the timesteps fails
+    for datetime in datetimes:
+        pending = [output for output in outputs if output.is_pending(datetime)]
+        failed += [
+            (datetime, output.section.name, output.spec.name)
+            for output in pending
+        ]
+        progress.update(len(pending), message=str(datetime))
+
+
+def _collect(
+    future: Future,
+    datetimes: list[datetime],
+    outputs: list[SectionOutput],
+    progress: ProgressLine,
+    failed: list[tuple[datetime, str, str]],
+) -> bool:
+    """Hand the saved images of the frames of a task to their outputs.
+
+    A task failing as a whole, e.g. with a worker killed or a result that
+    cannot be pickled, fails all of its frames.
+
+    Returns:
+        bool: False if the pool is broken, so no more task can be run.
+    """
+    try:
+        chunk_errors, records = future.result()
+    except Exception as error:
+        progress.write(
+            f"Failed to make the figures from {datetimes[0]} to {datetimes[-1]}:\n{traceback.format_exc()}"
+        )
+        _fail_chunk(datetimes, outputs, progress, failed)
+        return not isinstance(error, BrokenProcessPool)
+    RECORDER.merge(records)
+    for datetime, errors in zip(datetimes, chunk_errors):
+        drawn = [
+            (output, error)
+            for output, error in zip(outputs, errors)
+            if output.is_pending(datetime)
+        ]
+        for output, error in drawn:
+            if error is not None:
+                label = f"{output.section.name} {output.spec.name}"
+                progress.write(
+                    f"Failed to make {datetime} figure of {label}:\n{error}"
+                )
+                failed.append(
+                    (datetime, output.section.name, output.spec.name)
+                )
+                continue
+            output.add_drawn_frame(datetime)
+            output.add_saved_frame(
+                os.path.join(output.saving_dir, build_filename(datetime))
+            )
+        progress.update(len(drawn), message=str(datetime))
+    return True
+
+
+def render_frames_in_parallel(
+    wrfout_paths: list[str],
+    datetimes: list[datetime],
+    outputs: list[SectionOutput],
+    vertical_levels: np.ndarray,
+    workers: int,
+    block_size: int = 1,
+    extractor: VariableExtractor | None = None,
+    n_buffers: int = 4,
+) -> list[tuple[datetime, str, str]]:
+    """Render frames with a pool of worker processes.
+
+    Each worker opens its own wrfout files, so no netCDF handle is shared
+    between processes. The frames are handed out in chunks of consecutive
+    timesteps matching the extraction blocks, and a worker draws every
+    product on every section of its timesteps. Filenames depend only on
+    the datetime of the frame, so the output is the same as in the
+    sequential loop. Only the pending frames of each output are drawn, and
+    the saved images are handed to the gif and mp4 of their output in
+    datetime order. If the pool breaks, e.g. with a worker killed, the
+    frames not drawn yet fail and the outputs are still closed.
+
+    Given an extractor, the fields are instead extracted once in this
+    process and passed to the workers through shared memory, one timestep
+    at a time, so the workers never open the wrfout files. At most
+    n_buffers timesteps are in flight, which bounds the shared memory.
+
+    Args:
+        wrfout_paths (list[str]): Paths of the wrfout files.
+        datetimes (list[datetime]): Datetimes of the frames to render.
+        outputs (list[SectionOutput]): Sections and products to draw.
+        vertical_levels (np.ndarray): Vertical levels to interpolate to.
+        workers (int): Number of worker processes.
+        block_size (int, optional): Extraction block size. 0 splits the
+            timesteps evenly among the workers.
+        extractor (VariableExtractor | None, optional): Extractor of this
+            process sharing the fields with the workers. None makes each
+            worker extract its own.
+        n_buffers (int, optional): Number of shared memory buffers.
+
+    Returns:
+        list[tuple[datetime, str, str]]: Datetimes, section names and
+            product names of the frames that failed.
+    """
+    # timesteps whose frames are all up to date are not handed out
+    datetimes = [
+        datetime
+        for datetime in datetimes
+        if any(output.is_pending(datetime) for output in outputs)
+    ]
+    if not datetimes:
+        return []
+    chunk_size = (
+        block_size if block_size > 0 else math.ceil(len(datetimes) / workers)
+    )
+    chunks = [
+        datetimes[i : i + chunk_size]
+        for i in range(0, len(datetimes), chunk_size)
+    ]
+    failed: list[tuple[datetime, str, str]] = []
+    progress = ProgressLine(
+        sum(
+            output.is_pending(datetime)
+            for datetime in datetimes
+            for output in outputs
+        )
+    )
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(
+            wrfout_paths,
+            chunk_size,
+            [output.section for output in outputs],
+            [output.spec for output in outputs],
+            [output.saving_dir for output in outputs],
+            [output.pending for output in outputs],
+            RECORDER.enabled,
+            extractor is not None,
+        ),
+    ) as executor:
+        if extractor is None:
+            futures: list[Future] = []
+            for chunk in chunks:
+                try:
+                    futures.append(
+                        executor.submit(
+                            _render_in_worker, chunk, vertical_levels
+                        )
+                    )
+                except BrokenProcessPool:
+                    break
+            # the tasks of a broken pool fail when collected, and those not
+            # submitted to it fail here
+            for chunk, future in zip(chunks, futures):
+                _collect(future, chunk, outputs, progress, failed)
+            for chunk in chunks[len(futures) :]:
+                _fail_chunk(chunk, outputs, progress, failed)
+        else:
+            buffers = SharedFieldBuffers(n_buffers)
+            in_flight: deque[tuple[datetime, int, Future]] = deque()
+            working = True
+            try:
+                for i, datetime in enumerate(datetimes):
+                    # the oldest timestep is collected first, so the frames
+                    # are handed out in datetime order
+                    if buffers.n_free == 0:
+                        done, index, future = in_flight.popleft()
+                        working = _collect(
+                            future, [done], outputs, progress, failed
+                        )
+                        buffers.release(index)
+                    if not working:
+                        # nothing more is submitted to a broken pool
+                        _fail_chunk(datetimes[i:], outputs, progress, failed)
+                        break
+                    pending = [
+                        output
+                        for output in outputs
+                        if output.is_pending(datetime)
+                    ]
+                    sections = list(
+                        dict.fromkeys(output.section for output in pending)
+                    )
+                    varnames = [
+                        list(
+                            dict.fromkeys(
+                                varname
+                                for output in pending
+                                if output.section == section
+                                for varname in output.spec.varnames
+                            )
+                        )
+                        for section in sections
+                    ]
+                    index, timestep = buffers.write(
+                        *extract_timestep_fields(
+                            extractor,
+                            sections,
+                            varnames,
+                            datetime,
+                            vertical_levels,
+                        )
+                    )
+                    try:
+                        future = executor.submit(
+                            _render_shared_in_worker,
+                            datetime,
+                            timestep,
+                            vertical_levels,
+                        )
+                    except BrokenProcessPool:
+                        buffers.release(index)
+                        _fail_chunk(datetimes[i:], outputs, progress, failed)
+                        break
+                    in_flight.append((datetime, index, future))
+                while in_flight:
+                    done, index, future = in_flight.popleft()
+                    _collect(future, [done], outputs, progress, failed)
+                    buffers.release(index)
+            finally:
+                executor.shutdown(cancel_futures=True)
+                buffers.close()
+    progress.close()
+    return failed
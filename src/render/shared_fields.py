@@ -0,0 +1,366 @@
+import traceback
+from collections import deque
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import Any, NamedTuple
+
+import numpy as np
+import xarray as xr
+from constants.configuration import VERTICAL_COORDINATE
+from util.instrumentation import instrumented
+from wrf import CoordPair
+from wrfout.handler.extraction import VariableExtractor
+from wrfout.handler.type import (
+    CrossSection,
+    VectorComponent,
+    VertivalCoordinate,
+)
+
+# arrays in a buffer start at multiples of this
+_ALIGNMENT = 64
+
+
+def _section_key(
+    start_point: CoordPair,
+    end_point: CoordPair,
+    waypoints: tuple[CoordPair, ...] | list[CoordPair] = (),
+) -> tuple:
+    return (
+        start_point.lat,
+        start_point.lon,
+        tuple((point.lat, point.lon) for point in waypoints),
+        end_point.lat,
+        end_point.lon,
+    )
+
+
+class SharedArray(NamedTuple):
+    """Location of an array in a shared buffer."""
+
+    offset: int
+    shape: tuple[int, ...]
+    dtype: str
+
+
+class SharedField(NamedTuple):
+    """A section array in a shared buffer with the metadata rebuilding its
+    DataArray."""
+
+    values: SharedArray
+    name: str | None
+    dims: tuple[str, ...]
+    attrs: dict[str, Any]
+
+
+class SharedSection(NamedTuple):
+    """Coordinates of a section, shared by its fields."""
+
+    vertical: np.ndarray
+    xy_loc: np.ndarray
+    distance: np.ndarray
+    along_track: np.ndarray
+    # None when not drawn, a traceback when its extraction failed
+    terrain: SharedArray | str | None
+
+
+class SharedTimestep(NamedTuple):
+    """Fields of every section of one timestep in a shared buffer. A field
+    whose extraction failed holds its traceback instead."""
+
+    # index of the buffer in the ring, whose name changes when it grows
+    index: int
+    buffer_name: str
+    fields: dict[tuple, SharedField | tuple[SharedField, SharedField] | str]
+    sections: dict[tuple, SharedSection]
+
+
+def extract_timestep_fields(
+    extractor: VariableExtractor,
+    sections: list[CrossSection],
+    varnames: list[list[str]],
+    datetime: datetime,
+    vertical_levels: np.ndarray,
+) -> tuple[dict[tuple, Any], dict[tuple, dict[str, Any]]]:
+    """Extract the fields of one timestep drawn on each section.
+
+    Args:
+        sections (list[CrossSection]): Sections drawn at the timestep.
+        varnames (list[list[str]]): Variables drawn on each section.
+
+    Returns:
+        tuple[dict[tuple, Any], dict[tuple, dict[str, Any]]]: Arrays (or
+            tracebacks) of each (section key, variable), and the
+            coordinates of each section.
+    """
+    fields: dict[tuple, Any] = {}
+    section_coords: dict[tuple, dict[str, Any]] = {}
+    for section, section_varnames in zip(sections, varnames):
+        points = (section.start_point, section.end_point, section.via_points)
+        key = _section_key(*points)
+        geometry = extractor.get_geometry(*points)
+        terrain: np.ndarray | str | None = None
+        if VERTICAL_COORDINATE == VertivalCoordinate.HEIGHT:
+            try:
+                terrain = extractor.get_terrain_array(datetime, *points)
+            except Exception:
+                terrain = traceback.format_exc()
+        section_coords[key] = {
+            "vertical": vertical_levels,
+            "xy_loc": geometry.xy_loc,
+            "distance": geometry.distances,
+            "along_track": geometry.along_track,
+            "terrain": terrain,
+        }
+        for varname in section_varnames:
+            try:
+                fields[(key, varname)] = extractor.get_var_array(
+                    varname=varname,
+                    datetime=datetime,
+                    start_point=section.start_point,
+                    end_point=section.end_point,
+                    vertical_coord=VERTICAL_COORDINATE,
+                    levels=vertical_levels,
+                    waypoints=section.via_points,
+                )
+            except Exception:
+                fields[(key, varname)] = traceback.format_exc()
+    return fields, section_coords
+
+
+class SharedFieldBuffers:
+    """Fixed ring of shared memory buffers, each holding the fields of one
+    timestep until its frames are drawn.
+
+    A buffer is reused once released, so the memory stays that of
+    n_buffers timesteps however many timesteps are drawn. A buffer grows
+    only if a timestep does not fit in it.
+    """
+
+    def __init__(self, n_buffers: int) -> None:
+        if n_buffers < 1:
+            raise ValueError("n_buffers must be 1 or more.")
+        self._buffers: list[shared_memory.SharedMemory | None] = [
+            None
+        ] * n_buffers
+        self._free: deque[int] = deque(range(n_buffers))
+
+    @property
+    def n_free(self) -> int:
+        return len(self._free)
+
+    @instrumented("share")
+    def write(
+        self,
+        fields: dict[tuple, Any],
+        section_coords: dict[tuple, dict[str, Any]],
+    ) -> tuple[int, SharedTimestep]:
+        """Copy the fields of a timestep (see extract_timestep_fields)
+        into a free buffer.
+
+        Returns:
+            tuple[int, SharedTimestep]: Index of the buffer, to release
+                once drawn, and the layout read by SharedFieldReader.
+        """
+        if not self._free:
+            raise RuntimeError("No shared buffer is free.")
+        arrays: list[np.ndarray] = []
+
+        def place(array: np.ndarray) -> SharedArray:
+            offset = sum(
+                -(-stored.nbytes // _ALIGNMENT) * _ALIGNMENT
+                for stored in arrays
+            )
+            arrays.append(np.ascontiguousarray(array))
+            return SharedArray(offset, array.shape, array.dtype.str)
+
+        def share(array: xr.DataArray) -> SharedField:
+            return SharedField(
+                place(array.values),
+                array.name,
+                tuple(array.dims),
+                {
+                    name: value
+                    for name, value in array.attrs.items()
+                    if isinstance(value, (str, int, float))
+                },
+            )
+
+        shared_fields: dict[tuple, Any] = {}
+        for key, field in fields.items():
+            if isinstance(field, VectorComponent):
+                shared_fields[key] = (share(field.u), share(field.v))
+            elif isinstance(field, xr.DataArray):
+                shared_fields[key] = share(field)
+            else:
+                shared_fields[key] = field
+        sections = {
+            key: SharedSection(
+                vertical=coords["vertical"],
+                xy_loc=coords["xy_loc"],
+                distance=coords["distance"],
+                along_track=coords["along_track"],
+                terrain=(
+                    place(coords["terrain"])
+                    if isinstance(coords["terrain"], np.ndarray)
+                    else coords["terrain"]
+                ),
+            )
+            for key, coords in section_coords.items()
+        }
+
+        index = self._free.popleft()
+        size = max(
+            sum(
+                -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT for array in arrays
+            ),
+            1,
+        )
+        buffer = self._buffers[index]
+        if buffer is None or buffer.size < size:
+            if buffer is not None:
+                buffer.close()
+                buffer.unlink()
+            buffer = shared_memory.SharedMemory(create=True, size=size)
+            self._buffers[index] = buffer
+        offset = 0
+        for array in arrays:
+            np.ndarray(
+                array.shape, array.dtype, buffer=buffer.buf, offset=offset
+            )[...] = array
+            offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+        return index, SharedTimestep(
+            index, buffer.name, shared_fields, sections
+        )
+
+    def release(self, index: int) -> None:
+        self._free.append(index)
+
+    def close(self) -> None:
+        for buffer in self._buffers:
+            if buffer is not None:
+                buffer.close()
+                buffer.unlink()
+        self._buffers = [None] * len(self._buffers)
+
+
+# buffer attached by this process for each index of the ring, kept open
+# until the index is written again since the drawn figures may view it
+_attached: dict[int, shared_memory.SharedMemory] = {}
+
+
+def _attach(timestep: SharedTimestep) -> shared_memory.SharedMemory:
+    buffer = _attached.get(timestep.index)
+    if buffer is None or buffer.name != timestep.buffer_name:
+        # the buffer of the index grew and the previous one was unlinked.
+        # an index is written again only once the frames of its previous
+        # timestep are drawn, so the previous mapping is closed instead of
+        # being held for the whole run.
+        if buffer is not None:
+            buffer.close()
+        buffer = shared_memory.SharedMemory(name=timestep.buffer_name)
+        _attached[timestep.index] = buffer
+    return buffer
+
+
+def detach_all() -> None:
+    """Close every buffer attached by this process, e.g. when a worker
+    exits."""
+    for buffer in _attached.values():
+        buffer.close()
+    _attached.clear()
+
+
+class SharedFieldReader:
+    """Fields of one timestep read zero-copy from a shared buffer.
+
+    It answers the calls render_frame makes to VariableExtractor, so a
+    worker draws the frames without opening a wrfout file.
+    """
+
+    def __init__(self, timestep: SharedTimestep) -> None:
+        self._buffer = _attach(timestep)
+        self._timestep = timestep
+
+    def _view(self, array: SharedArray) -> np.ndarray:
+        view = np.ndarray(
+            array.shape,
+            np.dtype(array.dtype),
+            buffer=self._buffer.buf,
+            offset=array.offset,
+        )
+        view.flags.writeable = False
+        return view
+
+    def _to_dataarray(
+        self, field: SharedField, section: SharedSection
+    ) -> xr.DataArray:
+        return xr.DataArray(
+            self._view(field.values),
+            name=field.name,
+            dims=field.dims,
+            coords={
+                "vertical": section.vertical,
+                "xy_loc": ("cross_line_idx", section.xy_loc),
+                "distance": ("cross_line_idx", section.distance),
+            },
+            attrs=field.attrs,
+        )
+
+    def _section(
+        self,
+        start_point: CoordPair,
+        end_point: CoordPair,
+        waypoints: tuple[CoordPair, ...] | list[CoordPair],
+    ) -> tuple[tuple, SharedSection]:
+        key = _section_key(start_point, end_point, waypoints)
+        if key not in self._timestep.sections:
+            raise KeyError(f"The section {key} is not shared.")
+        return key, self._timestep.sections[key]
+
+    def get_var_array(
+        self,
+        varname: str,
+        datetime: datetime,
+        start_point: CoordPair,
+        end_point: CoordPair,
+        vertical_coord: VertivalCoordinate,
+        levels: np.ndarray,
+        waypoints: tuple[CoordPair, ...] | list[CoordPair] = (),
+    ) -> xr.DataArray | VectorComponent:
+        key, section = self._section(start_point, end_point, waypoints)
+        if (key, varname) not in self._timestep.fields:
+            raise KeyError(f"{varname} is not shared.")
+        field = self._timestep.fields[(key, varname)]
+        if isinstance(field, str):
+            raise RuntimeError(f"Failed to extract {varname}:\n{field}")
+        if isinstance(field, SharedField):
+            return self._to_dataarray(field, section)
+        return VectorComponent(
+            self._to_dataarray(field[0], section),
+            self._to_dataarray(field[1], section),
+        )
+
+    def get_terrain_array(
+        self,
+        datetime: datetime,
+        start_point: CoordPair,
+        end_point: CoordPair,
+        waypoints: tuple[CoordPair, ...] | list[CoordPair] = (),
+    ) -> np.ndarray:
+        _, section = self._section(start_point, end_point, waypoints)
+        if section.terrain is None:
+            raise KeyError("The terrain is not shared.")
+        if isinstance(section.terrain, str):
+            raise RuntimeError(
+                f"Failed to extract the terrain:\n{section.terrain}"
+            )
+        return self._view(section.terrain)
+
+    def get_geometry(
+        self,
+        start_point: CoordPair,
+        end_point: CoordPair,
+        waypoints: tuple[CoordPair, ...] | list[CoordPair] = (),
+    ) -> SharedSection:
+        # the section carries the along_track vectors of its geometry
+        return self._section(start_point, end_point, waypoints)[1]
@@ -0,0 +1,260 @@
+import os
+from typing import cast
+
+import matplotlib.pyplot as plt
+import numpy as np
+import xarray as xr
+from constants.configuration import VERTICAL_COORDINATE, X_TICKS_INTERVAL
+from constants.constant import IMAGE_DPI, TERRAIN_COLOR
+from figure.maker.fig_axes import FigureAxesController
+from figure.maker.maker import Drawer
+from figure.property.fig_property import FigureProperties
+from figure.property.plot_spec import PlotSpec
+from render.frame import build_saving_rootdir
+from time_relation.padding import PaddedDatetime
+from util.instrumentation import instrumented
+from wrfout.handler.columns import ColumnExtractor
+from wrfout.handler.type import (
+    ColumnPoint,
+    VectorComponent,
+    VertivalCoordinate,
+)
+
+
+def build_time_height_dir(wrfout_path: str) -> str:
+    saving_rootdir = build_saving_rootdir(wrfout_path)
+    if VERTICAL_COORDINATE == VertivalCoordinate.HEIGHT:
+        return f"{saving_rootdir}/time_height/h_coord/"
+    return f"{saving_rootdir}/time_height/p_coord/"
+
+
+def _point_array(
+    content: xr.DataArray | VectorComponent, point: ColumnPoint
+) -> tuple[xr.DataArray, str]:
+    # (vertical, Time) of the point, and its description
+    if isinstance(content, VectorComponent):
+        array = cast(xr.DataArray, np.sqrt(content.u**2 + content.v**2))
+        description = "water vapor flux"
+    else:
+        array = content
+        description = content.description
+    return array.sel(point=point.name).transpose(..., "Time"), description
+
+
+@instrumented("draw")
+def render_time_height(
+    props: FigureProperties,
+    point: ColumnPoint,
+    time_height: dict[str, xr.DataArray | VectorComponent],
+    terrain_height: float,
+    saving_dir: str,
+) -> str:
+    """Draw the time-height section of one point and save it.
+
+    Args:
+        time_height (dict[str, xr.DataArray | VectorComponent]): Columns of
+            the variables of the product (see
+            ColumnExtractor.get_time_height).
+        terrain_height (float): Terrain height [m] of the column.
+
+    Returns:
+        str: Path of the saved image.
+    """
+    spec = props.spec
+    drawer = Drawer(props)
+    target_ax = FigureAxesController(ax=drawer.ax, props=props)
+    reference = next(iter(time_height.values()))
+    if isinstance(reference, VectorComponent):
+        reference = reference.u
+    labels = [
+        PaddedDatetime(dt)
+        for dt in reference.Time.values.astype("datetime64[s]").tolist()
+    ]
+    x_coord = np.arange(0, len(labels), 1)
+    y_coord = reference.vertical.values
+
+    # paint terrain area for p-coord
+    if VERTICAL_COORDINATE == VertivalCoordinate.PRESSURE:
+        target_ax.ax.fill_between(
+            x_coord, y_coord.min(), y_coord.max(), color=TERRAIN_COLOR
+        )
+
+    if spec.shade_plot:
+        shade_array, description = _point_array(
+            time_height[spec.shade_varname], point
+        )
+        drawer.plot_shade(
+            target_ax,
+            x=x_coord,
+            y=y_coord,
+            array=shade_array,
+            var_description=description,
+        )
+
+    if spec.contour_plot:
+        contour_array, description = _point_array(
+            time_height[spec.contour_varname], point
+        )
+        drawer.plot_contour(
+            target_ax,
+            x=x_coord,
+            y=y_coord,
+            array=contour_array,
+            var_description=description,
+        )
+
+    if spec.vector_plot:
+        content = time_height[spec.u_vector_varname]
+        # horizontal vectors are drawn eastward and northward, as seen from
+        # above
+        if isinstance(content, VectorComponent):
+            u_array, v_array = content.u, content.v
+            description = "horizontal water vapor flux"
+        elif "u_v" in content.dims:
+            u_array, v_array = content[:, 0], content[:, 1]
+            description = "horizontal wind"
+        else:
+            u_array = content
+            v_array = cast(xr.DataArray, time_height[spec.v_vector_varname])
+            description = "horizontal and vertical wind"
+        drawer.plot_vector(
+            target_ax,
+            x=x_coord,
+            y=y_coord,
+            u_component=_point_array(u_array, point)[0].values,
+            v_component=_point_array(v_array, point)[0].values,
+            var_description=description,
+        )
+
+    if VERTICAL_COORDINATE == VertivalCoordinate.PRESSURE:
+        target_ax.invert_yaxis()
+        target_ax.set_y_label("Pressure [hPa]")
+    else:
+        target_ax.fill_terrain_area(
+            x_coord=x_coord, area_array=np.full(len(x_coord), terrain_height)
+        )
+        target_ax.set_y_label("Height [m]")
+    target_ax.set_x_ticks_label(
+        x_label=[
+            f"{dt.month}/{dt.day} {dt.hour}:{dt.minute}" for dt in labels
+        ],
+        x_ticks_interval=X_TICKS_INTERVAL,
+        rotation=15,
+    )
+    target_ax.set_x_label("Time [JST]")
+    first, last = labels[0], labels[-1]
+    target_ax.set_title(
+        f"{first.year}/{first.month}/{first.day} {first.hour}{first.minute} - {last.year}/{last.month}/{last.day} {last.hour}{last.minute}JST  {point.name} ({point.lat}°N, {point.lon}°E)   {spec.title}"
+    )
+
+    saving_dir = saving_dir + spec.name
+    target_ax.save_figure(
+        drawer.fig,
+        save_dir=saving_dir,
+        filename=f"{point.name}.jpg",
+        dpi=IMAGE_DPI,
+    )
+    plt.close(drawer.fig)
+    return os.path.join(saving_dir, f"{point.name}.jpg")
+
+
+def save_time_height_arrays(
+    extractor: ColumnExtractor,
+    time_height: dict[str, xr.DataArray | VectorComponent],
+    terrain_heights: np.ndarray,
+    saving_dir: str,
+) -> list[str]:
+    """Save the columns of each point to {point name}.nc.
+
+    The components of a vector variable, such as "wv_flux", are saved as
+    {varname}_u and {varname}_v.
+
+    Returns:
+        list[str]: Paths of the saved files.
+    """
+    variables: dict[str, xr.DataArray] = {}
+    for varname, content in time_height.items():
+        arrays = (
+            {f"{varname}_u": content.u, f"{varname}_v": content.v}
+            if isinstance(content, VectorComponent)
+            else {varname: content}
+        )
+        for name, array in arrays.items():
+            # the projection of wrf-python is not written to netCDF
+            variables[name] = xr.DataArray(
+                array.values,
+                coords=array.coords,
+                dims=array.dims,
+                attrs={
+                    key: value
+                    for key, value in array.attrs.items()
+                    if isinstance(value, (str, int, float))
+                },
+            )
+    columns = xr.Dataset(variables)
+    columns.Time.attrs["description"] = "JST"
+    columns.vertical.attrs["units"] = (
+        "hPa" if VERTICAL_COORDINATE == VertivalCoordinate.PRESSURE else "m"
+    )
+    os.makedirs(saving_dir, exist_ok=True)
+    paths = []
+    for point, (j, i), terrain_height in zip(
+        extractor.points, extractor.columns, terrain_heights
+    ):
+        path = os.path.join(saving_dir, f"{point.name}.nc")
+        column = columns.sel(point=point.name, drop=True).assign_attrs(
+            name=point.name,
+            lat=point.lat,
+            lon=point.lon,
+            south_north=j,
+            west_east=i,
+            terrain_height=float(terrain_height),
+        )
+        column.to_netcdf(path)
+        paths.append(path)
+    return paths
+
+
+def render_time_height_sections(
+    extractor: ColumnExtractor,
+    specs: list[PlotSpec],
+    vertical_levels: np.ndarray,
+    wrfout_path: str,
+    save_arrays: bool = True,
+) -> list[str]:
+    """Draw the time-height sections of all the points and products over
+    the times of the loader, extracting the variables of all products
+    together.
+
+    Returns:
+        list[str]: Paths of the saved images and arrays.
+    """
+    varnames = list(
+        dict.fromkeys(varname for spec in specs for varname in spec.varnames)
+    )
+    time_height = extractor.get_time_height(
+        varnames, VERTICAL_COORDINATE, vertical_levels
+    )
+    terrain_heights = extractor.get_terrain_columns()
+    saving_dir = build_time_height_dir(wrfout_path)
+    paths = []
+    for spec in specs:
+        props = FigureProperties(spec)
+        for point, terrain_height in zip(extractor.points, terrain_heights):
+            paths.append(
+                render_time_height(
+                    props,
+                    point,
+                    {
+                        varname: time_height[varname]
+                        for varname in spec.varnames
+                    },
+                    float(terrain_height),
+                    saving_dir,
+                )
+            )
+    if save_arrays:
+        paths += save_time_height_arrays(
+            extractor, time_height, terrain_heights, saving_dir
+        )
+    return paths
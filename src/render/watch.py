@@ -0,0 +1,151 @@
+import time
+from datetime import datetime
+
+import numpy as np
+from constants.configuration import (
+    WATCH_IDLE_MIN,
+    WATCH_INTERVAL_SEC,
+    WATCH_RETRIES,
+)
+from render.manifest import build_frame_keys
+from render.output import SectionOutput, render_timestep
+from wrfout.handler.disk_cache import file_identity
+from wrfout.handler.extraction import VariableExtractor
+from wrfout.loader.nc_series import resolve_wrfout_paths
+
+
+class WrfoutWatcher:
+    """Follows the wrfout files written by a running simulation.
+
+    WRF writes the time of a record before its fields, so the last record
+    of the newest file is taken as written only once the file has not
+    changed since the previous poll. The older files are complete.
+    """
+
+    def __init__(
+        self, extractor: VariableExtractor, wrfout_patterns: list[str]
+    ) -> None:
+        self._extractor = extractor
+        self._wrfout_patterns = wrfout_patterns
+        self._identity: tuple[str, int, int] | None = None
+
+    def poll(self) -> list[datetime]:
+        """Index the records written since the last poll, including those
+        of new files matching the patterns.
+
+        Returns:
+            list[datetime]: Datetimes added.
+        """
+        wrfout_paths = resolve_wrfout_paths(self._wrfout_patterns)
+        identity = file_identity(wrfout_paths[-1])
+        hold_last_record = identity != self._identity
+        added = self._extractor.refresh(wrfout_paths, hold_last_record)
+        # a record appended while reading is held until the next poll
+        written = file_identity(wrfout_paths[-1])
+        if written != identity and not hold_last_record:
+            self._extractor.refresh(wrfout_paths, True)
+            added = [
+                datetime
+                for datetime in added
+                if datetime in self._extractor.loader.datetime_index_map
+            ]
+        self._identity = written
+        return added
+
+
+def watch_and_render(
+    watcher: WrfoutWatcher,
+    extractor: VariableExtractor,
+    outputs: list[SectionOutput],
+    vertical_levels: np.ndarray,
+    save_image: bool = True,
+    incremental: bool = True,
+) -> list[tuple[datetime, str, str]]:
+    """Draw the timesteps appended to the wrfout files until none is added
+    for WATCH_IDLE_MIN minutes, or until interrupted with Ctrl+C.
+
+    The frames are drawn in datetime order and appended to the gif and mp4
+    being encoded. A timestep whose frames fail, e.g. on a record changed
+    while read, is tried again at the next polls before the later ones are
+    drawn, and given up after WATCH_RETRIES polls.
+
+    Returns:
+        list[tuple[datetime, str, str]]: Datetimes, section names and
+            product names of the frames that failed.
+    """
+    failed: list[tuple[datetime, str, str]] = []
+    queue: list[datetime] = []
+    # outputs of the first timestep of the queue already drawn
+    drawn: list[SectionOutput] = []
+    n_retries = 0
+    last_added = time.monotonic()
+    print(f"Watching the wrfout files every {WATCH_INTERVAL_SEC} s …")
+    try:
+        while queue or time.monotonic() - last_added < WATCH_IDLE_MIN * 60:
+            time.sleep(WATCH_INTERVAL_SEC)
+            added = watcher.poll()
+            if added:
+                last_added = time.monotonic()
+                queue.extend(added)
+                for output in outputs:
+                    output.add_frames(
+                        added,
+                        (
+                            build_frame_keys(
+                                extractor.loader,
+                                output.section,
+                                output.spec,
+                                vertical_levels,
+                                added,
+                            )
+                            if incremental
+                            else None
+                        ),
+                    )
+            while queue:
+                datetime = queue[0]
+                pending = [
+                    output
+                    for output in outputs
+                    if output.is_pending(datetime) and output not in drawn
+                ]
+                errors = render_timestep(
+                    extractor,
+                    pending,
+                    datetime,
+                    vertical_levels,
+                    save_image=save_image,
+                )
+                for output, error in zip(pending, errors):
+                    if error is None:
+                        output.add_drawn_frame(datetime)
+                        drawn.append(output)
+                failures = [
+                    (output, error)
+                    for output, error in zip(pending, errors)
+                    if error is not None
+                ]
+                if failures and n_retries < WATCH_RETRIES:
+                    n_retries += 1
+                    print(
+                        f"Failed to make {len(failures)} figures of {datetime}, trying again at the next poll"
+                    )
+                    break
+                for output, error in failures:
+                    print(error)
+                    failed.append(
+                        (datetime, output.section.name, output.spec.name)
+                    )
+                for output in outputs:
+                    if not output.is_pending(datetime):
+                        output.add_skipped_frame(datetime)
+                if drawn:
+                    print(f"Made {len(drawn)} figures of {datetime}")
+                queue.pop(0)
+                drawn = []
+                n_retries = 0
+            for output in outputs:
+                output.publish()
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    return failed
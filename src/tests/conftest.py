@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the modules are imported from src, as when running main.py
+sys.path.insert(0, str(Path(__file__).parents[1]))
@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from wrfout.handler.aggregation import (
+    AggregationWindow,
+    P2Quantile,
+    RunningStatistics,
+    SlidingWindows,
+    parse_percentile,
+)
+
+
+def _stream(n_values: int, seed: int = 0) -> np.ndarray:
+    """Return n_values arrays of shape (3, 4) with NaN values, and an
+    element that is NaN in every array."""
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(n_values, 3, 4))
+    values[rng.random(values.shape) < 0.2] = np.nan
+    values[:, 0, 0] = np.nan
+    return values
+
+
+def test_parse_percentile():
+    assert parse_percentile("p90") == 0.9
+    assert parse_percentile("p99.9") == pytest.approx(0.999)
+    assert parse_percentile("mean") is None
+    with pytest.raises(ValueError):
+        parse_percentile("p100")
+
+
+@pytest.mark.parametrize("n_values", [1, 3, 4])
+def test_p2_quantile_is_exact_below_five_values(n_values):
+    values = _stream(n_values)
+    estimate = P2Quantile(0.9, (3, 4))
+    for array in values:
+        estimate.add(array)
+    with np.errstate(invalid="ignore"), pytest.warns(RuntimeWarning):
+        expected = np.nanquantile(values, 0.9, axis=0)
+    np.testing.assert_allclose(estimate.result(), expected)
+
+
+@pytest.mark.parametrize("quantile", [0.1, 0.5, 0.9])
+def test_p2_quantile_estimates_many_values(quantile):
+    values = _stream(5000)
+    estimate = P2Quantile(quantile, (3, 4))
+    for array in values:
+        estimate.add(array)
+    result = estimate.result()
+    assert np.isnan(result[0, 0])
+    with pytest.warns(RuntimeWarning):
+        expected = np.nanquantile(values, quantile, axis=0)
+    np.testing.assert_allclose(result[1:], expected[1:], atol=0.1)
+
+
+def test_p2_quantile_rejects_invalid_quantile():
+    with pytest.raises(ValueError):
+        P2Quantile(1.0, (2,))
+
+
+@pytest.mark.parametrize("n_values", [1, 4, 50])
+def test_running_statistics_match_numpy(n_values):
+    values = _stream(n_values)
+    statistics = RunningStatistics(
+        ["mean", "var", "std", "min", "max", "sum", "p50"], (3, 4)
+    )
+    for array in values:
+        statistics.add(array)
+    # an element without any value gives NaN, not 0 as nansum does
+    valid = ~np.isnan(values).all(axis=0)
+    with np.errstate(invalid="ignore"), pytest.warns(RuntimeWarning):
+        expected = {
+            "mean": np.nanmean(values, axis=0),
+            "var": np.nanvar(values, axis=0),
+            "std": np.nanstd(values, axis=0),
+            "min": np.nanmin(values, axis=0),
+            "max": np.nanmax(values, axis=0),
+            "sum": np.where(valid, np.nansum(values, axis=0), np.nan),
+        }
+    for statistic, expected_values in expected.items():
+        np.testing.assert_allclose(
+            statistics.result(statistic), expected_values, err_msg=statistic
+        )
+    assert np.isnan(statistics.result("p50")[0, 0])
+
+
+def test_running_statistics_reject_unknown_statistics():
+    with pytest.raises(ValueError):
+        RunningStatistics(["median"], (2,))
+    statistics = RunningStatistics(["mean"], (2,))
+    with pytest.raises(ValueError):
+        statistics.result("p90")
+
+
+def test_sliding_windows_overlap():
+    origin = datetime(2022, 7, 28, 9)
+    windows = SlidingWindows(origin, timedelta(hours=3), timedelta(hours=1))
+    assert windows.containing(origin - timedelta(minutes=10)) == []
+    assert windows.containing(origin) == [
+        AggregationWindow(origin, origin + timedelta(hours=3))
+    ]
+    containing = windows.containing(origin + timedelta(hours=3))
+    assert [window.start - origin for window in containing] == [
+        timedelta(hours=1),
+        timedelta(hours=2),
+        timedelta(hours=3),
+    ]
+    # the end of a window is excluded
+    assert all(
+        window.start <= origin + timedelta(hours=3) < window.end
+        for window in containing
+    )
+
+
+def test_sliding_windows_tumble_when_the_step_is_the_length():
+    origin = datetime(2022, 7, 28, 9)
+    windows = SlidingWindows(origin, timedelta(hours=1), timedelta(hours=1))
+    assert windows.containing(origin + timedelta(minutes=90)) == [
+        AggregationWindow(
+            origin + timedelta(hours=1), origin + timedelta(hours=2)
+        )
+    ]
+
+
+def test_sliding_windows_reject_non_positive_lengths():
+    with pytest.raises(ValueError):
+        SlidingWindows(datetime(2022, 7, 28), timedelta(0), timedelta(1))
+    with pytest.raises(ValueError):
+        SlidingWindows(datetime(2022, 7, 28), timedelta(1), -timedelta(1))
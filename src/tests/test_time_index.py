@@ -0,0 +1,99 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from wrfout.loader.time_index import TimeIndex, TimeWindow, build_time_index
+
+
+def _times(*utc: str) -> np.ndarray:
+    return np.array(utc, dtype="datetime64[s]")
+
+
+# datetimes are labelled in JST, 9 hours ahead of the UTC times
+JST_09 = datetime(2022, 7, 28, 9)
+
+
+def test_irregular_intervals_across_files():
+    time_index = build_time_index(
+        [
+            ("a", _times("2022-07-28T00:00", "2022-07-28T00:10")),
+            # a restart file repeating the last time of the first one
+            ("b", _times("2022-07-28T00:10", "2022-07-28T00:40")),
+        ]
+    )
+    assert time_index.datetimes == [
+        JST_09,
+        JST_09.replace(minute=10),
+        JST_09.replace(minute=40),
+    ]
+    assert time_index.intervals_min.tolist() == [10, 30]
+    # the first file wins where the files overlap
+    assert time_index.location(JST_09.replace(minute=10)) == ("a", 1)
+    assert time_index.location(JST_09.replace(minute=40)) == ("b", 1)
+
+
+def test_files_given_out_of_order_are_sorted():
+    time_index = TimeIndex.from_times(
+        [
+            ("b", _times("2022-07-28T01:00")),
+            ("a", _times("2022-07-28T00:00")),
+        ]
+    )
+    assert time_index.datetimes == [JST_09, JST_09.replace(hour=10)]
+    assert time_index.location(JST_09) == ("a", 0)
+
+
+def test_single_record():
+    time_index = build_time_index([("a", _times("2022-07-28T00:00"))])
+    assert len(time_index) == 1
+    assert time_index.intervals_min.tolist() == []
+    assert time_index.location(JST_09) == ("a", 0)
+
+
+def test_time_window_and_stride():
+    times = _times(
+        *[f"2022-07-28T00:{minute:02d}" for minute in range(0, 60, 10)]
+    )
+    time_index = build_time_index(
+        [("a", times)],
+        TimeWindow(JST_09.replace(minute=10), JST_09.replace(minute=50), 2),
+    )
+    assert time_index.datetimes == [
+        JST_09.replace(minute=10),
+        JST_09.replace(minute=30),
+        JST_09.replace(minute=50),
+    ]
+    assert [time_index.location(dt)[1] for dt in time_index.datetimes] == [
+        1,
+        3,
+        5,
+    ]
+    with pytest.raises(ValueError):
+        build_time_index([("a", times)], TimeWindow(stride=0))
+
+
+def test_window_without_times_raises():
+    with pytest.raises(ValueError):
+        build_time_index(
+            [("a", _times("2022-07-28T00:00"))],
+            TimeWindow(start=datetime(2022, 7, 29)),
+        )
+
+
+def test_hold_last_record():
+    times_of_files = [
+        ("a", _times("2022-07-28T00:00", "2022-07-28T00:10")),
+        ("b", _times("2022-07-28T00:20", "2022-07-28T00:30")),
+    ]
+    time_index = build_time_index(times_of_files, hold_last_record=True)
+    # only the last record of the last file is held
+    assert time_index.datetimes == [
+        JST_09,
+        JST_09.replace(minute=10),
+        JST_09.replace(minute=20),
+    ]
+    # a file whose only record is held leaves no time, without raising
+    held = build_time_index(
+        [("c", _times("2022-07-28T00:00"))], hold_last_record=True
+    )
+    assert len(held) == 0
@@ -1,25 +1,99 @@
 from datetime import datetime
 
 import numpy as np
-import pandas as pd
 from numpy.typing import NDArray
+from time_relation.timezone import utc_to_jst
+
+# positions of the fields in a WRF time string "YYYY-MM-DD_hh:mm:ss"
+_YEAR, _MONTH, _DAY = slice(0, 4), slice(5, 7), slice(8, 10)
+_HOUR, _MINUTE, _SECOND = slice(11, 13), slice(14, 16), slice(17, 19)
+_DIGITS = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+
+
+def _digits_to_int(digits: NDArray[np.int64]) -> NDArray[np.int64]:
+    weights = 10 ** np.arange(digits.shape[-1] - 1, -1, -1)
+    return digits @ weights
+
+
+def wrf_times_to_datetime64s(
+    times: NDArray[np.bytes_],
+) -> NDArray[np.datetime64]:
+    """Decode the Times character array of a wrfout file at once.
+
+    Args:
+        times (NDArray[np.bytes_]): Characters of (Time, DateStrLen).
+
+    Returns:
+        NDArray[np.datetime64]: UTC times in seconds.
+    """
+    chars = np.atleast_2d(np.asarray(times, dtype="S1"))
+    if chars.shape[-1] < 19:
+        raise ValueError(f"Invalid Times of shape {chars.shape}.")
+    digits = chars.view(np.uint8).astype(np.int64) - ord("0")
+    if np.any((digits[:, _DIGITS] < 0) | (digits[:, _DIGITS] > 9)):
+        raise ValueError("Times holds a string that is not a date.")
+    year = _digits_to_int(digits[:, _YEAR])
+    month = _digits_to_int(digits[:, _MONTH])
+    days = _digits_to_int(digits[:, _DAY]) - 1
+    seconds = (
+        _digits_to_int(digits[:, _HOUR]) * 3600
+        + _digits_to_int(digits[:, _MINUTE]) * 60
+        + _digits_to_int(digits[:, _SECOND])
+    )
+    months = ((year - 1970) * 12 + month - 1).astype("datetime64[M]")
+    return (
+        months.astype("datetime64[D]")
+        + days.astype("timedelta64[D]")
+        + seconds.astype("timedelta64[s]")
+    ).astype("datetime64[s]")
+
+
+def count_written_times(times: NDArray[np.bytes_]) -> int:
+    """Return the number of leading rows of a Times character array that
+    are dates. The rows of records not written yet are blank."""
+    chars = np.atleast_2d(np.asarray(times, dtype="S1"))
+    if chars.shape[-1] < 19:
+        return 0
+    digits = chars.view(np.uint8).astype(np.int64)[:, _DIGITS] - ord("0")
+    written = np.all((digits >= 0) & (digits <= 9), axis=1)
+    return int(np.argmin(written)) if not written.all() else len(written)
+
+
+def xtime_to_datetime64s(
+    xtime: NDArray[np.floating], units: str
+) -> NDArray[np.datetime64]:
+    """Decode XTIME, minutes since the start of the simulation.
+
+    Args:
+        xtime (NDArray[np.floating]): Minutes of (Time,).
+        units (str): Units of XTIME, e.g. "minutes since 2022-07-28
+            00:00:00".
+
+    Returns:
+        NDArray[np.datetime64]: UTC times in seconds.
+    """
+    if not units.startswith("minutes since "):
+        raise ValueError(f"Invalid units of XTIME: {units}.")
+    start = np.datetime64(
+        units.removeprefix("minutes since ").strip().replace(" ", "T"), "s"
+    )
+    seconds = np.rint(np.atleast_1d(xtime) * 60).astype(np.int64)
+    return start + seconds.astype("timedelta64[s]")
 
 
 def datetime64_to_datetime(np_dt: np.datetime64) -> datetime:
-    return datetime.fromtimestamp(np_dt.astype(datetime) * 1e-9)
+    # the times of wrfout files are in UTC, and the figures are in JST
+    return utc_to_jst(np_dt.astype("datetime64[us]").item())
 
 
 def datetime64s_to_datetimes(
     datetime64s: NDArray[np.datetime64],
 ) -> NDArray[np.object_]:
-    start_dt = datetime64_to_datetime(datetime64s[0])
-    last_dt = datetime64_to_datetime(datetime64s[-1])
-    interval_min = (
-        (datetime64s[1] - datetime64s[0]).astype("timedelta64[m]").astype(int)
-    )
-    pd_dt_indexes = pd.date_range(
-        start=start_dt,
-        end=last_dt,
-        freq=f"{interval_min}min",
+    # each time is converted as is, so irregular intervals are kept
+    return np.array(
+        [
+            utc_to_jst(dt)
+            for dt in np.asarray(datetime64s).astype("datetime64[us]").tolist()
+        ],
+        dtype=object,
     )
-    return pd.to_datetime(pd_dt_indexes).to_pydatetime()
@@ -0,0 +1,24 @@
+import os
+from contextlib import contextmanager
+from typing import IO, Any, Iterator
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "w") -> Iterator[IO[Any]]:
+    """Open a temporary file replacing path once it is written.
+
+    Readers never see a partial file, and an interruption never leaves one
+    looking complete: the temporary file is removed on error.
+
+    Args:
+        path (str): Path of the file to write.
+        mode (str): Mode to open the temporary file with ("w" or "wb").
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, mode=mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,282 @@
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is given in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class RunRecorder:
+    """Wall time, CPU time and rise of the peak RSS of each stage and frame
+    of a run.
+
+    A stage nested in another one is charged to itself only, so the times
+    of the stages add up to the time spent in all of them (e.g. reading
+    the subset inside a diagnostic is charged to "read", not "diagnose").
+    The peak RSS of a process only grows, so a stage is charged with how
+    much it raised the peak, which adds up over the stages in the same
+    way, rather than with the peak reached by the stages run before it.
+    Nothing is recorded until the recorder is enabled.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._stages: dict[str, dict[str, float]] = {}
+        self._frames: list[dict[str, Any]] = []
+        # [stage name, wall start, cpu start, peak RSS at start] of the
+        # running stages
+        self._stack: list[list[Any]] = []
+        # highest peak RSS of the processes merged
+        self._merged_peak_rss_mb = 0.0
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+    def enable(self) -> None:
+        self.enabled = True
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+    def _stats(self, name: str) -> dict[str, float]:
+        return self._stages.setdefault(
+            name,
+            {
+                "calls": 0,
+                "wall_s": 0.0,
+                "cpu_s": 0.0,
+                "peak_rss_rise_mb": 0.0,
+            },
+        )
+
+    def _charge(
+        self, entry: list[Any], wall: float, cpu: float, rss: float
+    ) -> None:
+        stats = self._stats(entry[0])
+        stats["wall_s"] += wall - entry[1]
+        stats["cpu_s"] += cpu - entry[2]
+        stats["peak_rss_rise_mb"] += rss - entry[3]
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        # a stage calling itself (e.g. through super()) is counted once
+        if not self.enabled or (self._stack and self._stack[-1][0] == name):
+            yield
+            return
+        wall, cpu, rss = (
+            time.perf_counter(),
+            time.process_time(),
+            _peak_rss_mb(),
+        )
+        if self._stack:
+            self._charge(self._stack[-1], wall, cpu, rss)
+        self._stack.append([name, wall, cpu, rss])
+        self._stats(name)["calls"] += 1
+        try:
+            yield
+        finally:
+            wall, cpu, rss = (
+                time.perf_counter(),
+                time.process_time(),
+                _peak_rss_mb(),
+            )
+            self._charge(self._stack.pop(), wall, cpu, rss)
+            # the enclosing stage resumes from now
+            if self._stack:
+                self._stack[-1][1:] = [wall, cpu, rss]
+
+    @contextmanager
+    def frame(self, **labels: str) -> Iterator[None]:
+        """Record the time of one frame, labelled e.g. by its datetime."""
+        if not self.enabled:
+            yield
+            return
+        wall, cpu, rss = (
+            time.perf_counter(),
+            time.process_time(),
+            _peak_rss_mb(),
+        )
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self._frames.append(
+                {
+                    **labels,
+                    "wall_s": time.perf_counter() - wall,
+                    "cpu_s": time.process_time() - cpu,
+                    "peak_rss_rise_mb": _peak_rss_mb() - rss,
+                    "failed": failed,
+                }
+            )
+
+    def take(self) -> dict[str, Any]:
+        """Return the records so far and clear them, e.g. to send the
+        records of a worker process to the main process."""
+        records = {
+            "stages": self._stages,
+            "frames": self._frames,
+            "peak_rss_mb": _peak_rss_mb(),
+        }
+        self._stages, self._frames = {}, []
+        return records
+
+    def merge(self, records: dict[str, Any]) -> None:
+        """Add the records taken from another process. The times and the
+        rises of the peak RSS add up over the processes, while the peak RSS
+        of the run stays that of one process."""
+        for name, stats in records["stages"].items():
+            merged = self._stats(name)
+            merged["calls"] += stats["calls"]
+            merged["wall_s"] += stats["wall_s"]
+            merged["cpu_s"] += stats["cpu_s"]
+            merged["peak_rss_rise_mb"] += stats["peak_rss_rise_mb"]
+        self._frames.extend(records["frames"])
+        self._merged_peak_rss_mb = max(
+            self._merged_peak_rss_mb, records["peak_rss_mb"]
+        )
+
+    def build_report(self) -> dict[str, Any]:
+        frame_walls = [frame["wall_s"] for frame in self._frames]
+        return {
+            "wall_s": time.perf_counter() - self._start_wall,
+            "cpu_s": time.process_time() - self._start_cpu,
+            "peak_rss_mb": max(_peak_rss_mb(), self._merged_peak_rss_mb),
+            "stages": dict(
+                sorted(
+                    self._stages.items(),
+                    key=lambda item: item[1]["wall_s"],
+                    reverse=True,
+                )
+            ),
+            "frame_summary": {
+                "count": len(frame_walls),
+                "failed": sum(frame["failed"] for frame in self._frames),
+                "mean_wall_s": (
+                    statistics.mean(frame_walls) if frame_walls else 0.0
+                ),
+                "median_wall_s": (
+                    statistics.median(frame_walls) if frame_walls else 0.0
+                ),
+                "max_wall_s": max(frame_walls, default=0.0),
+            },
+            "frames": self._frames,
+        }
+
+    def write_report(self, report_dir: str) -> str:
+        """Write run_report.json and a readable run_report.txt.
+
+        Returns:
+            str: Summary written to run_report.txt.
+        """
+        report = self.build_report()
+        os.makedirs(report_dir, exist_ok=True)
+        with open(os.path.join(report_dir, "run_report.json"), "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        summary = format_summary(report)
+        with open(os.path.join(report_dir, "run_report.txt"), "w") as f:
+            f.write(summary)
+        return summary
+
+
+def format_summary(report: dict[str, Any]) -> str:
+    total_wall = report["wall_s"]
+    lines = [
+        f"total: {total_wall:.2f} s wall, {report['cpu_s']:.2f} s cpu, "
+        f"peak RSS {report['peak_rss_mb']:.0f} MiB",
+        "",
+        f"{'stage':<16}{'calls':>8}{'wall [s]':>11}{'share':>8}"
+        f"{'cpu [s]':>10}{'peak RSS rise [MiB]':>21}",
+    ]
+    for name, stats in report["stages"].items():
+        share = stats["wall_s"] / total_wall if total_wall > 0 else 0.0
+        lines.append(
+            f"{name:<16}{stats['calls']:>8}{stats['wall_s']:>11.2f}"
+            f"{share:>8.1%}{stats['cpu_s']:>10.2f}"
+            f"{stats['peak_rss_rise_mb']:>21.0f}"
+        )
+    frames = report["frame_summary"]
+    lines += [
+        "",
+        f"frames: {frames['count']} ({frames['failed']} failed), "
+        f"mean {frames['mean_wall_s']:.2f} s, "
+        f"median {frames['median_wall_s']:.2f} s, "
+        f"max {frames['max_wall_s']:.2f} s",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+# recorder of the running process
+RECORDER = RunRecorder()
+
+
+def instrumented(stage: str) -> Callable[[F], F]:
+    """Decorator recording the calls of a function as a stage."""
+
+    def decorator(func: F) -> F:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not RECORDER.enabled:
+                return func(*args, **kwargs)
+            with RECORDER.stage(stage):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+class ProgressLine:
+    """Line showing the frames done, frames per second and ETA.
+
+    On a terminal the line is redrawn in place, otherwise a line is
+    printed at each update.
+    """
+
+    def __init__(self, total: int) -> None:
+        self._total = total
+        self._done = 0
+        self._start = time.perf_counter()
+        self._interactive = sys.stdout.isatty()
+        self._line = ""
+
+    def update(self, count: int = 1, message: str = "") -> None:
+        self._done += count
+        elapsed = time.perf_counter() - self._start
+        rate = self._done / elapsed if elapsed > 0 else 0.0
+        if rate > 0:
+            eta = f"{(self._total - self._done) / rate:.0f} s"
+        else:
+            eta = "-"
+        self._line = (
+            f"[{self._done}/{self._total}] {rate:.2f} frames/s, "
+            f"ETA {eta}  {message}"
+        )
+        self._print_line()
+
+    def write(self, text: str) -> None:
+        """Print text above the progress line."""
+        if self._interactive and self._line:
+            print("\r" + " " * len(self._line) + "\r", end="")
+        print(text)
+        if self._interactive and self._line:
+            self._print_line()
+
+    def close(self) -> None:
+        if self._interactive and self._line:
+            print()
+
+    def _print_line(self) -> None:
+        if self._interactive:
+            print("\r" + self._line, end="", flush=True)
+        else:
+            print(self._line, flush=True)
@@ -0,0 +1,242 @@
+import re
+import warnings
+from datetime import datetime, timedelta
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+AGGREGATE_STATISTICS = ("mean", "var", "std", "min", "max", "sum")
+
+# percentiles are named p followed by the percent, e.g. "p90" or "p99.9"
+_PERCENTILE = re.compile(r"p(\d+(?:\.\d+)?)")
+
+
+def parse_percentile(statistic: str) -> float | None:
+    """Return the quantile (0 to 1) of a percentile statistic, or None if
+    the statistic is not a percentile."""
+    matched = _PERCENTILE.fullmatch(statistic)
+    if matched is None:
+        return None
+    percent = float(matched.group(1))
+    if not 0 < percent < 100:
+        raise ValueError(f"Invalid percentile: {statistic}.")
+    return percent / 100
+
+
+def validate_statistics(statistics: Sequence[str]) -> None:
+    for statistic in statistics:
+        if (
+            statistic not in AGGREGATE_STATISTICS
+            and parse_percentile(statistic) is None
+        ):
+            raise ValueError(
+                f"Invalid statistic: {statistic}. Choose from {AGGREGATE_STATISTICS} or a percentile such as 'p90'."
+            )
+
+
+class P2Quantile:
+    """Streaming estimate of a quantile of every element of an array.
+
+    The P² algorithm (Jain and Chlamtac, 1985) keeps five markers per
+    element, whose heights are adjusted by piecewise-parabolic steps as
+    the values arrive, instead of the values themselves. The quantile of
+    fewer than five values is exact.
+    """
+
+    def __init__(self, quantile: float, shape: tuple[int, ...]) -> None:
+        """
+        Args:
+            quantile (float): Quantile estimated, between 0 and 1.
+            shape (tuple[int, ...]): Shape of the arrays added.
+        """
+        if not 0 < quantile < 1:
+            raise ValueError("quantile must be between 0 and 1.")
+        self._quantile = quantile
+        self._increments = np.array(
+            [0, quantile / 2, quantile, (1 + quantile) / 2, 1]
+        ).reshape((5,) + (1,) * len(shape))
+        # heights, actual and desired positions of (marker, ...)
+        self._heights = np.full((5,) + shape, np.nan)
+        self._positions = np.broadcast_to(
+            np.arange(1.0, 6.0).reshape(self._increments.shape),
+            self._heights.shape,
+        ).copy()
+        self._desired = np.broadcast_to(
+            np.array(
+                [1, 1 + 2 * quantile, 1 + 4 * quantile, 3 + 2 * quantile, 5]
+            ).reshape(self._increments.shape),
+            self._heights.shape,
+        ).copy()
+        self._count = np.zeros(shape, dtype=np.int64)
+
+    def add(self, values: np.ndarray) -> None:
+        """Add values of the array. NaN values are left out."""
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        # the first five values of an element are the initial markers
+        filling = valid & (self._count < 5)
+        if filling.any():
+            self._heights[(self._count[filling],) + np.nonzero(filling)] = (
+                values[filling]
+            )
+            filled = filling & (self._count == 4)
+            self._heights[:, filled] = np.sort(
+                self._heights[:, filled], axis=0
+            )
+        updating = valid & (self._count >= 5)
+        self._count += valid
+        if updating.any():
+            self._update(values[updating], updating)
+
+    def _update(self, x: np.ndarray, mask: np.ndarray) -> None:
+        q = self._heights[:, mask]
+        n = self._positions[:, mask]
+        desired = self._desired[:, mask]
+        q[0] = np.minimum(q[0], x)
+        q[4] = np.maximum(q[4], x)
+        # cell of the value between the markers, 0 to 3
+        cell = np.sum(x >= q[1:4], axis=0)
+        n += np.arange(5)[:, np.newaxis] > cell
+        desired += self._increments.reshape(5, 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for i in (1, 2, 3):
+                d = desired[i] - n[i]
+                move = ((d >= 1) & (n[i + 1] - n[i] > 1)) | (
+                    (d <= -1) & (n[i - 1] - n[i] < -1)
+                )
+                step = np.where(move, np.sign(d), 0.0)
+                parabolic = q[i] + step / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + step)
+                    * (q[i + 1] - q[i])
+                    / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - step)
+                    * (q[i] - q[i - 1])
+                    / (n[i] - n[i - 1])
+                )
+                # linear towards the neighbour where the parabola
+                # overshoots it
+                neighbour_q = np.where(step > 0, q[i + 1], q[i - 1])
+                neighbour_n = np.where(step > 0, n[i + 1], n[i - 1])
+                linear = q[i] + step * (neighbour_q - q[i]) / (
+                    neighbour_n - n[i]
+                )
+                adjusted = np.where(
+                    (q[i - 1] < parabolic) & (parabolic < q[i + 1]),
+                    parabolic,
+                    linear,
+                )
+                q[i] = np.where(move, adjusted, q[i])
+                n[i] += step
+        self._heights[:, mask] = q
+        self._positions[:, mask] = n
+        self._desired[:, mask] = desired
+
+    def result(self) -> np.ndarray:
+        """Return the estimated quantile, NaN where no value was added."""
+        with warnings.catch_warnings():
+            # elements without a value are all NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            exact = np.nanquantile(self._heights, self._quantile, axis=0)
+        return np.where(self._count >= 5, self._heights[2], exact)
+
+
+class RunningStatistics:
+    """Statistics of every element of an array over a stream of arrays of
+    the same shape, holding a few arrays of that shape whatever the number
+    of arrays added.
+
+    NaN values (e.g. below the terrain) are left out of the statistics of
+    their element, which are NaN where no value was added. The mean and
+    variance are updated with Welford's algorithm, and the variance is
+    that of the values (ddof=0).
+    """
+
+    def __init__(
+        self, statistics: Sequence[str], shape: tuple[int, ...]
+    ) -> None:
+        """
+        Args:
+            statistics (Sequence[str]): Statistics computed, from
+                AGGREGATE_STATISTICS or percentiles such as "p90".
+            shape (tuple[int, ...]): Shape of the arrays added.
+        """
+        validate_statistics(statistics)
+        self._count = np.zeros(shape, dtype=np.int64)
+        self._mean = np.zeros(shape)
+        self._m2 = np.zeros(shape)
+        self._sum = np.zeros(shape)
+        self._min = np.full(shape, np.inf)
+        self._max = np.full(shape, -np.inf)
+        self._quantiles = {
+            statistic: P2Quantile(quantile, shape)
+            for statistic in statistics
+            if (quantile := parse_percentile(statistic)) is not None
+        }
+
+    def add(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        self._count += valid
+        delta = np.where(valid, values - self._mean, 0.0)
+        self._mean += delta / np.maximum(self._count, 1)
+        self._m2 += np.where(valid, delta * (values - self._mean), 0.0)
+        self._sum += np.where(valid, values, 0.0)
+        self._min = np.fmin(self._min, values)
+        self._max = np.fmax(self._max, values)
+        for quantile in self._quantiles.values():
+            quantile.add(values)
+
+    def result(self, statistic: str) -> np.ndarray:
+        if statistic in self._quantiles:
+            return self._quantiles[statistic].result()
+        variance = self._m2 / np.maximum(self._count, 1)
+        values = {
+            "mean": self._mean,
+            "var": variance,
+            "std": np.sqrt(variance),
+            "min": self._min,
+            "max": self._max,
+            "sum": self._sum,
+        }
+        if statistic not in values:
+            raise ValueError(f"{statistic} is not computed.")
+        return np.where(self._count > 0, values[statistic], np.nan)
+
+
+class AggregationWindow(NamedTuple):
+    """Times from start (included) to end (excluded)."""
+
+    start: datetime
+    end: datetime
+
+
+class SlidingWindows:
+    """Windows of a fixed length starting every step from an origin.
+
+    A step equal to the length gives tumbling windows, a shorter one
+    overlapping (sliding) windows, e.g. 6-hour means every hour.
+    """
+
+    def __init__(
+        self, origin: datetime, length: timedelta, step: timedelta
+    ) -> None:
+        if length <= timedelta(0) or step <= timedelta(0):
+            raise ValueError("The length and step must be positive.")
+        self._origin = origin
+        self._length = length
+        self._step = step
+
+    def containing(self, datetime: datetime) -> list[AggregationWindow]:
+        """Return the windows containing a datetime, in order."""
+        elapsed = datetime - self._origin
+        if elapsed < timedelta(0):
+            return []
+        first = max((elapsed - self._length) // self._step + 1, 0)
+        last = elapsed // self._step
+        return [
+            AggregationWindow(
+                self._origin + k * self._step,
+                self._origin + k * self._step + self._length,
+            )
+            for k in range(first, last + 1)
+        ]
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from typing import Callable, Hashable, TypeVar, cast
+
+import numpy as np
+import xarray as xr
+from wrfout.handler.type import VectorComponent
+
+T = TypeVar("T")
+
+
+def _nbytes(value: np.ndarray | xr.DataArray | VectorComponent) -> int:
+    if isinstance(value, VectorComponent):
+        return value.u.nbytes + value.v.nbytes
+    return value.nbytes
+
+
+class FieldCache:
+    """LRU cache of extracted fields bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes: int) -> None:
+        if max_bytes < 0:
+            raise ValueError("max_bytes must be 0 or more.")
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[
+            Hashable, np.ndarray | xr.DataArray | VectorComponent
+        ] = OrderedDict()
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], T]) -> T:
+        """Return the cached value of the key, or compute and cache it.
+
+        Args:
+            key (Hashable): Key identifying the field.
+            compute (Callable[[], T]): Function computing the field on a miss.
+
+        Returns:
+            T: The cached or computed field.
+        """
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return cast(T, self._entries[key])
+        self.misses += 1
+        value = compute()
+        self._put(key, value)
+        return value
+
+    def _put(
+        self, key: Hashable, value: np.ndarray | xr.DataArray | VectorComponent
+    ) -> None:
+        size = _nbytes(value)
+        # a field larger than the whole budget is not kept
+        if size > self._max_bytes:
+            return
+        self._entries[key] = value
+        self._nbytes += size
+        while self._nbytes > self._max_bytes:
+            _, oldest = self._entries.popitem(last=False)
+            self._nbytes -= _nbytes(oldest)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._nbytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0.0
+        return (
+            f"field cache: {self.hits} hits, {self.misses} misses "
+            f"({hit_rate:.1f}% hit rate), {self._nbytes / 2**20:.1f} MiB held"
+        )
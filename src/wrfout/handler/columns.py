@@ -0,0 +1,258 @@
+from datetime import datetime
+from typing import Sequence, cast
+
+import netCDF4 as nc
+import numpy as np
+import xarray as xr
+from util.instrumentation import instrumented
+from wrf import ALL_TIMES, getvar, ll_to_xy, to_np
+from wrfout.handler.extraction import BaseExtractor
+from wrfout.handler.interpolation import (
+    VerticalBrackets,
+    apply_brackets,
+    compute_brackets,
+    interpolate_with_wrf,
+    validate_interpolation,
+)
+from wrfout.handler.type import (
+    ColumnPoint,
+    VectorComponent,
+    VertivalCoordinate,
+)
+from wrfout.loader.nc_columns import COLUMN_VARIABLES, read_columns
+from wrfout.loader.nc_dataset import WrfoutNetcdfDataset
+from wrfout.loader.nc_series import WrfoutNetcdfSeries
+
+
+def validate_column_variables(varnames: Sequence[str]) -> None:
+    for varname in varnames:
+        if varname != "wv_flux" and varname not in COLUMN_VARIABLES:
+            raise ValueError(
+                f"{varname} cannot be extracted in columns. Choose from {COLUMN_VARIABLES} or 'wv_flux'."
+            )
+
+
+class ColumnExtractor(BaseExtractor):
+    """Extracts the time series of variables in the grid columns of many
+    points, e.g. stations, for time-height sections.
+
+    The columns of all the points are read together for all the times of
+    each file (see read_columns), diagnosed with one getvar call per
+    variable, and interpolated onto the levels for all the times at once,
+    instead of reading the whole domain at every timestep.
+    """
+
+    def __init__(
+        self,
+        loader: WrfoutNetcdfDataset | WrfoutNetcdfSeries,
+        points: Sequence[ColumnPoint],
+        interpolation: str = "wrf",
+        log_p_interpolation: bool = False,
+        validate_interpolation: bool = False,
+    ) -> None:
+        """
+        Args:
+            loader (WrfoutNetcdfDataset | WrfoutNetcdfSeries): Loader of the
+                wrfout files.
+            points (Sequence[ColumnPoint]): Points whose nearest grid
+                columns are extracted.
+            interpolation (str, optional): Backend of the vertical
+                interpolation, "wrf" (wrf.interplevel) or "numpy".
+            log_p_interpolation (bool, optional): Whether to interpolate
+                linearly in log-p on the pressure coordinate.
+            validate_interpolation (bool, optional): Whether to check every
+                "numpy" interpolation against wrf-python.
+        """
+        if not points:
+            raise ValueError("No point is specified.")
+        super().__init__(
+            loader,
+            interpolation=interpolation,
+            log_p_interpolation=log_p_interpolation,
+            validate_interpolation=validate_interpolation,
+        )
+        self.points = tuple(points)
+        self.columns = self._find_columns()
+
+    def _find_columns(self) -> list[tuple[int, int]]:
+        """Return the (j, i) of the mass grid column nearest to each point.
+
+        Raises:
+            ValueError: If a point is outside the domain.
+        """
+        dataset = self.loader.dataset
+        xy = np.reshape(
+            to_np(
+                ll_to_xy(
+                    dataset,
+                    [point.lat for point in self.points],
+                    [point.lon for point in self.points],
+                )
+            ),
+            (2, -1),
+        )
+        ny = dataset.dimensions["south_north"].size
+        nx = dataset.dimensions["west_east"].size
+        columns = []
+        for point, (i, j) in zip(self.points, xy.T):
+            if not (0 <= j < ny and 0 <= i < nx):
+                raise ValueError(
+                    f"Point {point.name} ({point.lat}°N, {point.lon}°E) is outside the domain."
+                )
+            columns.append((int(j), int(i)))
+        return columns
+
+    def get_terrain_columns(self) -> np.ndarray:
+        """Return the terrain height [m] of the columns."""
+        columns = read_columns(self.loader.dataset, 0, self.columns)
+        try:
+            return to_np(getvar(columns, "ter", timeidx=0))[::2, 0]
+        finally:
+            columns.close()
+
+    @instrumented("extract")
+    def get_time_height(
+        self,
+        varnames: list[str],
+        vertical_coord: VertivalCoordinate,
+        levels: np.ndarray,
+        datetimes: list[datetime] | None = None,
+    ) -> dict[str, xr.DataArray | VectorComponent]:
+        """Interpolate variables in the columns onto the levels.
+
+        Args:
+            varnames (list[str]): Names of the variables, from
+                COLUMN_VARIABLES or "wv_flux".
+            datetimes (list[datetime] | None, optional): Datetimes
+                extracted. None extracts all the times of the loader.
+
+        Returns:
+            dict[str, xr.DataArray | VectorComponent]: Array(s) of
+                (Time, ..., vertical, point) of each variable.
+
+        Raises:
+            ValueError: If a variable is not computed column by column.
+        """
+        validate_column_variables(varnames)
+        if datetimes is None:
+            datetimes = self.loader.time_index.datetimes
+        blocks: dict[str, list[list[np.ndarray]]] = {
+            varname: [] for varname in varnames
+        }
+        templates: dict[str, xr.DataArray] = {}
+        for group in self._group_by_file(datetimes):
+            dataset = self.loader.locate(group[0])[0]
+            timeidxs = [self.loader.locate(dt)[1] for dt in group]
+            columns = read_columns(dataset, timeidxs, self.columns)
+            try:
+                self._interpolate_group(
+                    columns,
+                    varnames,
+                    vertical_coord,
+                    levels,
+                    blocks,
+                    templates,
+                )
+            finally:
+                columns.close()
+
+        coords = {
+            "Time": datetimes,
+            "vertical": levels,
+            "point": [point.name for point in self.points],
+        }
+        time_height: dict[str, xr.DataArray | VectorComponent] = {}
+        for varname, components in blocks.items():
+            arrays = [
+                xr.DataArray(
+                    np.concatenate(component_blocks),
+                    name=templates[varname].name,
+                    dims=("Time",)
+                    + templates[varname].dims[1:-2]
+                    + ("vertical", "point"),
+                    coords=coords,
+                    attrs=templates[varname].attrs,
+                )
+                for component_blocks in zip(*components)
+            ]
+            time_height[varname] = (
+                VectorComponent(*arrays) if len(arrays) == 2 else arrays[0]
+            )
+        return time_height
+
+    def _diagnose(
+        self, columns: nc.Dataset, varname: str, diagnosed: dict
+    ) -> xr.DataArray:
+        if varname not in diagnosed:
+            diagnosed[varname] = cast(
+                xr.DataArray,
+                getvar(columns, varname, timeidx=ALL_TIMES, squeeze=False),
+            ).transpose("Time", ...)[..., ::2, 0]
+        return diagnosed[varname]
+
+    def _interpolate_group(
+        self,
+        columns: nc.Dataset,
+        varnames: list[str],
+        vertical_coord: VertivalCoordinate,
+        levels: np.ndarray,
+        blocks: dict[str, list[list[np.ndarray]]],
+        templates: dict[str, xr.DataArray],
+    ) -> None:
+        """Interpolate the variables of the times of one file and append
+        them to their blocks."""
+        diagnosed: dict[str, xr.DataArray] = {}
+        if vertical_coord == VertivalCoordinate.PRESSURE:
+            z = to_np(self._diagnose(columns, "p", diagnosed)) * 0.01
+        elif vertical_coord == VertivalCoordinate.HEIGHT:
+            z = to_np(self._diagnose(columns, "z", diagnosed))
+        else:
+            raise ValueError("Invalid vertical coordinate type")
+        log = (
+            self._log_p_interpolation
+            and vertical_coord == VertivalCoordinate.PRESSURE
+        )
+        # the brackets of the coordinate are shared by the variables
+        brackets = (
+            compute_brackets(z, levels, log)
+            if self._interpolation == "numpy"
+            else None
+        )
+        for varname in varnames:
+            if varname == "wv_flux":
+                wind = to_np(self._diagnose(columns, "uvmet", diagnosed))
+                mixing_ratio = self._diagnose(columns, "QVAPOR", diagnosed)
+                templates[varname] = mixing_ratio
+                components = [
+                    to_np(mixing_ratio) * 1000 * wind[:, 0],
+                    to_np(mixing_ratio) * 1000 * wind[:, 1],
+                ]
+            else:
+                var_columns = self._diagnose(columns, varname, diagnosed)
+                templates[varname] = var_columns
+                components = [to_np(var_columns)]
+            blocks[varname].append(
+                [
+                    self._interpolate(component, z, levels, log, brackets)
+                    for component in components
+                ]
+            )
+
+    @instrumented("interpolate")
+    def _interpolate(
+        self,
+        var_columns: np.ndarray,
+        z: np.ndarray,
+        levels: np.ndarray,
+        log: bool,
+        brackets: VerticalBrackets | None,
+    ) -> np.ndarray:
+        if brackets is None:
+            return interpolate_with_wrf(var_columns, z, levels, log)
+        time_height = apply_brackets(var_columns, brackets)
+        if self._validate_interpolation:
+            validate_interpolation(
+                time_height,
+                interpolate_with_wrf(var_columns, z, levels, log),
+            )
+        return time_height
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+from glob import glob
+
+import numpy as np
+import xarray as xr
+from util.file import atomic_write
+from util.instrumentation import instrumented
+from wrf import CoordPair
+from wrfout.handler.type import VectorComponent
+
+STORAGE_TYPES = ("float64", "float32", "float16", "int16")
+INT16_FILL = np.iinfo(np.int16).min
+
+
+def file_identity(path: str) -> tuple[str, int, int]:
+    """Return (absolute path, size, mtime in ns) identifying a file."""
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+def _to_json(value: object) -> object:
+    # numpy scalars keep their value, other objects (e.g. projection) a repr
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+class SectionDiskCache:
+    """Persistent cache of extracted cross-section arrays.
+
+    Each entry is a compressed NPZ file named after the hash of its key, so
+    a re-render with only styling changes reads the arrays back instead of
+    running the WRF diagnostics and the interpolation again.
+    """
+
+    def __init__(self, cache_dir: str, storage: str = "float64") -> None:
+        if storage not in STORAGE_TYPES:
+            raise ValueError(
+                f"Invalid storage type: {storage}. Choose from {STORAGE_TYPES}."
+            )
+        self._cache_dir = cache_dir
+        self._storage = storage
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _build_path(self, key: dict) -> str:
+        serialized = json.dumps(
+            {**key, "storage": self._storage}, sort_keys=True, default=str
+        )
+        digest = hashlib.sha256(serialized.encode()).hexdigest()
+        return os.path.join(self._cache_dir, f"{digest}.npz")
+
+    def _encode(self, values: np.ndarray) -> dict[str, np.ndarray]:
+        if self._storage == "float64":
+            return {"values": np.asarray(values, dtype=np.float64)}
+        values = np.asarray(values, dtype=np.float32)
+        if self._storage == "float32":
+            return {"values": values}
+        if self._storage == "float16":
+            return {"values": values.astype(np.float16)}
+        # scaled int16 keeps the resolution of (max - min) / 65534
+        finite = values[np.isfinite(values)]
+        offset = float(finite.min()) if finite.size else 0.0
+        span = float(finite.max()) - offset if finite.size else 0.0
+        scale = span / (np.iinfo(np.int16).max * 2) if span > 0 else 1.0
+        packed = np.full(values.shape, INT16_FILL, dtype=np.int16)
+        mask = np.isfinite(values)
+        packed[mask] = np.round(
+            (values[mask] - offset) / scale + np.iinfo(np.int16).min + 1
+        ).astype(np.int16)
+        return {
+            "values": packed,
+            "scale": np.float64(scale),
+            "offset": np.float64(offset),
+        }
+
+    def _decode(self, npz, prefix: str) -> np.ndarray:
+        values = npz[f"{prefix}values"]
+        if values.dtype != np.int16:
+            return values.astype(np.float64)
+        decoded = (
+            values.astype(np.float64) - np.iinfo(np.int16).min - 1
+        ) * npz[f"{prefix}scale"] + npz[f"{prefix}offset"]
+        decoded[values == INT16_FILL] = np.nan
+        return decoded
+
+    @instrumented("section_cache")
+    def load(
+        self, key: dict
+    ) -> xr.DataArray | VectorComponent | np.ndarray | None:
+        path = self._build_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                kind = str(npz["kind"])
+                if kind == "ndarray":
+                    return self._decode(npz, "")
+                if kind == "vector":
+                    return VectorComponent(
+                        self._to_dataarray(npz, "u_"),
+                        self._to_dataarray(npz, "v_"),
+                    )
+                return self._to_dataarray(npz, "")
+        except (OSError, KeyError, ValueError):
+            # a broken entry is treated as a miss and overwritten later
+            return None
+        finally:
+            # the access time orders the entries for cleanup
+            if os.path.exists(path):
+                os.utime(path)
+
+    @instrumented("section_cache")
+    def save(
+        self, key: dict, value: xr.DataArray | VectorComponent | np.ndarray
+    ) -> None:
+        if isinstance(value, VectorComponent):
+            contents = {
+                "kind": np.array("vector"),
+                **self._from_dataarray(value.u, "u_"),
+                **self._from_dataarray(value.v, "v_"),
+            }
+        elif isinstance(value, xr.DataArray):
+            contents = {
+                "kind": np.array("dataarray"),
+                **self._from_dataarray(value, ""),
+            }
+        else:
+            contents = {"kind": np.array("ndarray"), **self._encode(value)}
+        path = self._build_path(key)
+        with atomic_write(path, mode="wb") as f:
+            np.savez_compressed(f, **contents)
+
+    def _from_dataarray(
+        self, array: xr.DataArray, prefix: str
+    ) -> dict[str, np.ndarray]:
+        xy_loc = array["xy_loc"].values
+        contents = {
+            "dims": np.array(array.dims),
+            "name": np.array(str(array.name)),
+            "attrs": np.array(json.dumps(array.attrs, default=_to_json)),
+            "vertical": array["vertical"].values,
+            "distance": array["distance"].values,
+            "xy": np.array([[pair.x, pair.y] for pair in xy_loc]),
+            "latlon": np.array([[pair.lat, pair.lon] for pair in xy_loc]),
+            **self._encode(array.values),
+        }
+        return {prefix + name: value for name, value in contents.items()}
+
+    def _to_dataarray(self, npz, prefix: str) -> xr.DataArray:
+        xy = npz[f"{prefix}xy"]
+        latlon = npz[f"{prefix}latlon"]
+        xy_loc = np.empty(xy.shape[0], dtype=np.object_)
+        for i in range(xy.shape[0]):
+            xy_loc[i] = CoordPair(
+                x=xy[i, 0], y=xy[i, 1], lat=latlon[i, 0], lon=latlon[i, 1]
+            )
+        return xr.DataArray(
+            self._decode(npz, prefix),
+            name=str(npz[f"{prefix}name"]),
+            dims=tuple(str(dim) for dim in npz[f"{prefix}dims"]),
+            coords={
+                "vertical": npz[f"{prefix}vertical"],
+                "xy_loc": ("cross_line_idx", xy_loc),
+                "distance": ("cross_line_idx", npz[f"{prefix}distance"]),
+            },
+            attrs=json.loads(str(npz[f"{prefix}attrs"])),
+        )
+
+
+def cleanup_section_cache(cache_dir: str, max_bytes: int) -> int:
+    """Delete the least recently used entries until the cache fits the size.
+
+    Args:
+        cache_dir (str): Directory of the cache.
+        max_bytes (int): Maximum total size of the cache in bytes.
+
+    Returns:
+        int: Number of deleted entries.
+    """
+    entries = []
+    for path in glob(os.path.join(cache_dir, "*.npz")):
+        stat = os.stat(path)
+        entries.append((stat.st_atime, stat.st_size, path))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
+        removed += 1
+    return removed
@@ -1,58 +1,541 @@
 from datetime import datetime
-from typing import cast
+from typing import Sequence, cast
 
+import netCDF4 as nc
 import numpy as np
 import xarray as xr
-from wrf import CoordPair, getvar, interpline, vertcross
+from util.instrumentation import instrumented
+from wrf import ALL_TIMES, CoordPair, getvar, to_np
+from wrfout.handler.cache import FieldCache
+from wrfout.handler.disk_cache import SectionDiskCache, file_identity
+from wrfout.handler.geometry import CrossSectionGeometry
+from wrfout.handler.interpolation import (
+    INTERPOLATION_BACKENDS,
+    VerticalBrackets,
+    apply_brackets,
+    compute_brackets,
+    interpolate_with_wrf,
+    validate_interpolation,
+)
 from wrfout.handler.type import VectorComponent, VertivalCoordinate
+from wrfout.loader.nc_chunked import ChunkedWrfoutReader
 from wrfout.loader.nc_dataset import WrfoutNetcdfDataset
+from wrfout.loader.nc_series import WrfoutNetcdfSeries
+from wrfout.loader.nc_subset import read_subset
+
+
+def _path_key(
+    start_point: CoordPair,
+    end_point: CoordPair,
+    waypoints: Sequence[CoordPair],
+) -> tuple[float | None, ...]:
+    return (
+        start_point.lat,
+        start_point.lon,
+        *(coord for point in waypoints for coord in (point.lat, point.lon)),
+        end_point.lat,
+        end_point.lon,
+    )
 
 
 class BaseExtractor:
-    def __init__(self, loader: WrfoutNetcdfDataset) -> None:
+    def __init__(
+        self,
+        loader: WrfoutNetcdfDataset | WrfoutNetcdfSeries,
+        cache_max_bytes: int = 2**30,
+        subset_halo: int | None = None,
+        interpolation: str = "wrf",
+        log_p_interpolation: bool = False,
+        validate_interpolation: bool = False,
+        chunked_reader: ChunkedWrfoutReader | None = None,
+    ) -> None:
+        if subset_halo is not None and subset_halo < 0:
+            raise ValueError("subset_halo must be 0 or more.")
+        if chunked_reader is not None and subset_halo is None:
+            raise ValueError(
+                "Chunked loading reads windows around the sections and needs subset_halo."
+            )
+        if interpolation not in INTERPOLATION_BACKENDS:
+            raise ValueError(
+                f"Invalid interpolation: {interpolation}. Choose from {INTERPOLATION_BACKENDS}."
+            )
         self.loader = loader
-        self.loader.load()
+        # a loader shared by several extractors is opened once
+        if not self.loader.is_loaded:
+            self.loader.load()
+        self.field_cache = FieldCache(max_bytes=cache_max_bytes)
+        self._geometries: dict[
+            tuple[float | None, ...], CrossSectionGeometry
+        ] = {}
+        self._subset_halo = subset_halo
+        self._shared_window: tuple[int, int, int, int] | None = None
+        self._chunked_reader = chunked_reader
+        # (timestep or block, times read, window) -> in-memory subset
+        self._subsets: dict[tuple, nc.Dataset] = {}
+        self._vertical_coords: dict[
+            tuple[
+                int | tuple[str, int],
+                VertivalCoordinate,
+                tuple[int, int, int, int] | None,
+            ],
+            np.ndarray,
+        ] = {}
+        self._interpolation = interpolation
+        self._log_p_interpolation = log_p_interpolation
+        self._validate_interpolation = validate_interpolation
+        # brackets of the vertical coordinate shared by the variables
+        self._brackets: dict[tuple, VerticalBrackets] = {}
+
+    def refresh(
+        self,
+        wrfout_paths: list[str] | None = None,
+        hold_last_record: bool = False,
+    ) -> list[datetime]:
+        """Index the times appended to the wrfout files since they were
+        loaded (see the refresh of the loader).
+
+        Returns:
+            list[datetime]: Datetimes added.
+        """
+        added = self.loader.refresh(wrfout_paths, hold_last_record)
+        if self._chunked_reader is not None:
+            # the lazy views are reopened with the records appended
+            self._chunked_reader.close()
+        return added
+
+    def get_geometry(
+        self,
+        start_point: CoordPair,
+        end_point: CoordPair,
+        waypoints: Sequence[CoordPair] = (),
+    ) -> CrossSectionGeometry:
+        key = _path_key(start_point, end_point, waypoints)
+        if key not in self._geometries:
+            self._geometries[key] = CrossSectionGeometry(
+                self.loader.dataset, start_point, end_point, waypoints
+            )
+        return self._geometries[key]
+
+    def get_window(
+        self,
+        start_point: CoordPair,
+        end_point: CoordPair,
+        waypoints: Sequence[CoordPair] = (),
+    ) -> tuple[int, int, int, int] | None:
+        """Return the window of the grid read for the section, or None when
+        the whole domain is read.
+        """
+        if self._subset_halo is None:
+            return None
+        geometry = self.get_geometry(start_point, end_point, waypoints)
+        window = geometry.bounding_box(self._subset_halo)
+        shared = self._shared_window
+        if (
+            shared is not None
+            and shared[0] <= window[0]
+            and window[1] <= shared[1]
+            and shared[2] <= window[2]
+            and window[3] <= shared[3]
+        ):
+            return shared
+        return window
+
+    def share_window(self, sections: list[tuple[CoordPair, ...]]) -> None:
+        """Read one window covering all the sections, so that the fields
+        of a timestep are read and diagnosed once for all of them.
+
+        Args:
+            sections (list[tuple[CoordPair, ...]]): Start and end points of
+                the sections, followed by their waypoints if any.
+        """
+        if self._subset_halo is None or not sections:
+            return
+        windows = np.array(
+            [
+                self.get_geometry(
+                    points[0], points[1], points[2:]
+                ).bounding_box(self._subset_halo)
+                for points in sections
+            ]
+        )
+        self._shared_window = (
+            int(windows[:, 0].min()),
+            int(windows[:, 1].max()),
+            int(windows[:, 2].min()),
+            int(windows[:, 3].max()),
+        )
+
+    def _locate(
+        self,
+        datetime: datetime,
+        window: tuple[int, int, int, int] | None,
+    ) -> tuple[nc.Dataset, int]:
+        if window is None:
+            return self.loader.locate(datetime)
+        location = self.loader.datetime_index_map[datetime]
+        return self._read_window([datetime], window, location), 0
 
+    def _read_window(
+        self,
+        datetimes: list[datetime],
+        window: tuple[int, int, int, int],
+        owner: object,
+    ) -> nc.Dataset:
+        """Read the window of some times of one file into an in-memory
+        dataset, kept until the subsets of another owner (the timestep or
+        block being extracted) are read.
+        """
+        times = tuple(self.loader.datetime_index_map[dt] for dt in datetimes)
+        key = (owner, times, window)
+        if key not in self._subsets:
+            # keep only the subsets of the timestep or block being drawn
+            for cached_key in list(self._subsets.keys()):
+                if cached_key[0] != owner:
+                    self._subsets.pop(cached_key).close()
+            dataset = self.loader.locate(datetimes[0])[0]
+            timeidxs = [self.loader.locate(dt)[1] for dt in datetimes]
+            if self._chunked_reader is None:
+                subset = read_subset(dataset, timeidxs, window)
+            else:
+                subset = self._chunked_reader.read_subset(
+                    dataset,
+                    self.loader.path_of(datetimes[0]),
+                    timeidxs,
+                    window,
+                )
+            self._subsets[key] = subset
+        return self._subsets[key]
+
+    @instrumented("diagnose")
     def get_var_dataarray(
-        self, varname: str, datetime: datetime
+        self,
+        varname: str,
+        datetime: datetime,
+        window: tuple[int, int, int, int] | None = None,
     ) -> xr.DataArray:
-        var_dataarray = cast(
-            xr.DataArray,
-            getvar(
-                self.loader.dataset,
-                varname,
-                timeidx=self.loader.datetime_index_map[datetime],
-            ),
+        def compute() -> xr.DataArray:
+            dataset, timeidx = self._locate(datetime, window)
+            try:
+                return cast(
+                    xr.DataArray, getvar(dataset, varname, timeidx=timeidx)
+                )
+            except KeyError:
+                # the whole domain is never read in chunked loading
+                if window is None or self._chunked_reader is not None:
+                    raise
+            # the subset lacks a variable needed by the diagnostic
+            dataset, timeidx = self.loader.locate(datetime)
+            j_start, j_end, i_start, i_end = window
+            return cast(
+                xr.DataArray, getvar(dataset, varname, timeidx=timeidx)
+            )[..., j_start:j_end, i_start:i_end]
+
+        key = (
+            "dataarray",
+            varname,
+            self.loader.datetime_index_map[datetime],
+            window,
+        )
+        return self.field_cache.get_or_compute(key, compute)
+
+    @instrumented("diagnose")
+    def get_vertical_coord_array(
+        self,
+        datetime: datetime,
+        vertical_coord: VertivalCoordinate,
+        window: tuple[int, int, int, int] | None = None,
+    ) -> np.ndarray:
+        location = self.loader.datetime_index_map[datetime]
+        key = (location, vertical_coord, window)
+        if key in self._vertical_coords:
+            return self._vertical_coords[key]
+        # keep only the coordinates of the timestep being drawn
+        self._vertical_coords = {
+            cached_key: z
+            for cached_key, z in self._vertical_coords.items()
+            if cached_key[0] == location
+        }
+        dataset, timeidx = self._locate(datetime, window)
+        if vertical_coord == VertivalCoordinate.PRESSURE:
+            z = to_np(getvar(dataset, "p", timeidx=timeidx)) * 0.01
+        elif vertical_coord == VertivalCoordinate.HEIGHT:
+            z = to_np(getvar(dataset, "z", timeidx=timeidx))
+        else:
+            raise ValueError("Invalid vertical coordinate type")
+        self._vertical_coords[key] = z
+        return z
+
+    def get_var_block_dataarray(
+        self,
+        varname: str,
+        datetimes: list[datetime],
+        window: tuple[int, int, int, int] | None = None,
+    ) -> xr.DataArray:
+        """Return the variable at several times stacked along a leading Time
+        dimension. A file whose times are all requested is read in one
+        getvar call with ALL_TIMES.
+
+        Args:
+            window (tuple[int, int, int, int] | None, optional): Window of
+                the grid read. The times of each file are then read in one
+                subset. None reads the whole domain.
+        """
+        key = ("block", varname, tuple(datetimes), window)
+        return self.field_cache.get_or_compute(
+            key, lambda: self._read_var_block(varname, datetimes, window)
         )
-        return var_dataarray
+
+    @instrumented("diagnose")
+    def _read_var_block(
+        self,
+        varname: str,
+        datetimes: list[datetime],
+        window: tuple[int, int, int, int] | None = None,
+    ) -> xr.DataArray:
+        blocks: list[np.ndarray] = []
+        var_dataarray: xr.DataArray | None = None
+        for group in self._group_by_file(datetimes):
+            if window is not None:
+                subset = self._read_window(group, window, tuple(datetimes))
+                var_dataarray = cast(
+                    xr.DataArray,
+                    getvar(subset, varname, timeidx=ALL_TIMES, squeeze=False),
+                ).transpose("Time", ...)
+                blocks.append(to_np(var_dataarray))
+                continue
+            dataset = self.loader.locate(group[0])[0]
+            timeidxs = [self.loader.locate(dt)[1] for dt in group]
+            if timeidxs == list(range(dataset.dimensions["Time"].size)):
+                var_dataarray = cast(
+                    xr.DataArray,
+                    getvar(dataset, varname, timeidx=ALL_TIMES, squeeze=False),
+                ).transpose("Time", ...)
+                blocks.append(to_np(var_dataarray))
+                continue
+            for timeidx in timeidxs:
+                var_dataarray = cast(
+                    xr.DataArray, getvar(dataset, varname, timeidx=timeidx)
+                )
+                blocks.append(to_np(var_dataarray)[np.newaxis])
+        if var_dataarray is None:
+            raise ValueError("No datetime is specified.")
+        return xr.DataArray(
+            np.concatenate(blocks),
+            name=var_dataarray.name,
+            dims=("Time",) + var_dataarray.dims[-(blocks[0].ndim - 1) :],
+            attrs=var_dataarray.attrs,
+        )
+
+    def _group_by_file(
+        self, datetimes: list[datetime]
+    ) -> list[list[datetime]]:
+        groups: list[list[datetime]] = []
+        for datetime in datetimes:
+            path = self.loader.path_of(datetime)
+            if groups and self.loader.path_of(groups[-1][0]) == path:
+                groups[-1].append(datetime)
+            else:
+                groups.append([datetime])
+        return groups
+
+    def get_vertical_coord_block(
+        self,
+        datetimes: list[datetime],
+        vertical_coord: VertivalCoordinate,
+        window: tuple[int, int, int, int] | None = None,
+    ) -> np.ndarray:
+        if vertical_coord == VertivalCoordinate.PRESSURE:
+            return (
+                to_np(self.get_var_block_dataarray("p", datetimes, window))
+                * 0.01
+            )
+        elif vertical_coord == VertivalCoordinate.HEIGHT:
+            return to_np(self.get_var_block_dataarray("z", datetimes, window))
+        else:
+            raise ValueError("Invalid vertical coordinate type")
 
     def get_vertcross_array(
         self,
         var_array: xr.DataArray,
+        datetime: datetime,
         start_point: CoordPair,
         end_point: CoordPair,
         vertical_coord: VertivalCoordinate,
         levels: np.ndarray,
+        waypoints: Sequence[CoordPair] = (),
+        window: tuple[int, int, int, int] | None = None,
     ) -> xr.DataArray:
-        if vertical_coord == VertivalCoordinate.PRESSURE:
-            z = getvar(self.loader.dataset, "p") * 0.01
-        elif vertical_coord == VertivalCoordinate.HEIGHT:
-            z = getvar(self.loader.dataset, "z")
+        """Interpolate a field onto the section.
+
+        Args:
+            window (tuple[int, int, int, int] | None, optional): Window of
+                the grid the field is read on (see get_window). None means
+                the whole domain.
+        """
+        z = self.get_vertical_coord_array(datetime, vertical_coord, window)
+        geometry = self.get_geometry(start_point, end_point, waypoints)
+        if window is not None:
+            geometry = geometry.subset(window)
+        section_key = (
+            self.loader.datetime_index_map[datetime],
+            vertical_coord,
+            window,
+            *_path_key(start_point, end_point, waypoints),
+        )
+        return self._interpolate_to_section(
+            var_array, z, geometry, levels, vertical_coord, section_key
+        )
+
+    def get_vertcross_block(
+        self,
+        var_block: xr.DataArray,
+        datetimes: list[datetime],
+        start_point: CoordPair,
+        end_point: CoordPair,
+        vertical_coord: VertivalCoordinate,
+        levels: np.ndarray,
+        waypoints: Sequence[CoordPair] = (),
+        window: tuple[int, int, int, int] | None = None,
+    ) -> xr.DataArray:
+        """Interpolate a block of times onto the section in one call.
+
+        Returns:
+            xr.DataArray: Array of (Time, ..., vertical, cross_line_idx).
+        """
+        z = self.get_vertical_coord_block(datetimes, vertical_coord, window)
+        geometry = self.get_geometry(start_point, end_point, waypoints)
+        if window is not None:
+            geometry = geometry.subset(window)
+        section_key = (
+            tuple(datetimes),
+            vertical_coord,
+            window,
+            *_path_key(start_point, end_point, waypoints),
+        )
+        return self._interpolate_to_section(
+            var_block, z, geometry, levels, vertical_coord, section_key
+        )
+
+    @instrumented("interpolate")
+    def _interpolate_to_section(
+        self,
+        var_array: xr.DataArray,
+        z: np.ndarray,
+        geometry: CrossSectionGeometry,
+        levels: np.ndarray,
+        vertical_coord: VertivalCoordinate,
+        section_key: tuple,
+    ) -> xr.DataArray:
+        """Interpolate a field onto the levels of the section.
+
+        Args:
+            section_key (tuple): Timestep, vertical coordinate, window and
+                points of the section, identifying the vertical coordinate
+                on it. The brackets of the coordinate are reused by the
+                variables with the same key.
+        """
+        var_line = geometry.interpolate(to_np(var_array))
+        log = (
+            self._log_p_interpolation
+            and vertical_coord == VertivalCoordinate.PRESSURE
+        )
+        if self._interpolation == "wrf":
+            cross = interpolate_with_wrf(
+                var_line, geometry.interpolate(z), levels, log
+            )
         else:
-            raise ValueError("Invalid vertical coordinate type")
-        return vertcross(
-            var_array,
-            z,
-            wrfin=self.loader.dataset,
-            start_point=start_point,
-            end_point=end_point,
-            levels=levels,
-            latlon=True,
-            meta=True,
+            key = section_key + (levels.tobytes(), log)
+            if key not in self._brackets:
+                # keep only the brackets of the timestep being drawn
+                self._brackets = {
+                    cached_key: brackets
+                    for cached_key, brackets in self._brackets.items()
+                    if cached_key[0] == section_key[0]
+                }
+                self._brackets[key] = compute_brackets(
+                    geometry.interpolate(z), levels, log
+                )
+            cross = apply_brackets(var_line, self._brackets[key])
+            if self._validate_interpolation:
+                validate_interpolation(
+                    cross,
+                    interpolate_with_wrf(
+                        var_line, geometry.interpolate(z), levels, log
+                    ),
+                )
+        return xr.DataArray(
+            cross,
+            name=f"{var_array.name}_cross",
+            dims=var_array.dims[:-3] + ("vertical", "cross_line_idx"),
+            coords={
+                "vertical": levels,
+                "xy_loc": ("cross_line_idx", geometry.xy_loc),
+                "distance": ("cross_line_idx", geometry.distances),
+            },
+            attrs=var_array.attrs,
         )
 
 
 class VariableExtractor(BaseExtractor):
+    def __init__(
+        self,
+        loader: WrfoutNetcdfDataset | WrfoutNetcdfSeries,
+        block_size: int = 1,
+        cache_max_bytes: int = 2**30,
+        disk_cache: SectionDiskCache | None = None,
+        subset_halo: int | None = None,
+        interpolation: str = "wrf",
+        log_p_interpolation: bool = False,
+        validate_interpolation: bool = False,
+        chunked_reader: ChunkedWrfoutReader | None = None,
+    ) -> None:
+        """
+        Args:
+            loader (WrfoutNetcdfDataset | WrfoutNetcdfSeries): Loader of the
+                wrfout files.
+            block_size (int, optional): Number of timesteps extracted and
+                interpolated together by get_var_array. 1 extracts every
+                timestep separately and 0 extracts all times at once.
+            cache_max_bytes (int, optional): Memory budget of the cache of
+                extracted fields.
+            disk_cache (SectionDiskCache | None, optional): Persistent cache
+                of extracted cross sections. None disables it.
+            subset_halo (int | None, optional): Number of grid points read
+                around the section when extracting a single timestep. Only
+                this window of the domain is read and diagnosed. None reads
+                the whole domain.
+            interpolation (str, optional): Backend of the vertical
+                interpolation, "wrf" (wrf.interplevel) or "numpy" (all
+                columns at once, with brackets shared by the variables).
+            log_p_interpolation (bool, optional): Whether to interpolate
+                linearly in log-p on the pressure coordinate.
+            validate_interpolation (bool, optional): Whether to check every
+                "numpy" interpolation against wrf-python.
+            chunked_reader (ChunkedWrfoutReader | None, optional): Lazy
+                chunked view of the files. The fields are then read only
+                from the chunks around the section, also for blocks of
+                times, which are shortened to stay within its memory
+                ceiling. Needs subset_halo. None reads with netCDF4.
+        """
+        super().__init__(
+            loader,
+            cache_max_bytes=cache_max_bytes,
+            subset_halo=subset_halo,
+            interpolation=interpolation,
+            log_p_interpolation=log_p_interpolation,
+            validate_interpolation=validate_interpolation,
+            chunked_reader=chunked_reader,
+        )
+        if block_size < 0:
+            raise ValueError("block_size must be 0 or more.")
+        self._block_size = block_size
+        self._disk_cache = disk_cache
+        # the latest block of each (variable, section, levels)
+        self._blocks: dict[
+            tuple, tuple[list[datetime], xr.DataArray | VectorComponent]
+        ] = {}
+
+    @instrumented("extract")
     def get_var_array(
         self,
         varname: str,
@@ -61,53 +544,303 @@ class VariableExtractor(BaseExtractor):
         end_point: CoordPair,
         vertical_coord: VertivalCoordinate,
         levels: np.ndarray,
+        waypoints: Sequence[CoordPair] = (),
     ) -> xr.DataArray | VectorComponent:
+        key = (
+            "section",
+            varname,
+            self.loader.datetime_index_map[datetime],
+            *_path_key(start_point, end_point, waypoints),
+            vertical_coord,
+            levels.tobytes(),
+        )
+        return self.field_cache.get_or_compute(
+            key,
+            lambda: self._load_or_extract_var_array(
+                varname,
+                datetime,
+                start_point,
+                end_point,
+                vertical_coord,
+                levels,
+                waypoints=waypoints,
+            ),
+        )
+
+    def _build_disk_cache_key(
+        self,
+        varname: str,
+        datetime: datetime,
+        start_point: CoordPair,
+        end_point: CoordPair,
+        vertical_coord: VertivalCoordinate | None,
+        levels: np.ndarray | None,
+        waypoints: Sequence[CoordPair] = (),
+    ) -> dict:
+        return {
+            "wrfout": file_identity(self.loader.path_of(datetime)),
+            "location": self.loader.datetime_index_map[datetime],
+            "varname": varname,
+            "start_point": (start_point.lat, start_point.lon),
+            "end_point": (end_point.lat, end_point.lon),
+            "waypoints": [(point.lat, point.lon) for point in waypoints],
+            "vertical_coord": (
+                None if vertical_coord is None else vertical_coord.name
+            ),
+            "levels": None if levels is None else levels.tolist(),
+            "log_p": self._log_p_interpolation,
+        }
+
+    def _load_or_extract_var_array(
+        self,
+        varname: str,
+        datetime: datetime,
+        start_point: CoordPair,
+        end_point: CoordPair,
+        vertical_coord: VertivalCoordinate,
+        levels: np.ndarray,
+        waypoints: Sequence[CoordPair] = (),
+    ) -> xr.DataArray | VectorComponent:
+        disk_key = self._build_disk_cache_key(
+            varname,
+            datetime,
+            start_point,
+            end_point,
+            vertical_coord,
+            levels,
+            waypoints,
+        )
+        if self._disk_cache is not None:
+            cached = self._disk_cache.load(disk_key)
+            if isinstance(cached, (xr.DataArray, VectorComponent)):
+                return cached
+        if self._block_size != 1:
+            var_array = self._get_var_array_from_block(
+                varname,
+                datetime,
+                start_point,
+                end_point,
+                vertical_coord,
+                levels,
+                waypoints=waypoints,
+            )
+        else:
+            var_array = self._extract_var_array(
+                varname,
+                datetime,
+                start_point,
+                end_point,
+                vertical_coord,
+                levels,
+                waypoints=waypoints,
+            )
+        if self._disk_cache is not None:
+            self._disk_cache.save(disk_key, var_array)
+        return var_array
+
+    def _extract_var_array(
+        self,
+        varname: str,
+        datetime: datetime,
+        start_point: CoordPair,
+        end_point: CoordPair,
+        vertical_coord: VertivalCoordinate,
+        levels: np.ndarray,
+        waypoints: Sequence[CoordPair] = (),
+    ) -> xr.DataArray | VectorComponent:
+        window = self.get_window(start_point, end_point, waypoints)
         if varname == "wv_flux":
-            wv_flux_uv = self._calc_moisture_flux(datetime)
+            wv_flux_uv = self._calc_moisture_flux(datetime, window)
             u_component, v_component = wv_flux_uv.u, wv_flux_uv.v
             u_vert_array = super().get_vertcross_array(
                 u_component,
+                datetime,
                 start_point,
                 end_point,
                 vertical_coord,
                 levels=levels,
+                waypoints=waypoints,
+                window=window,
             )
             v_vert_array = super().get_vertcross_array(
                 v_component,
+                datetime,
                 start_point,
                 end_point,
                 vertical_coord,
                 levels=levels,
+                waypoints=waypoints,
+                window=window,
             )
             return VectorComponent(u_vert_array, v_vert_array)
-        var_dataarray = super().get_var_dataarray(varname, datetime)
+        var_dataarray = super().get_var_dataarray(varname, datetime, window)
         return super().get_vertcross_array(
             var_dataarray,
+            datetime,
             start_point,
             end_point,
             vertical_coord,
             levels=levels,
+            waypoints=waypoints,
+            window=window,
         )
 
-    def _calc_moisture_flux(self, datetime: datetime) -> VectorComponent:
-        wind_u = super().get_var_dataarray("uvmet", datetime)[0, :, :]
-        wind_v = super().get_var_dataarray("uvmet", datetime)[1, :, :]
-        mixing_ratio = self.get_var_dataarray("QVAPOR", datetime)
+    def get_var_block(
+        self,
+        varname: str,
+        datetimes: list[datetime],
+        start_point: CoordPair,
+        end_point: CoordPair,
+        vertical_coord: VertivalCoordinate,
+        levels: np.ndarray,
+        waypoints: Sequence[CoordPair] = (),
+    ) -> xr.DataArray | VectorComponent:
+        """Extract a variable on the section for a block of times.
+
+        Returns:
+            xr.DataArray | VectorComponent: Array(s) of
+                (Time, ..., vertical, cross_line_idx).
+        """
+        # blocks are read on the window of the section in chunked loading
+        window = (
+            self.get_window(start_point, end_point, waypoints)
+            if self._chunked_reader is not None
+            else None
+        )
+        if varname == "wv_flux":
+            wv_flux_uv = self._calc_moisture_flux_block(datetimes, window)
+            u_vert_block = super().get_vertcross_block(
+                wv_flux_uv.u,
+                datetimes,
+                start_point,
+                end_point,
+                vertical_coord,
+                levels=levels,
+                waypoints=waypoints,
+                window=window,
+            )
+            v_vert_block = super().get_vertcross_block(
+                wv_flux_uv.v,
+                datetimes,
+                start_point,
+                end_point,
+                vertical_coord,
+                levels=levels,
+                waypoints=waypoints,
+                window=window,
+            )
+            return VectorComponent(u_vert_block, v_vert_block)
+        var_block = super().get_var_block_dataarray(varname, datetimes, window)
+        return super().get_vertcross_block(
+            var_block,
+            datetimes,
+            start_point,
+            end_point,
+            vertical_coord,
+            levels=levels,
+            waypoints=waypoints,
+            window=window,
+        )
+
+    def _get_var_array_from_block(
+        self,
+        varname: str,
+        datetime: datetime,
+        start_point: CoordPair,
+        end_point: CoordPair,
+        vertical_coord: VertivalCoordinate,
+        levels: np.ndarray,
+        waypoints: Sequence[CoordPair] = (),
+    ) -> xr.DataArray | VectorComponent:
+        key = (
+            varname,
+            *_path_key(start_point, end_point, waypoints),
+            vertical_coord,
+            levels.tobytes(),
+        )
+        if key not in self._blocks or datetime not in self._blocks[key][0]:
+            time_index = self.loader.time_index
+            block_size = self._block_size or len(time_index)
+            if self._chunked_reader is not None:
+                # the times read at once stay within the memory ceiling
+                block_size = min(
+                    block_size,
+                    self._chunked_reader.max_times(
+                        self.loader.dataset,
+                        self.get_window(start_point, end_point, waypoints),
+                    ),
+                )
+            start = time_index.position(datetime) // block_size * block_size
+            datetimes = time_index.datetimes[start : start + block_size]
+            self._blocks[key] = (
+                datetimes,
+                self.get_var_block(
+                    varname,
+                    datetimes,
+                    start_point,
+                    end_point,
+                    vertical_coord,
+                    levels,
+                    waypoints=waypoints,
+                ),
+            )
+        datetimes, block = self._blocks[key]
+        index = datetimes.index(datetime)
+        if isinstance(block, VectorComponent):
+            return VectorComponent(
+                block.u.isel(Time=index), block.v.isel(Time=index)
+            )
+        return block.isel(Time=index)
+
+    def _calc_moisture_flux_block(
+        self,
+        datetimes: list[datetime],
+        window: tuple[int, int, int, int] | None = None,
+    ) -> VectorComponent:
+        wind = super().get_var_block_dataarray("uvmet", datetimes, window)
+        mixing_ratio = super().get_var_block_dataarray(
+            "QVAPOR", datetimes, window
+        )
+        return VectorComponent(
+            mixing_ratio * 1000 * wind[:, 0],
+            mixing_ratio * 1000 * wind[:, 1],
+        )
+
+    def _calc_moisture_flux(
+        self,
+        datetime: datetime,
+        window: tuple[int, int, int, int] | None = None,
+    ) -> VectorComponent:
+        wind_u = super().get_var_dataarray("uvmet", datetime, window)[0, :, :]
+        wind_v = super().get_var_dataarray("uvmet", datetime, window)[1, :, :]
+        mixing_ratio = self.get_var_dataarray("QVAPOR", datetime, window)
         return VectorComponent(
             mixing_ratio * 1000 * wind_u,
             mixing_ratio * 1000 * wind_v,
         )
 
+    @instrumented("extract")
     def get_terrain_array(
         self,
+        datetime: datetime,
         start_point: CoordPair,
         end_point: CoordPair,
+        waypoints: Sequence[CoordPair] = (),
     ) -> np.ndarray:
-        ter = getvar(self.loader.dataset, "ter")
-        return interpline(
-            ter,
-            wrfin=self.loader.dataset,
-            start_point=start_point,
-            end_point=end_point,
-            latlon=True,
+        disk_key = self._build_disk_cache_key(
+            "ter", datetime, start_point, end_point, None, None, waypoints
         )
+        if self._disk_cache is not None:
+            cached = self._disk_cache.load(disk_key)
+            if isinstance(cached, np.ndarray):
+                return cached
+        window = self.get_window(start_point, end_point, waypoints)
+        dataset, timeidx = self._locate(datetime, window)
+        ter = getvar(dataset, "ter", timeidx=timeidx)
+        geometry = self.get_geometry(start_point, end_point, waypoints)
+        if window is not None:
+            geometry = geometry.subset(window)
+        terrain_array = geometry.interpolate(to_np(ter))
+        if self._disk_cache is not None:
+            self._disk_cache.save(disk_key, terrain_array)
+        return terrain_array
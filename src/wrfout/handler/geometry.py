@@ -0,0 +1,185 @@
+import copy
+from typing import Sequence
+
+import netCDF4 as nc
+import numpy as np
+from wrf import CoordPair, getvar, ll_to_xy, to_np, xy
+
+EARTH_RADIUS_KM = 6370.0
+
+
+class CrossSectionGeometry:
+    """Horizontal geometry of a vertical cross section.
+
+    The section is a straight line from the start point to the end point,
+    or a polyline through waypoints between them. The grid points of the
+    section line, their bilinear weights and the horizontal unit vectors
+    along and across the section are computed once per (domain, start
+    point, waypoints, end point), so that every variable and time can be
+    interpolated onto the section with a single vectorized gather.
+    """
+
+    def __init__(
+        self,
+        wrfin: nc.Dataset,
+        start_point: CoordPair,
+        end_point: CoordPair,
+        waypoints: Sequence[CoordPair] = (),
+    ) -> None:
+        """
+        Args:
+            wrfin (nc.Dataset): wrfout file of the domain.
+            start_point (CoordPair): First point of the section.
+            end_point (CoordPair): Last point of the section.
+            waypoints (Sequence[CoordPair], optional): Points passed
+                through between the start and end points, in order.
+        """
+        if any(
+            point.lon is None or point.lat is None
+            for point in (start_point, *waypoints, end_point)
+        ):
+            raise ValueError(
+                "Start, end and waypoints must have longitude and latitude."
+            )
+        self.start_point = start_point
+        self.end_point = end_point
+        self.waypoints = tuple(waypoints)
+        lats = to_np(getvar(wrfin, "lat", meta=False))
+        lons = to_np(getvar(wrfin, "lon", meta=False))
+        self.grid_shape: tuple[int, int] = lats.shape
+        self.xy = self._calc_line_xy(wrfin, lats)
+        self.indices, self.weights = self._calc_bilinear_weights()
+        self.lats = self.interpolate(lats)
+        self.lons = self.interpolate(lons)
+        self.xy_loc = self._build_xy_loc()
+        self.distances = self._calc_distances()
+        self.along_track, self.cross_track = self._calc_unit_vectors()
+
+    @property
+    def npoints(self) -> int:
+        return self.xy.shape[0]
+
+    def bounding_box(self, halo: int) -> tuple[int, int, int, int]:
+        """Return the window of the mass grid touched by the section.
+
+        Args:
+            halo (int): Number of grid points added around the section.
+
+        Returns:
+            tuple[int, int, int, int]: (j_start, j_end, i_start, i_end).
+        """
+        ny, nx = self.grid_shape
+        j_indices, i_indices = self.indices
+        return (
+            max(int(j_indices.min()) - halo, 0),
+            min(int(j_indices.max()) + 1 + halo, ny),
+            max(int(i_indices.min()) - halo, 0),
+            min(int(i_indices.max()) + 1 + halo, nx),
+        )
+
+    def subset(
+        self, window: tuple[int, int, int, int]
+    ) -> "CrossSectionGeometry":
+        """Return the geometry relative to a window of the grid, so that it
+        interpolates fields read only on that window.
+        """
+        j_start, j_end, i_start, i_end = window
+        subset = copy.copy(self)
+        subset.grid_shape = (j_end - j_start, i_end - i_start)
+        subset.indices = (self.indices[0] - j_start, self.indices[1] - i_start)
+        return subset
+
+    def _calc_line_xy(self, wrfin: nc.Dataset, lats: np.ndarray) -> np.ndarray:
+        vertices = [
+            to_np(ll_to_xy(wrfin, point.lat, point.lon, meta=False))
+            for point in (self.start_point, *self.waypoints, self.end_point)
+        ]
+        segments = []
+        for segment_start, segment_end in zip(vertices[:-1], vertices[1:]):
+            segment = np.asarray(
+                xy(
+                    lats,
+                    start_point=(segment_start[0], segment_start[1]),
+                    end_point=(segment_end[0], segment_end[1]),
+                    meta=False,
+                ),
+                dtype=np.float64,
+            )
+            # a segment starts at the last point of the previous one
+            segments.append(segment if not segments else segment[1:])
+        return np.concatenate(segments)
+
+    def _calc_bilinear_weights(self) -> tuple[np.ndarray, np.ndarray]:
+        ny, nx = self.grid_shape
+        x, y = self.xy[:, 0], self.xy[:, 1]
+        x0 = np.clip(np.floor(x).astype(np.intp), 0, nx - 2)
+        y0 = np.clip(np.floor(y).astype(np.intp), 0, ny - 2)
+        wx, wy = x - x0, y - y0
+        # corner order: (y0, x0), (y0, x0 + 1), (y0 + 1, x0), (y0 + 1, x0 + 1)
+        j_indices = np.stack((y0, y0, y0 + 1, y0 + 1))
+        i_indices = np.stack((x0, x0 + 1, x0, x0 + 1))
+        weights = np.stack(
+            (
+                (1 - wx) * (1 - wy),
+                wx * (1 - wy),
+                (1 - wx) * wy,
+                wx * wy,
+            )
+        )
+        return (j_indices, i_indices), weights
+
+    def _build_xy_loc(self) -> np.ndarray:
+        xy_loc = np.empty(self.npoints, dtype=np.object_)
+        for i in range(self.npoints):
+            xy_loc[i] = CoordPair(
+                x=self.xy[i, 0],
+                y=self.xy[i, 1],
+                lat=float(self.lats[i]),
+                lon=float(self.lons[i]),
+            )
+        return xy_loc
+
+    def _calc_distances(self) -> np.ndarray:
+        lat, lon = np.radians(self.lats), np.radians(self.lons)
+        dlat, dlon = np.diff(lat), np.diff(lon)
+        a = (
+            np.sin(dlat / 2) ** 2
+            + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+        )
+        segment = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+        return np.concatenate(([0.0], np.cumsum(segment)))
+
+    def _calc_unit_vectors(self) -> tuple[np.ndarray, np.ndarray]:
+        """Return the (eastward, northward) unit vectors along and across
+        the section at each point, both of shape (2, npoints). The one
+        across the section points to the left of the path.
+        """
+        if self.npoints < 2:
+            raise ValueError("The section must have two points or more.")
+        lat, lon = np.radians(self.lats), np.unwrap(np.radians(self.lons))
+        # tangent of the path from its eastward and northward displacement
+        tangent = np.stack((np.cos(lat) * np.gradient(lon), np.gradient(lat)))
+        along_track = tangent / np.hypot(tangent[0], tangent[1])
+        cross_track = np.stack((-along_track[1], along_track[0]))
+        return along_track, cross_track
+
+    def interpolate(self, field: np.ndarray) -> np.ndarray:
+        """Interpolate the rightmost (south_north, west_east) dimensions of
+        the field onto the section line.
+
+        Args:
+            field (np.ndarray): Array whose last two dimensions are the
+                horizontal mass grid.
+
+        Returns:
+            np.ndarray: Array of shape (..., npoints).
+        """
+        field = np.asarray(field)
+        if field.shape[-2:] != self.grid_shape:
+            raise ValueError(
+                f"Field shape {field.shape} does not match the grid {self.grid_shape}."
+            )
+        corners = field[..., self.indices[0], self.indices[1]]
+        return np.ascontiguousarray(
+            np.einsum("...kp,kp->...p", corners, self.weights)
+        )
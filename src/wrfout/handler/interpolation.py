@@ -0,0 +1,165 @@
+from typing import NamedTuple
+
+import numpy as np
+from wrf import interplevel
+
+INTERPOLATION_BACKENDS = ("wrf", "numpy")
+
+
+class VerticalBrackets(NamedTuple):
+    """Levels of a vertical coordinate bracketing each desired level.
+
+    The arrays have the shape (..., level, point) of the interpolated
+    field. The coordinate rises from the lower to the upper level.
+    """
+
+    lower: np.ndarray
+    upper: np.ndarray
+    weight: np.ndarray
+    valid: np.ndarray
+
+
+def _expand(array: np.ndarray, shape: tuple[int, ...]) -> np.ndarray:
+    # insert the extra dimensions of a variable (e.g. u_v) before the
+    # (level, point) dimensions and broadcast the brackets onto them
+    n_extra = len(shape) - array.ndim
+    array = array.reshape(array.shape[:-2] + (1,) * n_extra + array.shape[-2:])
+    return np.broadcast_to(array, shape[:-2] + array.shape[-2:])
+
+
+def compute_brackets(
+    z_line: np.ndarray, levels: np.ndarray, log: bool = False
+) -> VerticalBrackets:
+    """Find the bracketing levels of all columns of a section at once.
+
+    As wrf.interplevel does, a desired level is bracketed by the uppermost
+    layer strictly enclosing it, and is missing where no layer does.
+
+    Args:
+        z_line (np.ndarray): Vertical coordinate of (..., bottom_top, point).
+        levels (np.ndarray): Desired levels.
+        log (bool, optional): Whether to interpolate linearly in the log of
+            the coordinate, e.g. in log-p.
+
+    Returns:
+        VerticalBrackets: Brackets of (..., level, point).
+    """
+    z = np.log(z_line) if log else np.asarray(z_line, dtype=np.float64)
+    desired = np.log(levels) if log else np.asarray(levels, dtype=np.float64)
+    desired = desired[:, np.newaxis]
+    bottom, top = z[..., :-1, :], z[..., 1:, :]
+    # only the layers overlapping the desired levels somewhere are searched
+    # (e.g. the lowest ones for a section up to 1500 m)
+    overlapping = (np.maximum(bottom, top) > desired.min()) & (
+        np.minimum(bottom, top) < desired.max()
+    )
+    layers = np.flatnonzero(
+        overlapping.any(axis=tuple(range(overlapping.ndim - 2)) + (-1,))
+    )
+    shape = z.shape[:-2] + (desired.shape[0], z.shape[-1])
+    # the direction of the coordinate is taken from the first column, as
+    # wrf.interplevel does
+    rising = ~(z[..., :1, :1] > z[..., -1:, :1])
+    layer = np.zeros(shape, dtype=np.intp)
+    valid = np.zeros(shape, dtype=bool)
+    # searched upwards, so the uppermost enclosing layer is kept
+    for k in layers:
+        layer_bottom = bottom[..., k : k + 1, :]
+        layer_top = top[..., k : k + 1, :]
+        crossing = np.where(
+            rising,
+            (layer_bottom < desired) & (layer_top > desired),
+            (layer_bottom > desired) & (layer_top < desired),
+        )
+        layer[crossing] = k
+        valid |= crossing
+
+    lower = np.where(rising, layer, layer + 1)
+    upper = np.where(rising, layer + 1, layer)
+    z_lower = np.take_along_axis(z, lower, axis=-2)
+    z_upper = np.take_along_axis(z, upper, axis=-2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight = (desired - z_lower) / (z_upper - z_lower)
+    return VerticalBrackets(lower, upper, np.where(valid, weight, 0.0), valid)
+
+
+def apply_brackets(
+    var_line: np.ndarray, brackets: VerticalBrackets
+) -> np.ndarray:
+    """Interpolate a variable of (..., bottom_top, point) with brackets of
+    its vertical coordinate.
+
+    Returns:
+        np.ndarray: Array of (..., level, point), NaN where missing.
+    """
+    var_line = np.asarray(var_line, dtype=np.float64)
+    shape = var_line.shape[:-2] + brackets.lower.shape[-2:]
+    lower = np.take_along_axis(
+        var_line, _expand(brackets.lower, shape), axis=-2
+    )
+    upper = np.take_along_axis(
+        var_line, _expand(brackets.upper, shape), axis=-2
+    )
+    weight = _expand(brackets.weight, shape)
+    # same arithmetic as wrf.interplevel, so the results match exactly
+    cross = (1.0 - weight) * lower + weight * upper
+    return np.where(_expand(brackets.valid, shape), cross, np.nan)
+
+
+def interpolate_with_wrf(
+    var_line: np.ndarray,
+    z_line: np.ndarray,
+    levels: np.ndarray,
+    log: bool = False,
+) -> np.ndarray:
+    """Interpolate a variable of (..., bottom_top, point) with
+    wrf.interplevel.
+
+    Returns:
+        np.ndarray: Array of (..., level, point), NaN where missing.
+    """
+    if log:
+        z_line, levels = np.log(z_line), np.log(levels)
+    # insert the extra dimensions of the variable (e.g. u_v) into z
+    n_lead = z_line.ndim - 2
+    z_line = z_line.reshape(
+        z_line.shape[:n_lead]
+        + (1,) * (var_line.ndim - z_line.ndim)
+        + z_line.shape[n_lead:]
+    )
+    z_line = np.ascontiguousarray(np.broadcast_to(z_line, var_line.shape))
+    # (..., bottom_top, point) -> (..., bottom_top, 1, point)
+    cross = interplevel(
+        var_line[..., np.newaxis, :],
+        z_line[..., np.newaxis, :],
+        levels,
+        squeeze=False,
+        meta=False,
+    )
+    cross = np.ma.filled(np.ma.asarray(cross, dtype=np.float64), np.nan)
+    return cross[..., 0, :]
+
+
+def validate_interpolation(
+    cross: np.ndarray,
+    reference: np.ndarray,
+    rtol: float = 1e-5,
+    atol: float = 1e-8,
+) -> None:
+    """Check an interpolated section against the wrf-python one.
+
+    Raises:
+        ValueError: If the missing points or the values differ beyond the
+            tolerance.
+    """
+    if not np.array_equal(np.isnan(cross), np.isnan(reference)):
+        raise ValueError(
+            "Vertical interpolation differs from wrf-python in the missing "
+            f"points: {np.sum(np.isnan(cross) != np.isnan(reference))} points."
+        )
+    if not np.allclose(cross, reference, rtol=rtol, atol=atol, equal_nan=True):
+        difference = np.nanmax(np.abs(cross - reference))
+        raise ValueError(
+            "Vertical interpolation differs from wrf-python by up to "
+            f"{difference}."
+        )
@@ -2,6 +2,7 @@ from enum import Enum, auto
 from typing import NamedTuple
 
 import xarray as xr
+from wrf import CoordPair
 
 
 class VectorComponent(NamedTuple):
@@ -12,3 +13,35 @@ class VectorComponent(NamedTuple):
 class VertivalCoordinate(Enum):
     PRESSURE = auto()
     HEIGHT = auto()
+
+
+class CrossSection(NamedTuple):
+    name: str
+    lat_start: float
+    lat_end: float
+    lon_start: float
+    lon_end: float
+    # (lat, lon) of the points passed through between the start and end
+    waypoints: tuple[tuple[float, float], ...] = ()
+
+    @property
+    def start_point(self) -> CoordPair:
+        return CoordPair(lat=self.lat_start, lon=self.lon_start)
+
+    @property
+    def end_point(self) -> CoordPair:
+        return CoordPair(lat=self.lat_end, lon=self.lon_end)
+
+    @property
+    def via_points(self) -> tuple[CoordPair, ...]:
+        return tuple(
+            CoordPair(lat=lat, lon=lon) for lat, lon in self.waypoints
+        )
+
+
+class ColumnPoint(NamedTuple):
+    """Point whose grid column is drawn against time, e.g. a station."""
+
+    name: str
+    lat: float
+    lon: float
@@ -1,20 +1,53 @@
+import netCDF4 as nc
 from wrf.routines import _VALID_KARGS
 
-from wrfout.loader.xarray_dataset import WrfoutXarrayDataset
-
 
 class WrfoutInformationCollector:
-    def __init__(self, wrfout: WrfoutXarrayDataset) -> None:
-        self.wrfout = wrfout
-        self.wrfout._set_time_lat_lon_coords()
+    """Information of a wrfout file read from its header only.
+
+    The dimensions, attributes and the dimensions, shapes and dtypes of
+    the variables are read without loading any array, except the short
+    Times strings.
+    """
+
+    def __init__(self, dataset: nc.Dataset) -> None:
+        self.dataset = dataset
+
+    def _collect_times(self) -> list[str]:
+        if "Times" not in self.dataset.variables:
+            return []
+        times = self.dataset.variables["Times"][:]
+        return [bytes(time.compressed()).decode() for time in times]
 
     def collect_summary(self) -> str:
-        ds = self.wrfout.dataset
+        ds = self.dataset
+        times = self._collect_times()
         lines = [
             "################### Overview ###################",
-            f"<< dimension infomation >>\n{ds.dims}\n",
-            f"\n<< coordinate infomation >>\n{ds.coords}\n",
-            f"\n<< variables infomation >>\n{ds.data_vars}\n",
+            "<< dimension infomation >>",
+        ]
+        lines.extend(
+            f"    {name}: {len(dim)}"
+            + (" (unlimited)" if dim.isunlimited() else "")
+            for name, dim in ds.dimensions.items()
+        )
+        lines.append("\n<< time infomation >>")
+        if times:
+            lines.append(
+                f"    {len(times)} times from {times[0]} to {times[-1]}"
+            )
+        lines.append("\n<< variables infomation >>")
+        for name, var in ds.variables.items():
+            dims = ", ".join(var.dimensions)
+            shape = ", ".join(str(size) for size in var.shape)
+            description = getattr(var, "description", "")
+            units = getattr(var, "units", "")
+            lines.append(
+                f"    {name:<12}({dims}) [{shape}] {var.dtype}  "
+                f"{description} [{units}]"
+            )
+        lines += [
+            "",
             "Diagnostics available for wrf-python:",
             "    see https://wrf-python.readthedocs.io/en/latest/user_api/generated/wrf.getvar.html#wrf.getvar\n",
         ]
@@ -22,17 +55,21 @@ class WrfoutInformationCollector:
         return "\n".join(lines)
 
     def collect_details(self) -> str:
-        ds = self.wrfout.dataset
+        ds = self.dataset
         lines = [
             "\n\n\n################### Detail ###################",
-            "<< dimension infomation >>",
+            "<< global attributes >>",
         ]
-        for dim in ds.dims:
-            lines.append(f"\n{ds[dim]}")
-        lines.append("\n\n<< coordinate infomation >>")
-        for coord in ds.coords:
-            lines.append(f"\n{ds[coord]}")
+        lines.extend(
+            f"    {name}: {ds.getncattr(name)}" for name in ds.ncattrs()
+        )
         lines.append("\n\n<< variables infomation >>")
-        for var in ds.data_vars:
-            lines.append(f"\n{ds[var]}")
+        for name, var in ds.variables.items():
+            lines.append(
+                f"\n{name} ({', '.join(var.dimensions)}) {var.dtype} "
+                f"{var.shape}"
+            )
+            lines.extend(
+                f"    {attr}: {var.getncattr(attr)}" for attr in var.ncattrs()
+            )
         return "\n".join(lines)
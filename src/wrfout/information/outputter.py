@@ -1,23 +1,61 @@
+import multiprocessing
+import os
+from multiprocessing.process import BaseProcess
 from pathlib import Path
 
+import netCDF4 as nc
+from util.file import atomic_write
 from wrfout.information.collector import WrfoutInformationCollector
-from wrfout.loader.xarray_dataset import WrfoutXarrayDataset
 
 
 class WrfoutInformationOutputter:
     def __init__(self, wrfout_path: str) -> None:
+        if not os.path.exists(wrfout_path):
+            raise FileNotFoundError(f"{wrfout_path} does not exist.")
         self._wrfout_path = wrfout_path
-        self._wrfout = WrfoutXarrayDataset(wrfout_path)
 
     def _build_output_path(self) -> str:
         parent_dir = str(Path(self._wrfout_path).parents[1])
         wrfout_name = Path(self._wrfout_path).stem
         return f"{parent_dir}/information/{wrfout_name}_info.txt"
 
-    def output_to_file(self) -> None:
+    def is_current(self) -> bool:
+        """Whether the information file is newer than the wrfout file."""
         output_path = self._build_output_path()
-        collector = WrfoutInformationCollector(self._wrfout)
-        content = collector.collect_summary() + collector.collect_details()
+        return os.path.exists(output_path) and os.path.getmtime(
+            output_path
+        ) >= os.path.getmtime(self._wrfout_path)
+
+    def output_to_file(self, force: bool = False) -> bool:
+        """Write the information file, unless it is current.
+
+        Returns:
+            bool: Whether the file is written.
+        """
+        if not force and self.is_current():
+            return False
+        output_path = self._build_output_path()
+        with nc.Dataset(self._wrfout_path) as dataset:
+            collector = WrfoutInformationCollector(dataset)
+            content = collector.collect_summary() + collector.collect_details()
         Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, mode="w") as f:
+        # an interruption never leaves a partial file looking current
+        with atomic_write(output_path) as f:
             f.write(content)
+        return True
+
+    def output_in_background(self) -> BaseProcess | None:
+        """Write the information file in another process, unless it is
+        current. Join the returned process before exiting.
+
+        Returns:
+            BaseProcess | None: Process writing the file, or None if the
+                file is current.
+        """
+        if self.is_current():
+            return None
+        process = multiprocessing.get_context("spawn").Process(
+            target=self.output_to_file, name="wrfout-information"
+        )
+        process.start()
+        return process
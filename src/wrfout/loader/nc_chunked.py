@@ -0,0 +1,107 @@
+import warnings
+from collections import OrderedDict
+
+import netCDF4 as nc
+import xarray as xr
+from wrfout.loader.nc_subset import estimate_subset_bytes, read_subset
+
+# horizontal dimensions chunked by chunk_size
+_HORIZONTAL_DIMS = (
+    "south_north",
+    "south_north_stag",
+    "west_east",
+    "west_east_stag",
+)
+
+
+class ChunkedWrfoutReader:
+    """Lazy view of wrfout files opened with xarray and dask.
+
+    The files are chunked by one time and by square horizontal tiles, so
+    reading the window of a section materializes only the chunks it
+    overlaps, never a whole field. The values read at once are bounded by
+    a memory ceiling.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 200,
+        max_bytes: int = 2**30,
+        max_open_files: int = 4,
+    ) -> None:
+        """
+        Args:
+            chunk_size (int, optional): Grid points of a horizontal chunk
+                along each axis.
+            max_bytes (int, optional): Memory ceiling of the values read
+                at once.
+            max_open_files (int, optional): Number of files kept open.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be 1 or more.")
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be 1 or more.")
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self._max_open_files = max_open_files
+        self._open_datasets: OrderedDict[str, xr.Dataset] = OrderedDict()
+
+    def open(self, wrfout_path: str) -> xr.Dataset:
+        if wrfout_path in self._open_datasets:
+            self._open_datasets.move_to_end(wrfout_path)
+            return self._open_datasets[wrfout_path]
+        # the raw values are kept (no decoding), as netCDF4 reads them
+        with warnings.catch_warnings():
+            # chunks smaller than those stored in the file may read a
+            # stored chunk more than once, but keep the memory bounded
+            warnings.filterwarnings(
+                "ignore", message="The specified chunks separate"
+            )
+            dataset = xr.open_dataset(
+                wrfout_path,
+                chunks={
+                    "Time": 1,
+                    **{name: self.chunk_size for name in _HORIZONTAL_DIMS},
+                },
+                decode_cf=False,
+            )
+        self._open_datasets[wrfout_path] = dataset
+        while len(self._open_datasets) > self._max_open_files:
+            _, oldest = self._open_datasets.popitem(last=False)
+            oldest.close()
+        return dataset
+
+    def read_subset(
+        self,
+        dataset: nc.Dataset,
+        wrfout_path: str,
+        timeidxs: list[int],
+        window: tuple[int, int, int, int],
+    ) -> nc.Dataset:
+        """Read the window of some times of a file from its chunks (see
+        read_subset).
+
+        Raises:
+            MemoryError: If the window of the times exceeds the ceiling.
+        """
+        return read_subset(
+            dataset,
+            timeidxs,
+            window,
+            lazy=self.open(wrfout_path),
+            max_bytes=self.max_bytes,
+        )
+
+    def max_times(
+        self, dataset: nc.Dataset, window: tuple[int, int, int, int]
+    ) -> int:
+        """Return the number of times of the window read at once within the
+        memory ceiling."""
+        return max(
+            self.max_bytes // estimate_subset_bytes(dataset, 1, window), 1
+        )
+
+    def close(self) -> None:
+        while self._open_datasets:
+            _, dataset = self._open_datasets.popitem()
+            dataset.close()
@@ -0,0 +1,246 @@
+import itertools
+
+import netCDF4 as nc
+import numpy as np
+from util.instrumentation import instrumented
+from wrfout.loader.nc_subset import SUBSET_VARIABLES
+
+# 3-D fields of wrf.getvar computed from each column alone, with its
+# staggered neighbours. those needing horizontal derivatives (e.g. avo and
+# pvo) would silently be wrong on the columns.
+COLUMN_VARIABLES = (
+    "th",
+    "theta",
+    "tk",
+    "tc",
+    "temp",
+    "theta_e",
+    "eth",
+    "tv",
+    "twb",
+    "rh",
+    "td",
+    "dp",
+    "p",
+    "pres",
+    "pressure",
+    "z",
+    "height",
+    "height_agl",
+    "ua",
+    "va",
+    "wa",
+    "uvmet",
+    "wspd_wdir",
+    "uvmet_wspd_wdir",
+    "omega",
+    "dbz",
+    "T",
+    "P",
+    "PB",
+    "QVAPOR",
+    "QCLOUD",
+    "QRAIN",
+    "QICE",
+    "QSNOW",
+    "QGRAUP",
+)
+
+# in-memory datasets open at the same time need distinct names
+_column_ids = itertools.count()
+
+# the columns of the points are read in one hyperslab of the box around
+# them if it holds at most this many grid columns per point, and one by
+# one otherwise (netCDF4 reads scattered indices one by one, and the box
+# of distant points may be the whole domain)
+MAX_BOX_COLUMNS_PER_POINT = 64
+
+# horizontal dimension -> (axis, extra grid point of the stagger)
+_HORIZONTAL_DIMS = {
+    "south_north": (0, 0),
+    "south_north_stag": (0, 1),
+    "west_east": (1, 0),
+    "west_east_stag": (1, 1),
+}
+
+
+def _time_slice(timeidxs: list[int]) -> slice | list[int]:
+    # a slice reads consecutive times in one hyperslab
+    if timeidxs == list(range(timeidxs[0], timeidxs[-1] + 1)):
+        return slice(timeidxs[0], timeidxs[-1] + 1)
+    return timeidxs
+
+
+def _horizontal_slices(
+    dimensions: tuple[str, ...],
+    times: slice | list[int],
+    start: tuple[int, int],
+    size: tuple[int, int],
+) -> tuple[slice | list[int], ...]:
+    # the box of size (rows, columns) from start and its upper neighbours
+    # on the staggered grids
+    slices: list[slice | list[int]] = []
+    for name in dimensions:
+        if name == "Time":
+            slices.append(times)
+        elif name in _HORIZONTAL_DIMS:
+            axis, stagger = _HORIZONTAL_DIMS[name]
+            slices.append(
+                slice(start[axis], start[axis] + size[axis] + stagger)
+            )
+        else:
+            slices.append(slice(None))
+    return tuple(slices)
+
+
+def _repeat_column(
+    values: np.ndarray, dimensions: tuple[str, ...]
+) -> np.ndarray:
+    # the second row and column of the point repeat its column
+    for name in ("south_north", "west_east", "west_east_stag"):
+        if name in dimensions:
+            axis = dimensions.index(name)
+            values = np.concatenate(
+                [values, np.take(values, [-1], axis=axis)], axis=axis
+            )
+    return values
+
+
+def _read_columns_of(
+    variable: nc.Variable,
+    times: slice | list[int],
+    columns: list[tuple[int, int]],
+    box: tuple[tuple[int, int], tuple[int, int]] | None,
+) -> list[np.ndarray]:
+    """Read the column of each point with its staggered neighbours, from
+    one hyperslab of the box around the points, or one per column if box is
+    None."""
+    dimensions = variable.dimensions
+    if box is None:
+        return [
+            _repeat_column(
+                np.asarray(
+                    variable[
+                        _horizontal_slices(dimensions, times, column, (1, 1))
+                    ]
+                ),
+                dimensions,
+            )
+            for column in columns
+        ]
+    origin, size = box
+    values = np.asarray(
+        variable[_horizontal_slices(dimensions, times, origin, size)]
+    )
+    return [
+        _repeat_column(
+            values[
+                _horizontal_slices(
+                    dimensions,
+                    slice(None),
+                    (column[0] - origin[0], column[1] - origin[1]),
+                    (1, 1),
+                )
+            ],
+            dimensions,
+        )
+        for column in columns
+    ]
+
+
+def _column_box(
+    columns: list[tuple[int, int]],
+) -> tuple[tuple[int, int], tuple[int, int]] | None:
+    # the box around the points, if it is not much larger than their
+    # columns
+    rows = [j for j, _ in columns]
+    cols = [i for _, i in columns]
+    origin = (min(rows), min(cols))
+    size = (max(rows) - origin[0] + 1, max(cols) - origin[1] + 1)
+    if size[0] * size[1] > MAX_BOX_COLUMNS_PER_POINT * len(columns):
+        return None
+    return origin, size
+
+
+@instrumented("read")
+def read_columns(
+    dataset: nc.Dataset,
+    timeidx: int | list[int],
+    columns: list[tuple[int, int]],
+) -> nc.Dataset:
+    """Read the grid columns of some points into an in-memory dataset.
+
+    The columns are read with their staggered neighbours for all the times
+    in one hyperslab per variable, that of the box around the points if it
+    is small enough (see MAX_BOX_COLUMNS_PER_POINT) or else that of each
+    column, so wrf.getvar diagnoses the fields of the points only. The
+    points are laid out along south_north on two rows each, the second one
+    holding the upper neighbour on the south_north_stag grid, so that
+    destaggering gives the value of the point on its first row. The second
+    column repeats the first one (the staggered winds are not diagnosed on
+    a grid one column wide). Only the diagnostics computed column by
+    column (COLUMN_VARIABLES) are valid.
+
+    Args:
+        dataset (nc.Dataset): Source wrfout dataset.
+        timeidx (int | list[int]): Time index or indices in the source
+            dataset.
+        columns (list[tuple[int, int]]): (j, i) of the mass grid column of
+            each point.
+
+    Returns:
+        nc.Dataset: Diskless dataset of 2 * len(columns) rows and two
+            columns. The point k is on the row 2 * k, column 0.
+    """
+    timeidxs = [timeidx] if isinstance(timeidx, int) else list(timeidx)
+    times = _time_slice(timeidxs)
+    box = _column_box(columns)
+    subset = nc.Dataset(
+        f"columns_{next(_column_ids)}.nc",
+        mode="w",
+        diskless=True,
+        persist=False,
+    )
+    subset.setncatts(
+        {name: dataset.getncattr(name) for name in dataset.ncattrs()}
+    )
+    n_rows = 2 * len(columns)
+    for name, dimension in dataset.dimensions.items():
+        if name == "Time":
+            size = None
+        elif name in _HORIZONTAL_DIMS:
+            axis, stagger = _HORIZONTAL_DIMS[name]
+            size = (n_rows if axis == 0 else 2) + stagger
+        else:
+            size = dimension.size
+        subset.createDimension(name, size)
+
+    for varname in SUBSET_VARIABLES:
+        if varname not in dataset.variables:
+            continue
+        variable = dataset.variables[varname]
+        copied = subset.createVariable(
+            varname, variable.dtype, variable.dimensions
+        )
+        copied.setncatts(
+            {
+                name: variable.getncattr(name)
+                for name in variable.ncattrs()
+                if name != "_FillValue"
+            }
+        )
+        rows = [
+            dimension
+            for dimension in variable.dimensions
+            if dimension in ("south_north", "south_north_stag")
+        ]
+        if not rows:
+            copied[:] = variable[times]
+            continue
+        axis = variable.dimensions.index(rows[0])
+        values = _read_columns_of(variable, times, columns, box)
+        if rows[0] == "south_north_stag":
+            # the last staggered row is not used by any point
+            values.append(np.take(values[-1], [-1], axis=axis))
+        copied[:] = np.concatenate(values, axis=axis)
+    return subset
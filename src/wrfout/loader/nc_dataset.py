@@ -1,47 +1,108 @@
 import os
 from datetime import datetime
-from typing import cast
 
 import netCDF4 as nc
-import numpy as np
-from numpy.typing import NDArray
-from time_relation.conversion import datetime64s_to_datetimes
-from wrf import ALL_TIMES, getvar, to_np
+from util.instrumentation import instrumented
+from wrfout.loader.time_index import (
+    TimeIndex,
+    TimeWindow,
+    build_time_index,
+    read_wrfout_times,
+)
 
 
 class WrfoutNetcdfDataset:
-    def __init__(self, wrfout_path: str) -> None:
+    def __init__(
+        self, wrfout_path: str, time_window: TimeWindow | None = None
+    ) -> None:
         if not os.path.exists(wrfout_path):
             raise FileNotFoundError(
                 f"File not found: {wrfout_path}. Specify a valid path."
             )
         self._wrfout_path = wrfout_path
+        self._time_window = time_window
         self._dataset: nc.Dataset | None = None
+        self._time_index: TimeIndex | None = None
         self._wrfout_interval_min: int | None = None
         self._datetime_index_map: dict[datetime, int] = {}
 
-    def load(self) -> None:
+    @instrumented("load")
+    def load(self, hold_last_record: bool = False) -> None:
+        """Open the file and index its times.
+
+        Args:
+            hold_last_record (bool, optional): Whether to leave out the
+                last record, which a running simulation may still be
+                writing.
+        """
         self._dataset = nc.Dataset(self._wrfout_path)
-        datetime64s = cast(
-            NDArray[np.datetime64],
-            to_np(getvar(self._dataset, "times", timeidx=ALL_TIMES)),
-        )
-        self._wrfout_interval_min = (
-            (datetime64s[1] - datetime64s[0])
-            .astype("timedelta64[m]")
-            .astype(int)
+        time_index = build_time_index(
+            [(self._wrfout_path, read_wrfout_times(self._dataset))],
+            self._time_window,
+            hold_last_record,
         )
-        datetimes = datetime64s_to_datetimes(datetime64s)
+        self._time_index = time_index
+        if len(time_index) > 1:
+            self._wrfout_interval_min = int(time_index.intervals_min[0])
         self._datetime_index_map = {
-            datetime: index for index, datetime in enumerate(datetimes)
+            datetime: time_index.location(datetime)[1]
+            for datetime in time_index.datetimes
         }
 
+    def refresh(
+        self,
+        wrfout_paths: list[str] | None = None,
+        hold_last_record: bool = False,
+    ) -> list[datetime]:
+        """Reopen the file and index the times appended since the last
+        load (see load).
+
+        Returns:
+            list[datetime]: Datetimes added.
+        """
+        if wrfout_paths is not None and wrfout_paths != [self._wrfout_path]:
+            raise ValueError(
+                "A single wrfout file cannot be extended with other files. Use WrfoutNetcdfSeries."
+            )
+        previous = self._datetime_index_map
+        if self._dataset is not None:
+            # the handle does not see the records written after it opened
+            self._dataset.close()
+        self.load(hold_last_record)
+        return [
+            datetime
+            for datetime in self._datetime_index_map
+            if datetime not in previous
+        ]
+
+    def locate(self, datetime: datetime) -> tuple[nc.Dataset, int]:
+        return self.dataset, self.datetime_index_map[datetime]
+
+    def path_of(self, datetime: datetime) -> str:
+        if datetime not in self.datetime_index_map:
+            raise KeyError(datetime)
+        return self._wrfout_path
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._time_index is not None
+
+    @property
+    def wrfout_paths(self) -> list[str]:
+        return [self._wrfout_path]
+
     @property
     def dataset(self) -> nc.Dataset:
         if self._dataset is None:
             raise ValueError("Dataset not loaded. Call load() first.")
         return self._dataset
 
+    @property
+    def time_index(self) -> TimeIndex:
+        if self._time_index is None:
+            raise ValueError("Dataset not loaded. Call load() first.")
+        return self._time_index
+
     @property
     def wrfout_interval_min(self) -> int:
         if self._wrfout_interval_min is None:
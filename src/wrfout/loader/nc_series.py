@@ -0,0 +1,191 @@
+import os
+from collections import OrderedDict
+from datetime import datetime
+from glob import glob
+
+import netCDF4 as nc
+from util.instrumentation import instrumented
+from wrfout.loader.nc_dataset import WrfoutNetcdfDataset
+from wrfout.loader.time_index import (
+    TimeIndex,
+    TimeWindow,
+    build_time_index,
+    read_wrfout_times,
+)
+
+
+def resolve_wrfout_paths(wrfout_paths: str | list[str]) -> list[str]:
+    """Expand glob patterns into a sorted list of wrfout files.
+
+    Args:
+        wrfout_paths (str | list[str]): A path, a glob pattern, or a list
+            of them.
+
+    Returns:
+        list[str]: Sorted paths of the matched files.
+    """
+    patterns = (
+        [wrfout_paths] if isinstance(wrfout_paths, str) else wrfout_paths
+    )
+    paths: list[str] = []
+    for pattern in patterns:
+        matched = sorted(glob(pattern))
+        if not matched:
+            raise FileNotFoundError(
+                f"File not found: {pattern}. Specify a valid path."
+            )
+        paths.extend(path for path in matched if path not in paths)
+    return sorted(paths)
+
+
+class WrfoutNetcdfSeries:
+    """Sequence of wrfout files handled as one time series.
+
+    Only the Times variable of each file is read at load(). The files are
+    opened on demand and at most `max_open_files` handles are kept open.
+    """
+
+    def __init__(
+        self,
+        wrfout_paths: list[str],
+        max_open_files: int,
+        time_window: TimeWindow | None = None,
+    ) -> None:
+        for wrfout_path in wrfout_paths:
+            if not os.path.exists(wrfout_path):
+                raise FileNotFoundError(
+                    f"File not found: {wrfout_path}. Specify a valid path."
+                )
+        if max_open_files < 1:
+            raise ValueError("max_open_files must be 1 or more.")
+        self._wrfout_paths = wrfout_paths
+        self._max_open_files = max_open_files
+        self._time_window = time_window
+        self._open_datasets: OrderedDict[str, nc.Dataset] = OrderedDict()
+        self._time_index: TimeIndex | None = None
+        self._wrfout_interval_min: int | None = None
+        self._datetime_index_map: dict[datetime, tuple[str, int]] = {}
+
+    @instrumented("load")
+    def load(self, hold_last_record: bool = False) -> None:
+        """Index the times of the files.
+
+        Args:
+            hold_last_record (bool, optional): Whether to leave out the
+                last record of the last file, which a running simulation
+                may still be writing.
+        """
+        times_of_files = []
+        for wrfout_path in self._wrfout_paths:
+            with nc.Dataset(wrfout_path) as dataset:
+                times_of_files.append(
+                    (wrfout_path, read_wrfout_times(dataset))
+                )
+        # the first file wins when restart files overlap
+        time_index = build_time_index(
+            times_of_files, self._time_window, hold_last_record
+        )
+        self._time_index = time_index
+        if len(time_index) > 1:
+            self._wrfout_interval_min = int(time_index.intervals_min[0])
+        self._datetime_index_map = {
+            datetime: time_index.location(datetime)
+            for datetime in time_index.datetimes
+        }
+
+    def refresh(
+        self,
+        wrfout_paths: list[str] | None = None,
+        hold_last_record: bool = False,
+    ) -> list[datetime]:
+        """Index the times appended since the last load, e.g. by a running
+        simulation (see load).
+
+        Args:
+            wrfout_paths (list[str] | None, optional): Paths of the files,
+                including those added since. None keeps the files.
+
+        Returns:
+            list[datetime]: Datetimes added.
+        """
+        if wrfout_paths is not None:
+            self._wrfout_paths = wrfout_paths
+        previous = self._datetime_index_map
+        # the open handles do not see the records written after they opened
+        self.close()
+        self.load(hold_last_record)
+        return [
+            datetime
+            for datetime in self._datetime_index_map
+            if datetime not in previous
+        ]
+
+    def _open(self, wrfout_path: str) -> nc.Dataset:
+        if wrfout_path in self._open_datasets:
+            self._open_datasets.move_to_end(wrfout_path)
+            return self._open_datasets[wrfout_path]
+        dataset = nc.Dataset(wrfout_path)
+        self._open_datasets[wrfout_path] = dataset
+        while len(self._open_datasets) > self._max_open_files:
+            _, oldest = self._open_datasets.popitem(last=False)
+            oldest.close()
+        return dataset
+
+    def locate(self, datetime: datetime) -> tuple[nc.Dataset, int]:
+        wrfout_path, index = self.datetime_index_map[datetime]
+        return self._open(wrfout_path), index
+
+    def path_of(self, datetime: datetime) -> str:
+        return self.datetime_index_map[datetime][0]
+
+    def close(self) -> None:
+        while self._open_datasets:
+            _, dataset = self._open_datasets.popitem()
+            dataset.close()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._time_index is not None
+
+    @property
+    def wrfout_paths(self) -> list[str]:
+        return self._wrfout_paths
+
+    @property
+    def dataset(self) -> nc.Dataset:
+        # the domain is shared by all files, so the first one represents it
+        if self._time_index is None:
+            raise ValueError("Dataset not loaded. Call load() first.")
+        return self._open(self._wrfout_paths[0])
+
+    @property
+    def time_index(self) -> TimeIndex:
+        if self._time_index is None:
+            raise ValueError("Dataset not loaded. Call load() first.")
+        return self._time_index
+
+    @property
+    def wrfout_interval_min(self) -> int:
+        if self._wrfout_interval_min is None:
+            raise ValueError("Dataset not loaded. Call load() first.")
+        return self._wrfout_interval_min
+
+    @property
+    def datetime_index_map(self) -> dict[datetime, tuple[str, int]]:
+        if self._time_index is None:
+            raise ValueError("Dataset not loaded. Call load() first.")
+        return self._datetime_index_map
+
+
+def create_loader(
+    wrfout_paths: list[str],
+    max_open_files: int,
+    time_window: TimeWindow | None = None,
+    follow: bool = False,
+) -> WrfoutNetcdfDataset | WrfoutNetcdfSeries:
+    # files may be added to a followed series, so it is never a single file
+    if len(wrfout_paths) == 1 and not follow:
+        return WrfoutNetcdfDataset(wrfout_paths[0], time_window=time_window)
+    return WrfoutNetcdfSeries(
+        wrfout_paths, max_open_files=max_open_files, time_window=time_window
+    )
@@ -0,0 +1,185 @@
+import itertools
+
+import netCDF4 as nc
+import xarray as xr
+from util.instrumentation import instrumented
+
+# variables needed by the diagnostics drawn on sections
+# (th, rh, td, uvmet, ua, va, wa, z, p, ter and the mixing ratios)
+SUBSET_VARIABLES = (
+    "Times",
+    "XTIME",
+    "XLAT",
+    "XLONG",
+    "XLAT_U",
+    "XLONG_U",
+    "XLAT_V",
+    "XLONG_V",
+    "COSALPHA",
+    "SINALPHA",
+    "HGT",
+    "U",
+    "V",
+    "W",
+    "T",
+    "P",
+    "PB",
+    "PH",
+    "PHB",
+    "QVAPOR",
+    "QCLOUD",
+    "QRAIN",
+    "QICE",
+    "QSNOW",
+    "QGRAUP",
+)
+
+# in-memory datasets open at the same time need distinct names
+_subset_ids = itertools.count()
+
+# horizontal dimension -> (window axis, extra grid point of the stagger)
+_HORIZONTAL_DIMS = {
+    "south_north": (0, 0),
+    "south_north_stag": (0, 1),
+    "west_east": (1, 0),
+    "west_east_stag": (1, 1),
+}
+
+
+def _subset_slices(
+    dimensions: tuple[str, ...],
+    timeidxs: list[int],
+    window: tuple[int, int, int, int],
+) -> tuple[slice | list[int], ...]:
+    j_start, j_end, i_start, i_end = window
+    bounds = ((j_start, j_end), (i_start, i_end))
+    slices: list[slice | list[int]] = []
+    for name in dimensions:
+        if name == "Time":
+            # a slice reads consecutive times in one hyperslab
+            if timeidxs == list(range(timeidxs[0], timeidxs[-1] + 1)):
+                slices.append(slice(timeidxs[0], timeidxs[-1] + 1))
+            else:
+                slices.append(timeidxs)
+        elif name in _HORIZONTAL_DIMS:
+            axis, stagger = _HORIZONTAL_DIMS[name]
+            start, end = bounds[axis]
+            slices.append(slice(start, end + stagger))
+        else:
+            slices.append(slice(None))
+    return tuple(slices)
+
+
+def _sliced_size(
+    shape: tuple[int, ...], slices: tuple[slice | list[int], ...]
+) -> int:
+    size = 1
+    for length, index in zip(shape, slices):
+        if isinstance(index, slice):
+            size *= len(range(*index.indices(length)))
+        else:
+            size *= len(index)
+    return size
+
+
+def estimate_subset_bytes(
+    dataset: nc.Dataset,
+    n_times: int,
+    window: tuple[int, int, int, int],
+) -> int:
+    """Return the bytes of the variables read by read_subset for n_times
+    times of the window."""
+    timeidxs = list(range(n_times))
+    total = 0
+    for varname in SUBSET_VARIABLES:
+        if varname not in dataset.variables:
+            continue
+        variable = dataset.variables[varname]
+        slices = _subset_slices(variable.dimensions, timeidxs, window)
+        total += _sliced_size(variable.shape, slices) * variable.dtype.itemsize
+    return total
+
+
+@instrumented("read")
+def read_subset(
+    dataset: nc.Dataset,
+    timeidx: int | list[int],
+    window: tuple[int, int, int, int],
+    lazy: xr.Dataset | None = None,
+    max_bytes: int | None = None,
+) -> nc.Dataset:
+    """Read a horizontal hyperslab of some times into an in-memory dataset.
+
+    Only the window of the variables in SUBSET_VARIABLES is read from the
+    file, so wrf.getvar diagnoses the fields on the subset instead of the
+    whole domain.
+
+    Args:
+        dataset (nc.Dataset): Source wrfout dataset.
+        timeidx (int | list[int]): Time index or indices in the source
+            dataset.
+        window (tuple[int, int, int, int]): (j_start, j_end, i_start, i_end)
+            of the mass grid. The staggered grids get one more point.
+        lazy (xr.Dataset | None, optional): The same file opened lazily
+            with dask (see ChunkedWrfoutReader). The values are then read
+            from its chunks overlapping the window instead of the dataset.
+        max_bytes (int | None, optional): Memory ceiling of the values
+            read. None reads them regardless of their size.
+
+    Raises:
+        MemoryError: If the values read exceed max_bytes.
+
+    Returns:
+        nc.Dataset: Diskless dataset holding the times of the window.
+    """
+    timeidxs = [timeidx] if isinstance(timeidx, int) else list(timeidx)
+    j_start, j_end, i_start, i_end = window
+    bounds = ((j_start, j_end), (i_start, i_end))
+    if max_bytes is not None:
+        n_bytes = estimate_subset_bytes(dataset, len(timeidxs), window)
+        if n_bytes > max_bytes:
+            raise MemoryError(
+                f"Reading {n_bytes / 2**20:.1f} MiB of {len(timeidxs)} times exceeds the memory limit of {max_bytes / 2**20:.1f} MiB. Narrow the section or the block, or raise the limit."
+            )
+    subset = nc.Dataset(
+        f"subset_{next(_subset_ids)}.nc",
+        mode="w",
+        diskless=True,
+        persist=False,
+    )
+    subset.setncatts(
+        {name: dataset.getncattr(name) for name in dataset.ncattrs()}
+    )
+    for name, dimension in dataset.dimensions.items():
+        if name == "Time":
+            size = None
+        elif name in _HORIZONTAL_DIMS:
+            axis, stagger = _HORIZONTAL_DIMS[name]
+            size = bounds[axis][1] - bounds[axis][0] + stagger
+        else:
+            size = dimension.size
+        subset.createDimension(name, size)
+
+    for varname in SUBSET_VARIABLES:
+        if varname not in dataset.variables:
+            continue
+        variable = dataset.variables[varname]
+        slices = _subset_slices(variable.dimensions, timeidxs, window)
+        copied = subset.createVariable(
+            varname, variable.dtype, variable.dimensions
+        )
+        copied.setncatts(
+            {
+                name: variable.getncattr(name)
+                for name in variable.ncattrs()
+                if name != "_FillValue"
+            }
+        )
+        if lazy is None:
+            copied[:] = variable[slices]
+        else:
+            # only the chunks overlapping the window are read
+            copied[:] = lazy[varname][
+                dict(zip(variable.dimensions, slices))
+            ].values
+    return subset
@@ -0,0 +1,204 @@
+from datetime import datetime
+from typing import NamedTuple
+
+import netCDF4 as nc
+import numpy as np
+from numpy.typing import NDArray
+from time_relation.conversion import (
+    count_written_times,
+    datetime64s_to_datetimes,
+    wrf_times_to_datetime64s,
+    xtime_to_datetime64s,
+)
+
+
+class TimeWindow(NamedTuple):
+    """Datetimes drawn: those from start to end (both included, None for
+    no bound), every stride-th."""
+
+    start: datetime | None = None
+    end: datetime | None = None
+    stride: int = 1
+
+
+def read_wrfout_times(dataset: nc.Dataset) -> NDArray[np.datetime64]:
+    """Read the UTC times of a wrfout file from Times, or from XTIME if
+    the file has no Times.
+
+    A record being written by a running simulation may have no time yet,
+    so the times are read up to the first one not written.
+    """
+    if "Times" in dataset.variables:
+        times = np.atleast_2d(
+            np.asarray(dataset.variables["Times"][:], dtype="S1")
+        )
+        return wrf_times_to_datetime64s(times[: count_written_times(times)])
+    if "XTIME" in dataset.variables:
+        xtime = dataset.variables["XTIME"]
+        minutes = np.ma.atleast_1d(xtime[:])
+        unwritten = np.ma.getmaskarray(minutes)
+        n_written = (
+            int(np.argmax(unwritten)) if unwritten.any() else len(minutes)
+        )
+        return xtime_to_datetime64s(
+            np.ma.getdata(minutes)[:n_written], xtime.units
+        )
+    raise ValueError("The wrfout file has neither Times nor XTIME.")
+
+
+class TimeIndex:
+    """Sorted datetimes of one or more wrfout files, with the file and
+    time index of each.
+
+    A datetime is looked up in O(1), and a time window or stride is a
+    slice of the sorted times, so selecting frames never walks the whole
+    series. The intervals may be irregular, e.g. across restarts.
+    """
+
+    def __init__(
+        self,
+        times: NDArray[np.datetime64],
+        paths: list[str],
+        file_ids: NDArray[np.intp],
+        timeidxs: NDArray[np.intp],
+    ) -> None:
+        """
+        Args:
+            times (NDArray[np.datetime64]): Sorted unique UTC times.
+            paths (list[str]): Paths of the wrfout files.
+            file_ids (NDArray[np.intp]): Index in paths of the file of
+                each time.
+            timeidxs (NDArray[np.intp]): Time index in its file of each
+                time.
+        """
+        self._times = times
+        self._paths = paths
+        self._file_ids = file_ids
+        self._timeidxs = timeidxs
+        self.datetimes: list[datetime] = datetime64s_to_datetimes(
+            times
+        ).tolist()
+        self._positions = {
+            datetime: position
+            for position, datetime in enumerate(self.datetimes)
+        }
+
+    @classmethod
+    def from_times(
+        cls, times_of_files: list[tuple[str, NDArray[np.datetime64]]]
+    ) -> "TimeIndex":
+        """Index the times read from each file (see read_wrfout_times).
+        The first file wins when files overlap, e.g. restart files.
+        """
+        paths = [path for path, _ in times_of_files]
+        times = np.concatenate(
+            [np.empty(0, dtype="datetime64[s]")]
+            + [times for _, times in times_of_files]
+        )
+        file_ids = np.concatenate(
+            [np.empty(0, dtype=np.intp)]
+            + [
+                np.full(len(times), file_id, dtype=np.intp)
+                for file_id, (_, times) in enumerate(times_of_files)
+            ]
+        )
+        timeidxs = np.concatenate(
+            [np.empty(0, dtype=np.intp)]
+            + [
+                np.arange(len(times), dtype=np.intp)
+                for _, times in times_of_files
+            ]
+        )
+        # the first occurrence of each time is kept
+        times, first = np.unique(times, return_index=True)
+        return cls(times, paths, file_ids[first], timeidxs[first])
+
+    def __len__(self) -> int:
+        return len(self.datetimes)
+
+    def __contains__(self, datetime: datetime) -> bool:
+        return datetime in self._positions
+
+    def position(self, datetime: datetime) -> int:
+        return self._positions[datetime]
+
+    def location(self, datetime: datetime) -> tuple[str, int]:
+        """Return the path of the file and the time index of a datetime."""
+        position = self._positions[datetime]
+        return (
+            self._paths[self._file_ids[position]],
+            int(self._timeidxs[position]),
+        )
+
+    @property
+    def intervals_min(self) -> NDArray[np.int64]:
+        """Minutes between consecutive times."""
+        return np.diff(self._times).astype("timedelta64[m]").astype(np.int64)
+
+    def subset(self, positions: slice) -> "TimeIndex":
+        """Return the index of the times in a range of positions, e.g.
+        slice(0, None, 3) for every third time."""
+        return TimeIndex(
+            self._times[positions],
+            self._paths,
+            self._file_ids[positions],
+            self._timeidxs[positions],
+        )
+
+    def select(self, window: TimeWindow) -> "TimeIndex":
+        """Return the index of the times in a time window.
+
+        Raises:
+            ValueError: If the stride is not positive.
+        """
+        if window.stride < 1:
+            raise ValueError("The stride must be 1 or more.")
+        if not len(self):
+            return self
+        # the bounds are datetimes of the figures, as those of the index
+        labels = self._times + (
+            np.datetime64(self.datetimes[0], "s") - self._times[0]
+        )
+        start = (
+            0
+            if window.start is None
+            else int(np.searchsorted(labels, np.datetime64(window.start)))
+        )
+        stop = (
+            len(labels)
+            if window.end is None
+            else int(
+                np.searchsorted(labels, np.datetime64(window.end), "right")
+            )
+        )
+        return self.subset(slice(start, stop, window.stride))
+
+
+def build_time_index(
+    times_of_files: list[tuple[str, NDArray[np.datetime64]]],
+    time_window: TimeWindow | None = None,
+    hold_last_record: bool = False,
+) -> TimeIndex:
+    """Index the times of the files read by a loader.
+
+    Args:
+        times_of_files (list[tuple[str, NDArray[np.datetime64]]]): Path
+            and times of each file, in order.
+        time_window (TimeWindow | None, optional): Window of the times
+            kept. None keeps all of them.
+        hold_last_record (bool, optional): Whether to leave out the last
+            record of the last file, which a running simulation may still
+            be writing.
+
+    Raises:
+        ValueError: If no time is kept, unless the last record is held.
+    """
+    if hold_last_record and times_of_files:
+        path, times = times_of_files[-1]
+        times_of_files = times_of_files[:-1] + [(path, times[:-1])]
+    time_index = TimeIndex.from_times(times_of_files)
+    if time_window is not None:
+        time_index = time_index.select(time_window)
+    if not len(time_index) and not hold_last_record:
+        raise ValueError("No time of the wrfout files is in the time window.")
+    return time_index